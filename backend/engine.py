@@ -1,13 +1,157 @@
-import requests
+import asyncio
+import httpx
 import os
 import datetime
+import threading
+import weakref
 from credentials import get_credential
+from database import get_db
+from execution_log import ExecutionLogWriter
+from models import Workflow
 import traceback
+import itertools
+import time
 
-def execute_workflow(workflow_dict, trigger_input=None):
+HTTP_MAX_CONNECTIONS = int(os.environ.get("ENGINE_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_TIMEOUT = float(os.environ.get("ENGINE_HTTP_TIMEOUT", "30"))
+# Same switch as the n8n_minimal tracer: output sizes are estimated, not serialized
+TRACE_PAYLOAD_BYTES = os.environ.get("TRACE_PAYLOAD_BYTES", "true").lower() == "true"
+PAYLOAD_SAMPLE_ITEMS = 16
+
+# One pooled client per event loop: an httpx.AsyncClient must not be shared
+# across loops, and the webhook and the sync shim run on different ones.
+_clients = weakref.WeakKeyDictionary()
+
+def get_http_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS // 5),
+        )
+        _clients[loop] = client
+    return client
+
+async def close_http_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def run_http_node(node, data, logs, node_log):
+    url = node.config.get("url")
+    method = node.config.get("method", "GET").upper()
+    headers = dict(node.config.get("headers", {}))
+    body = node.config.get("body", None)
+    cred_id = node.config.get("credential_id")
+    if cred_id:
+        cred = await asyncio.to_thread(get_credential, cred_id)
+        if cred and cred["type"] == "api_key":
+            headers["Authorization"] = f"Bearer {cred['data']}"
+    resp = await get_http_client().request(method, url, headers=headers, json=body)
+    logs.append(f"HTTP {method} {url} → {resp.status_code}")
+    logs.append(f"Response: {resp.text[:500]}")
+    node_log["message"] = f"HTTP {method} {url} → {resp.status_code}"
+    node_log["data"] = resp.text[:500]
+    return resp.json() if "application/json" in resp.headers.get("content-type", "") else resp.text
+
+async def run_llm_node(node, data, logs, node_log):
+    prompt = node.config.get("prompt", "")
+    cred_id = node.config.get("credential_id")
+    if cred_id:
+        cred = await asyncio.to_thread(get_credential, cred_id)
+        llm_api_key = cred["data"]
+    else:
+        llm_api_key = os.environ.get("LLM_API_KEY")
+    llm_api_url = os.environ.get("LLM_API_URL")
+    if not llm_api_url or not llm_api_key:
+        raise Exception("LLM API credentials not set")
+    payload = {
+        "model": node.config.get("model", "llama3-8b-8192"),
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    headers = {
+        "Authorization": f"Bearer {llm_api_key}",
+        "Content-Type": "application/json"
+    }
+    resp = await get_http_client().post(llm_api_url, json=payload, headers=headers)
+    logs.append(f"LLM API {llm_api_url} → {resp.status_code}")
+    result = resp.json()
+    llm_output = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+    logs.append(f"LLM Output: {llm_output[:500]}")
+    node_log["message"] = f"LLM API {llm_api_url} → {resp.status_code}"
+    node_log["data"] = llm_output[:500]
+    return llm_output
+
+async def run_trigger_node(node, data, logs, node_log):
+    logs.append("Trigger node, passing input data.")
+    node_log["message"] = "Trigger node, passing input data."
+    return data
+
+async def run_action_node(node, data, logs, node_log):
+    action = node.config.get("action")
+    if action == "uppercase" and isinstance(data, str):
+        data = data.upper()
+        logs.append(f"Action: Uppercased data.")
+        node_log["message"] = "Action: Uppercased data."
+        node_log["data"] = data
+    else:
+        logs.append(f"Action: No-op or unknown action.")
+        node_log["message"] = "Action: No-op or unknown action."
+    return data
+
+async def run_condition_node(node, data, logs, node_log):
+    condition = node.config.get("condition")
+    if condition and isinstance(data, str):
+        result = condition in data
+        logs.append(f"Condition '{condition}' in data: {result}")
+        node_log["message"] = f"Condition '{condition}' in data: {result}"
+        node_log["data"] = result
+        return result
+    logs.append("Condition: No-op or invalid data.")
+    node_log["message"] = "Condition: No-op or invalid data."
+    return data
+
+NODE_HANDLERS = {
+    "http": run_http_node,
+    "llm": run_llm_node,
+    "trigger": run_trigger_node,
+    "action": run_action_node,
+    "condition": run_condition_node,
+}
+
+def payload_size(data):
+    # Rough JSON size; long lists and dicts are sized from their first items
+    if data is None or isinstance(data, bool):
+        return 5
+    if isinstance(data, (int, float)):
+        return len(repr(data))
+    if isinstance(data, str):
+        return len(data) + 2
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, dict):
+        sample = list(itertools.islice(data.items(), PAYLOAD_SAMPLE_ITEMS))
+        sized = sum(len(str(key)) + 4 + payload_size(value) for key, value in sample)
+    elif isinstance(data, (list, tuple)):
+        sample = data[:PAYLOAD_SAMPLE_ITEMS]
+        sized = sum(payload_size(item) + 1 for item in sample)
+    else:
+        return len(str(data))
+    return 2 + (sized * len(data) // len(sample) if sample else 0)
+
+async def execute_workflow_async(workflow_dict, trigger_input=None):
     db = get_db()
     workflow = Workflow(**workflow_dict)
-    logs = []
+    # The execution document only holds status and aggregates; log records
+    # go to execution_logs as the run progresses.
+    exec_id = (await asyncio.to_thread(db.executions.insert_one, {
+        "workflow_id": str(workflow_dict.get('_id', '')),
+        "status": "running",
+        "timestamp": datetime.datetime.utcnow()
+    })).inserted_id
+    logs = ExecutionLogWriter(db, exec_id)
+    stats = {"node_count": 0, "error_count": 0, "duration_ms": 0.0, "payload_bytes": 0}
     status = "success"
     data = trigger_input
 
@@ -22,75 +166,12 @@ def execute_workflow(workflow_dict, trigger_input=None):
                 "data": None,
                 "timestamp": datetime.datetime.utcnow().isoformat()
             }
+            started = time.perf_counter()
             try:
                 logs.append(f"Executing node {node.name} ({node.type})")
-                if node.type == "http":
-                    url = node.config.get("url")
-                    method = node.config.get("method", "GET").upper()
-                    headers = node.config.get("headers", {})
-                    body = node.config.get("body", None)
-                    cred_id = node.config.get("credential_id")
-                    if cred_id:
-                        cred = get_credential(cred_id)
-                        if cred and cred["type"] == "api_key":
-                            headers["Authorization"] = f"Bearer {cred['data']}"
-                    resp = requests.request(method, url, headers=headers, json=body)
-                    logs.append(f"HTTP {method} {url} → {resp.status_code}")
-                    logs.append(f"Response: {resp.text[:500]}")
-                    data = resp.json() if "application/json" in resp.headers.get("content-type", "") else resp.text
-                    node_log["message"] = f"HTTP {method} {url} → {resp.status_code}"
-                    node_log["data"] = resp.text[:500]
-                elif node.type == "llm":
-                    prompt = node.config.get("prompt", "")
-                    cred_id = node.config.get("credential_id")
-                    if cred_id:
-                        cred = get_credential(cred_id)
-                        llm_api_key = cred["data"]
-                    else:
-                        llm_api_key = os.environ.get("LLM_API_KEY")
-                    llm_api_url = os.environ.get("LLM_API_URL")
-                    if not llm_api_url or not llm_api_key:
-                        raise Exception("LLM API credentials not set")
-                    payload = {
-                        "model": node.config.get("model", "llama3-8b-8192"),
-                        "messages": [{"role": "user", "content": prompt}],
-                    }
-                    headers = {
-                        "Authorization": f"Bearer {llm_api_key}",
-                        "Content-Type": "application/json"
-                    }
-                    resp = requests.post(llm_api_url, json=payload, headers=headers)
-                    logs.append(f"LLM API {llm_api_url} → {resp.status_code}")
-                    result = resp.json()
-                    llm_output = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    logs.append(f"LLM Output: {llm_output[:500]}")
-                    data = llm_output
-                    node_log["message"] = f"LLM API {llm_api_url} → {resp.status_code}"
-                    node_log["data"] = llm_output[:500]
-                elif node.type == "trigger":
-                    logs.append("Trigger node, passing input data.")
-                    node_log["message"] = "Trigger node, passing input data."
-                elif node.type == "action":
-                    action = node.config.get("action")
-                    if action == "uppercase" and isinstance(data, str):
-                        data = data.upper()
-                        logs.append(f"Action: Uppercased data.")
-                        node_log["message"] = "Action: Uppercased data."
-                        node_log["data"] = data
-                    else:
-                        logs.append(f"Action: No-op or unknown action.")
-                        node_log["message"] = "Action: No-op or unknown action."
-                elif node.type == "condition":
-                    condition = node.config.get("condition")
-                    if condition and isinstance(data, str):
-                        result = condition in data
-                        logs.append(f"Condition '{condition}' in data: {result}")
-                        data = result
-                        node_log["message"] = f"Condition '{condition}' in data: {result}"
-                        node_log["data"] = result
-                    else:
-                        logs.append("Condition: No-op or invalid data.")
-                        node_log["message"] = "Condition: No-op or invalid data."
+                handler = NODE_HANDLERS.get(node.type)
+                if handler:
+                    data = await handler(node, data, logs, node_log)
                 else:
                     logs.append(f"Unknown node type: {node.type}")
                     node_log["message"] = f"Unknown node type: {node.type}"
@@ -99,7 +180,13 @@ def execute_workflow(workflow_dict, trigger_input=None):
                 status = "error"
                 node_log["status"] = "error"
                 node_log["message"] = f"{str(e)}\n{traceback.format_exc()}"
+            node_log["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            node_log["payload_bytes"] = payload_size(data) if TRACE_PAYLOAD_BYTES else 0
             logs.append(node_log)
+            stats["node_count"] += 1
+            stats["error_count"] += node_log["status"] == "error"
+            stats["duration_ms"] += node_log["duration_ms"]
+            stats["payload_bytes"] += node_log["payload_bytes"]
         logs.append("Workflow completed.")
     except Exception as e:
         status = "error"
@@ -112,12 +199,31 @@ def execute_workflow(workflow_dict, trigger_input=None):
             "data": None,
             "timestamp": datetime.datetime.utcnow().isoformat()
         })
+    finally:
+        await asyncio.to_thread(logs.close)
 
-    result = {
-        "workflow_id": str(workflow_dict.get('_id', '')),
+    await asyncio.to_thread(db.executions.update_one, {"_id": exec_id}, {"$set": {
         "status": status,
-        "logs": logs,
-        "timestamp": datetime.datetime.utcnow()
-    }
-    exec_id = db.executions.insert_one(result).inserted_id
-    return str(exec_id) 
\ No newline at end of file
+        "finished_at": datetime.datetime.utcnow(),
+        "log_count": logs.count,
+        **stats
+    }})
+    return str(exec_id)
+
+# Sync callers (the scheduler) share one background event loop, so their
+# HTTP connections are pooled across runs as well.
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+def _get_sync_loop():
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="engine-loop", daemon=True).start()
+    return _sync_loop
+
+def execute_workflow(workflow_dict, trigger_input=None):
+    """Blocking wrapper around execute_workflow_async for callers without an event loop."""
+    future = asyncio.run_coroutine_threadsafe(execute_workflow_async(workflow_dict, trigger_input), _get_sync_loop())
+    return future.result()
@@ -0,0 +1,131 @@
+import datetime
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# A batch of log records is written once it holds this many records, or
+# after this many milliseconds, whichever comes first.
+LOG_BATCH_SIZE = int(os.environ.get("EXECUTION_LOG_BATCH_SIZE", "50"))
+LOG_FLUSH_INTERVAL_MS = int(os.environ.get("EXECUTION_LOG_FLUSH_INTERVAL_MS", "200"))
+# A follower stops after this long without new records, even if the run still reads as running
+LOG_TAIL_MAX_IDLE_SECONDS = float(os.environ.get("EXECUTION_LOG_TAIL_MAX_IDLE_SECONDS", "300"))
+
+_indexed = False
+
+def ensure_log_indexes(db):
+    global _indexed
+    if not _indexed:
+        db.execution_logs.create_index([("execution_id", 1), ("seq", 1)], unique=True)
+        _indexed = True
+
+class _LogFlusher:
+    """One daemon thread that writes the buffers of every open ExecutionLogWriter."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.writers = set()
+        self.wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, writer):
+        with self._lock:
+            self.writers.add(writer)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="exec-log-writer", daemon=True)
+                self._thread.start()
+
+    def unregister(self, writer):
+        with self._lock:
+            self.writers.discard(writer)
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            with self._lock:
+                writers = list(self.writers)
+            for writer in writers:
+                writer.flush()
+
+_flusher = _LogFlusher(LOG_FLUSH_INTERVAL_MS / 1000)
+
+class ExecutionLogWriter:
+    """
+    Appends log records of one execution to the execution_logs collection.
+    append() only buffers; a thread shared by all executions writes the
+    buffers with insert_many, so records show up while the workflow is
+    still running and survive a crash up to the last flush.
+    """
+
+    def __init__(self, db, execution_id, batch_size=LOG_BATCH_SIZE):
+        ensure_log_indexes(db)
+        self.collection = db.execution_logs
+        self.execution_id = execution_id
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        # Batches of one execution are written one at a time so seq order holds in the collection
+        self._flush_lock = threading.Lock()
+        _flusher.register(self)
+
+    def append(self, record):
+        if isinstance(record, str):
+            record = {"kind": "message", "message": record}
+        else:
+            record = {"kind": "node", **record}
+        with self._lock:
+            record["execution_id"] = self.execution_id
+            record["seq"] = self.count
+            record.setdefault("timestamp", datetime.datetime.utcnow().isoformat())
+            self.count += 1
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                _flusher.wake.set()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            try:
+                self.collection.insert_many(batch, ordered=True)
+            except Exception:
+                logger.exception(f"Failed to write {len(batch)} log records for execution {self.execution_id}")
+
+    def close(self):
+        _flusher.unregister(self)
+        self.flush()
+
+def tail_logs(db, execution_id, after_seq=-1, follow=True, poll_interval=0.5, max_idle=LOG_TAIL_MAX_IDLE_SECONDS):
+    """
+    Yields log records of an execution in order, starting after `after_seq`.
+    With `follow`, keeps polling until the execution is no longer running,
+    or until no record arrived for `max_idle` seconds (a run whose engine
+    died never gets its final status).
+    """
+    last_record = time.monotonic()
+    while True:
+        cursor = db.execution_logs.find(
+            {"execution_id": execution_id, "seq": {"$gt": after_seq}}, {"_id": 0}
+        ).sort("seq", 1)
+        for record in cursor:
+            after_seq = record["seq"]
+            last_record = time.monotonic()
+            yield record
+        if not follow or time.monotonic() - last_record >= max_idle:
+            return
+        summary = db.executions.find_one({"_id": execution_id}, {"status": 1})
+        if not summary or summary.get("status") != "running":
+            # One more read for records flushed between the query and the status check
+            for record in db.execution_logs.find(
+                {"execution_id": execution_id, "seq": {"$gt": after_seq}}, {"_id": 0}
+            ).sort("seq", 1):
+                yield record
+            return
+        time.sleep(poll_interval)
@@ -1,5 +1,10 @@
 from fastapi import FastAPI, Request, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from pymongo import ObjectId
+from execution_log import tail_logs
+from engine import execute_workflow_async, close_http_client
+import asyncio
+import json
 from scheduler import start_scheduler
 from credentials import create_credential, get_credential, list_credentials
 from templates import create_template, list_templates, get_template, delete_template, update_template
@@ -8,13 +13,24 @@ from variables import create_variable, list_variables, update_variable, delete_v
 @app.post("/webhook/{workflow_id}")
 async def webhook_trigger(workflow_id: str, request: Request):
     db = get_db()
-    w = db.workflows.find_one({"_id": ObjectId(workflow_id)})
+    w = await asyncio.to_thread(db.workflows.find_one, {"_id": ObjectId(workflow_id)})
     if not w:
         raise HTTPException(404, "Workflow not found")
     body = await request.json()
-    exec_id = execute_workflow(w, trigger_input=body)
+    exec_id = await execute_workflow_async(w, trigger_input=body)
     return {"execution_id": exec_id}
 
+@app.on_event("shutdown")
+async def close_engine_client():
+    await close_http_client()
+
+@app.get("/executions/{execution_id}/logs")
+def tail_execution_logs(execution_id: str, after_seq: int = -1, follow: bool = True):
+    """Streams the execution's log records as NDJSON; with follow, until the run finishes."""
+    db = get_db()
+    records = tail_logs(db, ObjectId(execution_id), after_seq, follow)
+    return StreamingResponse((json.dumps(r, default=str) + "\n" for r in records), media_type="application/x-ndjson")
+
 @app.post("/credentials")
 def create_cred(name: str = Body(...), type_: str = Body(...), data: str = Body(...)):
     return {"id": create_credential(name, type_, data)}
@@ -0,0 +1,17 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+class Node(BaseModel):
+    id: str
+    type: str
+    name: Optional[str] = None
+    config: Dict[str, Any] = Field(default_factory=dict)
+
+    def model_post_init(self, __context):
+        # Logs name every node; unnamed ones go by their id
+        if not self.name:
+            self.name = self.id
+
+class Workflow(BaseModel):
+    """The parts of a stored workflow document the engine runs; other fields are ignored."""
+    nodes: List[Node] = Field(default_factory=list)
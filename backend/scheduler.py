@@ -1,23 +1,185 @@
-from apscheduler.schedulers.background import BackgroundScheduler
+from concurrent.futures import ThreadPoolExecutor
 from database import get_db
 from engine import execute_workflow
+import heapq
+import os
+import threading
 import time
+import traceback
 
-def run_scheduled_workflows():
-    db = get_db()
-    for wf in db.workflows.find():
-        for node in wf.get('nodes', []):
-            if node.get('type') == 'trigger' and node.get('config', {}).get('schedule'):
-                last_run = node.get('config', {}).get('last_run', 0)
-                interval = int(node['config']['schedule'])
-                now = int(time.time())
-                if now - last_run >= interval:
-                    print(f"Running scheduled workflow {wf['_id']}")
-                    execute_workflow(wf)
-                    node['config']['last_run'] = now
-                    db.workflows.update_one({'_id': wf['_id']}, {'$set': {'nodes': wf['nodes']}})
+SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", "4"))
+# Workflows are written by other services, so the index is reconciled with them periodically
+SCHEDULE_RELOAD_SECONDS = float(os.environ.get("SCHEDULE_RELOAD_SECONDS", "60"))
+
+def schedule_interval(wf):
+    """Interval in seconds of the workflow's scheduled trigger node, or None."""
+    for node in wf.get('nodes', []):
+        if node.get('type') == 'trigger' and node.get('config', {}).get('schedule'):
+            return int(node['config']['schedule'])
+    return None
+
+def next_slot(next_run, interval, now):
+    """First run time on the schedule's grid that is after `now`."""
+    if next_run > now:
+        return next_run
+    return next_run + interval * (int((now - next_run) // interval) + 1)
+
+class ScheduleIndex:
+    """
+    Next-run times of scheduled workflows, persisted in db.schedule_index
+    ({_id: workflow_id, interval, next_run}) and held in a heap. The
+    dispatcher thread sleeps until the earliest entry is due or the index
+    changes, so each schedule, run or removal costs O(log n) instead of a
+    scan over every workflow. The dispatcher also reconciles the index with
+    db.workflows every SCHEDULE_RELOAD_SECONDS, which picks up workflows
+    saved or deleted by other services. This backend never writes
+    workflows itself, so the reload is the only sync path.
+
+    Heap entries are never removed in place: an entry whose next_run no
+    longer matches self.entries is stale and skipped when popped.
+    """
+
+    def __init__(self, db, workers=SCHEDULER_WORKERS, reload_interval=SCHEDULE_RELOAD_SECONDS):
+        self.db = db
+        self.heap = []
+        self.entries = {}
+        self.running = set()
+        self.cond = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduled-run")
+        self._stopped = False
+        self._thread = None
+        self.reload_interval = reload_interval
+        self.next_reload = time.time() + reload_interval
+
+    def load(self):
+        """Rebuilds the index from the persisted next-run times and the workflows' schedule triggers."""
+        self.db.schedule_index.create_index("next_run")
+        persisted = {doc['_id']: doc for doc in self.db.schedule_index.find()}
+        with self.cond:
+            for wf_id, doc in persisted.items():
+                if doc.get('interval'):
+                    self.entries[wf_id] = (doc['next_run'], doc['interval'])
+                    heapq.heappush(self.heap, (doc['next_run'], str(wf_id), wf_id))
+        self.reload()
+        print(f"Schedule index loaded with {len(self.entries)} workflows")
+
+    def reload(self):
+        """Adds, reschedules and drops entries so the index matches the workflows' schedule triggers."""
+        workflows = list(self.db.workflows.find({"nodes.config.schedule": {"$exists": True}}, {"nodes": 1}))
+        now = time.time()
+        seen = set()
+        with self.cond:
+            for wf in workflows:
+                interval = schedule_interval(wf)
+                if not interval:
+                    continue
+                wf_id = wf['_id']
+                seen.add(wf_id)
+                current = self.entries.get(wf_id)
+                if current and current[1] == interval:
+                    continue
+                last_run = next((n['config'].get('last_run', 0) for n in wf['nodes'] if n.get('type') == 'trigger'), 0)
+                # A schedule that is overdue runs once now
+                self._push(wf_id, interval, max(now, last_run + interval))
+            stale = [wf_id for wf_id in self.entries if wf_id not in seen]
+            for wf_id in stale:
+                del self.entries[wf_id]
+            if stale:
+                self.db.schedule_index.delete_many({"_id": {"$in": stale}})
+            self.next_reload = now + self.reload_interval
+            self.cond.notify()
+
+    def _push(self, wf_id, interval, next_run):
+        self.entries[wf_id] = (next_run, interval)
+        heapq.heappush(self.heap, (next_run, str(wf_id), wf_id))
+        self.db.schedule_index.update_one(
+            {"_id": wf_id}, {"$set": {"interval": interval, "next_run": next_run}}, upsert=True
+        )
+
+    def upsert(self, wf):
+        """Call after a workflow is created or updated."""
+        interval = schedule_interval(wf)
+        if not interval:
+            self.remove(wf['_id'])
+            return
+        with self.cond:
+            current = self.entries.get(wf['_id'])
+            if current and current[1] == interval:
+                return
+            self._push(wf['_id'], interval, time.time() + interval)
+            self.cond.notify()
+
+    def remove(self, wf_id):
+        """Call after a workflow is deleted or loses its schedule trigger."""
+        with self.cond:
+            if self.entries.pop(wf_id, None) is not None:
+                self.db.schedule_index.delete_one({"_id": wf_id})
+                self.cond.notify()
+
+    def _pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            next_run, _, wf_id = heapq.heappop(self.heap)
+            entry = self.entries.get(wf_id)
+            if entry is None or entry[0] != next_run:
+                continue
+            interval = entry[1]
+            # Runs missed while the server was down fire once, then the schedule resumes after now
+            self._push(wf_id, interval, next_slot(next_run + interval, interval, now))
+            if wf_id not in self.running:
+                self.running.add(wf_id)
+                due.append(wf_id)
+        return due
+
+    def _run(self):
+        while True:
+            if time.time() >= self.next_reload:
+                try:
+                    self.reload()
+                except Exception:
+                    traceback.print_exc()
+                    self.next_reload = time.time() + self.reload_interval
+            with self.cond:
+                if self._stopped:
+                    return
+                now = time.time()
+                due = self._pop_due(now)
+                if not due:
+                    wake = min(self.heap[0][0], self.next_reload) if self.heap else self.next_reload
+                    self.cond.wait(max(wake - now, 0))
+                    continue
+            for wf_id in due:
+                self.executor.submit(self._dispatch, wf_id)
+
+    def _dispatch(self, wf_id):
+        try:
+            wf = self.db.workflows.find_one({"_id": wf_id})
+            if wf is None:
+                self.remove(wf_id)
+                return
+            print(f"Running scheduled workflow {wf_id}")
+            execute_workflow(wf)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self.cond:
+                self.running.discard(wf_id)
+
+    def start(self):
+        self.load()
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self.cond:
+            self._stopped = True
+            self.cond.notify()
+        self.executor.shutdown(wait=False)
+
+schedule_index = None
 
 def start_scheduler():
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(run_scheduled_workflows, 'interval', seconds=10)
-    scheduler.start() 
\ No newline at end of file
+    global schedule_index
+    schedule_index = ScheduleIndex(get_db())
+    schedule_index.start()
+    return schedule_index
@@ -0,0 +1,18 @@
+import os
+import sys
+import types
+
+# Backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _no_database():
+    raise RuntimeError("tests must patch get_db with an in-memory database")
+
+
+# The Mongo connection module is provided by the deployment; tests patch get_db per module
+if "database" not in sys.modules:
+    try:
+        import database  # noqa: F401
+    except ImportError:
+        sys.modules["database"] = types.SimpleNamespace(get_db=_no_database)
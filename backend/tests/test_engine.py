@@ -0,0 +1,132 @@
+import asyncio
+import itertools
+import json
+import threading
+import pytest
+import engine
+
+
+class Result:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class Executions:
+    def __init__(self):
+        self.docs = {}
+        self.ids = itertools.count(1)
+
+    def insert_one(self, doc):
+        doc["_id"] = next(self.ids)
+        self.docs[doc["_id"]] = doc
+        return Result(doc["_id"])
+
+    def update_one(self, query, update):
+        self.docs[query["_id"]].update(update["$set"])
+
+
+class ExecutionLogs:
+    def __init__(self):
+        self.records = []
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def insert_many(self, records, ordered=True):
+        self.records += records
+
+
+class FakeDb:
+    def __init__(self):
+        self.executions = Executions()
+        self.execution_logs = ExecutionLogs()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(engine, "get_db", lambda: db)
+    return db
+
+
+# A stored workflow document: fields the engine does not use are ignored
+WORKFLOW = {"_id": "wf1", "name": "shout", "nodes": [
+    {"id": "t", "type": "trigger"},
+    {"id": "up", "type": "action", "config": {"action": "uppercase"}},
+    {"id": "has", "type": "condition", "config": {"condition": "HELLO"}},
+]}
+
+
+@pytest.mark.asyncio
+async def test_async_engine_runs_nodes_and_records_summary(db):
+    exec_id = await engine.execute_workflow_async(WORKFLOW, trigger_input="hello world")
+    summary = db.executions.docs[int(exec_id)]
+    assert summary["status"] == "success" and summary["node_count"] == 3 and summary["error_count"] == 0
+    nodes = [r for r in db.execution_logs.records if r["kind"] == "node"]
+    assert [r["node_id"] for r in nodes] == ["t", "up", "has"]
+    assert nodes[1]["data"] == "HELLO WORLD" and nodes[2]["data"] is True
+    assert summary["log_count"] == len(db.execution_logs.records)
+    assert [r["seq"] for r in db.execution_logs.records] == list(range(summary["log_count"]))
+
+
+@pytest.mark.asyncio
+async def test_failing_node_marks_execution_as_error(db, monkeypatch):
+    async def broken(node, data, logs, node_log):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(engine.NODE_HANDLERS, "broken", broken)
+    exec_id = await engine.execute_workflow_async({"nodes": [{"id": "b", "type": "broken"}]})
+    summary = db.executions.docs[int(exec_id)]
+    assert summary["status"] == "error" and summary["error_count"] == 1
+
+
+def test_sync_shim_runs_on_one_shared_loop_with_a_pooled_client(db, monkeypatch):
+    seen = []
+
+    async def probe(node, data, logs, node_log):
+        seen.append((asyncio.get_running_loop(), threading.current_thread().name, engine.get_http_client()))
+        return data
+
+    monkeypatch.setitem(engine.NODE_HANDLERS, "probe", probe)
+    workflow = {"nodes": [{"id": "p", "type": "probe"}]}
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(engine.execute_workflow(workflow))) for _ in range(3)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+
+    assert len(set(results)) == 3
+    assert all(db.executions.docs[int(r)]["status"] == "success" for r in results)
+    loops, threads, clients = zip(*seen)
+    assert len(set(loops)) == 1 and set(threads) == {"engine-loop"}
+    # The loop's HTTP client is reused by every run
+    assert len({id(c) for c in clients}) == 1
+
+
+def test_http_clients_are_per_event_loop():
+    async def client():
+        first = engine.get_http_client()
+        assert engine.get_http_client() is first
+        await engine.close_http_client()
+        return first
+
+    first, second = asyncio.run(client()), asyncio.run(client())
+    assert first is not second and first.is_closed
+
+
+@pytest.mark.asyncio
+async def test_node_payload_sizes_are_estimated(db, monkeypatch):
+    exec_id = await engine.execute_workflow_async(WORKFLOW, trigger_input="hello world")
+    nodes = [r for r in db.execution_logs.records if r["kind"] == "node"]
+    assert [r["payload_bytes"] for r in nodes] == [13, 13, 5]
+    assert db.executions.docs[int(exec_id)]["payload_bytes"] == 31
+
+    monkeypatch.setattr(engine, "TRACE_PAYLOAD_BYTES", False)
+    exec_id = await engine.execute_workflow_async(WORKFLOW, trigger_input="hello world")
+    assert db.executions.docs[int(exec_id)]["payload_bytes"] == 0
+
+
+def test_payload_size_samples_long_lists():
+    rows = [{"id": i, "name": "x" * 10} for i in range(10000)]
+    assert engine.payload_size(rows) == pytest.approx(len(json.dumps(rows)), rel=0.2)
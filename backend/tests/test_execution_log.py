@@ -0,0 +1,147 @@
+import threading
+import types
+import pytest
+import execution_log
+from execution_log import ExecutionLogWriter, _LogFlusher, tail_logs
+
+
+class Cursor(list):
+    def sort(self, key, direction):
+        return Cursor(sorted(self, key=lambda doc: doc[key], reverse=direction < 0))
+
+
+class Logs:
+    def __init__(self, fail=False):
+        self.records = []
+        self.batches = []
+        self.threads = []
+        self.fail = fail
+        self.inserted = threading.Event()
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def insert_many(self, records, ordered=True):
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.batches.append(len(records))
+        self.threads.append(threading.current_thread())
+        self.records += records
+        self.inserted.set()
+
+    def find(self, query, projection=None):
+        return Cursor(
+            dict(r) for r in self.records
+            if r["execution_id"] == query["execution_id"] and r["seq"] > query["seq"]["$gt"]
+        )
+
+
+class Executions:
+    def __init__(self):
+        self.status = {}
+
+    def find_one(self, query, projection=None):
+        status = self.status.get(query["_id"])
+        return {"_id": query["_id"], "status": status} if status else None
+
+
+class FakeDb:
+    def __init__(self, fail=False):
+        self.execution_logs = Logs(fail)
+        self.executions = Executions()
+
+
+@pytest.fixture
+def flusher(monkeypatch):
+    def install(interval):
+        flusher = _LogFlusher(interval)
+        monkeypatch.setattr(execution_log, "_flusher", flusher)
+        return flusher
+    return install
+
+
+def test_writer_buffers_until_flushed(flusher):
+    flusher(60)
+    db = FakeDb()
+    writer = ExecutionLogWriter(db, "e1", batch_size=10)
+    writer.append("started")
+    writer.append({"node": "n1", "status": "success"})
+    assert db.execution_logs.records == []
+
+    writer.close()
+    assert db.execution_logs.batches == [2]
+    assert [(r["seq"], r["kind"]) for r in db.execution_logs.records] == [(0, "message"), (1, "node")]
+    assert all(r["execution_id"] == "e1" for r in db.execution_logs.records)
+
+
+def test_shared_flusher_writes_a_full_batch_at_once(flusher):
+    flusher(60)
+    db = FakeDb()
+    writer = ExecutionLogWriter(db, "e1", batch_size=3)
+    for i in range(3):
+        writer.append(f"line {i}")
+
+    assert db.execution_logs.inserted.wait(5)
+    assert db.execution_logs.batches == [3]
+    writer.close()
+
+
+def test_shared_flusher_writes_partial_batches_on_its_interval(flusher):
+    shared = flusher(0.05)
+    first, second = FakeDb(), FakeDb()
+    writers = [ExecutionLogWriter(first, "e1"), ExecutionLogWriter(second, "e2")]
+    writers[0].append("one")
+    writers[1].append("two")
+
+    assert first.execution_logs.inserted.wait(5)
+    assert second.execution_logs.inserted.wait(5)
+    # Every writer is flushed by the same thread
+    assert first.execution_logs.threads == second.execution_logs.threads == [shared._thread]
+    for writer in writers:
+        writer.close()
+    assert shared.writers == set()
+
+
+def test_failed_writes_are_logged(flusher, caplog):
+    flusher(60)
+    writer = ExecutionLogWriter(FakeDb(fail=True), "e1")
+    writer.append("lost")
+    writer.close()
+    assert "Failed to write 1 log records for execution e1" in caplog.text
+
+
+def fake_time(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    clock.monotonic = lambda: clock.now
+
+    def sleep(seconds):
+        clock.now += seconds
+    clock.sleep = sleep
+    monkeypatch.setattr(execution_log, "time", clock)
+    return clock
+
+
+def test_tail_logs_stops_following_after_max_idle(monkeypatch):
+    clock = fake_time(monkeypatch)
+    db = FakeDb()
+    db.executions.status["e1"] = "running"
+    db.execution_logs.records = [{"execution_id": "e1", "seq": 0, "message": "started"}]
+
+    records = list(tail_logs(db, "e1", poll_interval=1, max_idle=5))
+
+    assert [r["seq"] for r in records] == [0]
+    assert clock.now == 5
+
+
+def test_tail_logs_reads_the_rest_once_the_run_finishes(monkeypatch):
+    fake_time(monkeypatch)
+    db = FakeDb()
+    db.executions.status["e1"] = "success"
+    db.execution_logs.records = [
+        {"execution_id": "e1", "seq": 1, "message": "done"},
+        {"execution_id": "e1", "seq": 0, "message": "started"},
+        {"execution_id": "e2", "seq": 0, "message": "other"},
+    ]
+
+    assert [r["seq"] for r in tail_logs(db, "e1")] == [0, 1]
+    assert [r["seq"] for r in tail_logs(db, "e1", after_seq=0, follow=False)] == [1]
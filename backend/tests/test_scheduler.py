@@ -0,0 +1,155 @@
+import pytest
+import scheduler
+from scheduler import ScheduleIndex, next_slot
+
+
+class Collection:
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def find(self, query=None, projection=None):
+        return [dict(doc) for doc in self.docs.values()]
+
+    def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if doc is None and upsert:
+            doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+        if doc is not None:
+            doc.update(update["$set"])
+
+    def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+    def delete_many(self, query):
+        for _id in query["_id"]["$in"]:
+            self.docs.pop(_id, None)
+
+
+class FakeDb:
+    def __init__(self, workflows=(), schedule_index=()):
+        self.workflows = Collection(workflows)
+        self.schedule_index = Collection(schedule_index)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(scheduler.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def make_index():
+    indexes = []
+
+    def make(db, **kwargs):
+        index = ScheduleIndex(db, workers=1, **kwargs)
+        indexes.append(index)
+        return index
+
+    yield make
+    for index in indexes:
+        index.stop()
+
+
+def scheduled(wf_id, interval, last_run=0):
+    return {"_id": wf_id, "nodes": [{"type": "trigger", "config": {"schedule": interval, "last_run": last_run}}]}
+
+
+def test_next_slot_skips_missed_runs_on_the_grid():
+    assert next_slot(1100, 60, 1000) == 1100
+    assert next_slot(1000, 60, 1000) == 1060
+    assert next_slot(800, 60, 1000) == 1040
+
+
+def test_pop_due_returns_due_workflows_in_run_order(clock, make_index):
+    db = FakeDb([scheduled("a", 60, last_run=990), scheduled("b", 30, last_run=960), scheduled("c", 10, last_run=1100)])
+    index = make_index(db)
+    index.load()
+
+    clock.now = 1060
+    assert index._pop_due(clock.now) == ["b", "a"]
+    assert index.entries["a"] == (1110, 60)
+    assert index.entries["b"] == (1090, 30)
+    assert db.schedule_index.docs["a"]["next_run"] == 1110
+    # The previous runs are still going, so the next slots are not dispatched again
+    clock.now = 1110
+    assert index._pop_due(clock.now) == ["c"]
+
+
+def test_pop_due_skips_stale_heap_entries(clock, make_index):
+    db = FakeDb([scheduled("a", 60, last_run=990)])
+    index = make_index(db)
+    index.load()
+    index.upsert(scheduled("a", 120))
+    index.remove("missing")
+
+    assert index._pop_due(1060) == []
+    assert index._pop_due(1120) == ["a"]
+
+
+def test_load_keeps_persisted_next_runs(clock, make_index):
+    db = FakeDb(
+        [scheduled("a", 60), scheduled("b", 60)],
+        schedule_index=[{"_id": "a", "interval": 60, "next_run": 1030}, {"_id": "b", "interval": 30, "next_run": 1010}],
+    )
+    index = make_index(db)
+    index.load()
+
+    assert index.entries["a"] == (1030, 60)
+    # The interval changed while the server was down, so the schedule restarts from now
+    assert index.entries["b"] == (1000, 60)
+    assert db.schedule_index.docs["b"] == {"_id": "b", "interval": 60, "next_run": 1000}
+
+
+def test_reload_drops_deleted_and_unscheduled_workflows(clock, make_index):
+    db = FakeDb(
+        [scheduled("a", 60), scheduled("b", 60)],
+        schedule_index=[{"_id": "gone", "interval": 60, "next_run": 1030}],
+    )
+    index = make_index(db, reload_interval=30)
+    index.load()
+    assert set(index.entries) == {"a", "b"}
+    assert "gone" not in db.schedule_index.docs
+
+    del db.workflows.docs["a"]
+    db.workflows.docs["b"]["nodes"] = [{"type": "trigger", "config": {}}]
+    db.workflows.docs["c"] = scheduled("c", 45)
+    clock.now = 1030
+    index.reload()
+
+    assert set(index.entries) == {"c"}
+    assert set(db.schedule_index.docs) == {"c"}
+    assert index.next_reload == 1060
+    assert index._pop_due(1075) == ["c"]
+
+
+def test_dispatch_removes_workflows_deleted_since_they_were_due(clock, make_index, monkeypatch):
+    db = FakeDb([scheduled("a", 60)])
+    index = make_index(db)
+    index.load()
+    runs = []
+    monkeypatch.setattr(scheduler, "execute_workflow", runs.append)
+
+    del db.workflows.docs["a"]
+    index.running.add("a")
+    index._dispatch("a")
+
+    assert runs == []
+    assert index.entries == {}
+    assert index.running == set()
@@ -0,0 +1,39 @@
+"""
+Decrypt-and-parse cost of a stored credential, legacy vs versioned codec:
+
+    python benchmarks/bench_credential_codec.py [-n 20000]
+"""
+import argparse
+import ast
+import os
+import sys
+import timeit
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from src.credential_codec import encode_credential_data, decode_credential_data  # noqa: E402
+
+DATA = {"api_key": "sk-" + "x" * 48, "organization": "org-123", "base_url": "https://api.example.com/v1"}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    n = parser.parse_args().n
+    fernet = Fernet(Fernet.generate_key())
+    legacy = str(DATA).encode()
+    current = encode_credential_data(DATA)
+    legacy_token = fernet.encrypt(legacy)
+    current_token = fernet.encrypt(current)
+    cases = {
+        "parse eval (old)": lambda: eval(legacy.decode()),
+        "parse literal_eval (legacy fallback)": lambda: ast.literal_eval(legacy.decode()),
+        "parse v1 json": lambda: decode_credential_data(current),
+        "decrypt+eval (old)": lambda: eval(fernet.decrypt(legacy_token).decode()),
+        "decrypt+v1 json": lambda: decode_credential_data(fernet.decrypt(current_token)),
+    }
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=n, repeat=3))
+        print(f"{name:40s} {seconds / n * 1e6:8.2f} us/op")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Recall@k and query latency of the local vector store against exact search:
+
+    python benchmarks/bench_vector_store.py [-n 1000000] [-k 10] [--nprobe 4 8 16 32]
+
+Vectors are synthetic (Gaussian clusters). The collection is written to a
+temporary directory unless --dir is given, so a second run with the same
+--dir skips ingestion.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from src.vector_store import VectorCollection, get_embedder, normalize  # noqa: E402
+
+def synthetic(n, centers, rng):
+    return centers[rng.integers(0, len(centers), n)] + 0.5 * rng.normal(size=(n, centers.shape[1])).astype(np.float32)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=200000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32, 64])
+    parser.add_argument("--dir")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    embedder = get_embedder()
+    collection = VectorCollection(args.dir or tempfile.mkdtemp(prefix="bench_vectors_"), embedder)
+
+    if collection.count < args.n:
+        centers = rng.normal(size=(1000, embedder.dim)).astype(np.float32)
+        start = time.perf_counter()
+        for offset in range(collection.count, args.n, args.batch_size):
+            size = min(args.batch_size, args.n - offset)
+            ids = [str(i) for i in range(offset, offset + size)]
+            collection.add(ids, [""] * size, [{"shard": i % 16} for i in range(offset, offset + size)],
+                           vectors=synthetic(size, centers, rng))
+        print(f"ingest+index {args.n} vectors: {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    texts = [f"document {i} about topic {i % 97} and subject {i % 89}" for i in range(10000)]
+    embedder.embed(texts)
+    print(f"hashing embedder: {10000 / (time.perf_counter() - start):.0f} texts/s")
+
+    queries = normalize(np.asarray(collection.vectors[rng.choice(collection.count, args.queries)])
+                        + 0.1 * rng.normal(size=(args.queries, embedder.dim)).astype(np.float32))
+    start = time.perf_counter()
+    truth = [set(collection._exact(q, None, args.k)[0].tolist()) for q in queries]
+    print(f"exact: {(time.perf_counter() - start) / args.queries * 1000:8.2f} ms/query")
+
+    for nprobe in args.nprobe:
+        latencies, recall = [], []
+        for q, expected in zip(queries, truth):
+            start = time.perf_counter()
+            hits = collection.query(vectors=q[None, :], k=args.k, nprobe=nprobe)[0]
+            latencies.append(time.perf_counter() - start)
+            recall.append(len(expected & {int(h["id"]) for h in hits}) / args.k)
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        print(f"nprobe={nprobe:3d} recall@{args.k}={np.mean(recall):.3f} p50={p50:7.2f} ms p95={p95:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
+from langchain_core.runnables import RunnableConfig
 from .components import TOOL_REGISTRY, create_llm, AVAILABLE_MODELS, MEMORY_BACKENDS
+from .memory import ConversationMemory
 from ..schemas import WorkflowGraph, WorkflowNode, NodeType
 import networkx as nx
 import logging
@@ -59,7 +61,7 @@ def create_agentic_graph(workflow: WorkflowGraph) -> StateGraph:
         api_key = config.get("api_key")
         
         try:
-            llm = create_llm(provider, model, api_key, temperature, max_tokens)
+            llm = create_llm(provider, model, api_key, temperature, max_tokens, cache=config.get("cache"))
             logger.info(f"Created LLM: {provider}/{model}")
         except Exception as e:
             logger.error(f"Failed to create LLM: {e}")
@@ -89,47 +91,52 @@ def create_agentic_graph(workflow: WorkflowGraph) -> StateGraph:
             logger.warning(f"Unknown tool type: {tool_type}")
 
     # --- Configure Memory ---
-    memory_config = None
+    memory = None
     if memory_nodes:
         memory_node = memory_nodes[0]
         memory_config = memory_node.config
+        memory = ConversationMemory(memory_config, llm)
         logger.info(f"Memory configured: {memory_config.get('type', 'unknown')}")
 
     # --- Bind tools to LLM ---
     llm_with_tools = llm.bind_tools(tools) if tools else llm
 
     # --- Define the graph nodes ---
-    def agent_node_fn(state: AgentState):
+    # Node functions are async end-to-end so a slow LLM or tool call never
+    # blocks the event loop serving other agent streams.
+    tool_node = ToolNode(tools) if tools else None
+
+    async def agent_node_fn(state: AgentState, config: RunnableConfig):
         """Main agent node that processes messages and decides next actions."""
         try:
-            # Add memory context if available
-            if memory_config and state.get("memory"):
-                # This is a simplified memory integration
-                # In a full implementation, you'd retrieve relevant memory
-                pass
-            
+            # With a memory node the prompt is bounded: summary plus the newest
+            # messages within its token budget
+            prompt, update = state["messages"], {}
+            if memory:
+                thread_id = config.get("configurable", {}).get("thread_id")
+                prompt, update = await memory.prepare(state, thread_id)
+
             # Process with LLM
-            response = llm_with_tools.invoke(state["messages"])
-            return {"messages": [response]}
+            response = await llm_with_tools.ainvoke(prompt)
+            return {**update, "messages": update.get("messages", []) + [response]}
         except Exception as e:
             logger.error(f"Agent execution failed: {e}")
             return {"messages": [{"content": f"Error: {str(e)}", "type": "error"}]}
 
-    def tool_execution_fn(state: AgentState):
+    async def tool_execution_fn(state: AgentState):
         """Execute tools based on LLM decisions."""
         try:
-            tool_node = ToolNode(tools)
-            return tool_node.invoke(state)
+            return await tool_node.ainvoke(state)
         except Exception as e:
             logger.error(f"Tool execution failed: {e}")
             return {"messages": [{"content": f"Tool error: {str(e)}", "type": "error"}]}
 
-    def trigger_node_fn(state: AgentState):
+    async def trigger_node_fn(state: AgentState):
         """Handle trigger nodes (input, webhook, schedule)."""
         # For now, just pass through the input
         return state
 
-    def output_node_fn(state: AgentState):
+    async def output_node_fn(state: AgentState):
         """Handle output nodes (output, slack, database)."""
         # Process the final output based on node type
         # This is a simplified implementation
@@ -0,0 +1,81 @@
+import hashlib
+import hmac
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+from ..schemas import WorkflowGraph
+
+# Compiled agent graphs kept in memory by /execute-agent
+AGENT_GRAPH_CACHE_SIZE = int(os.getenv("AGENT_GRAPH_CACHE_SIZE", "128"))
+
+# Config fields filled in by credential injection. They are replaced by a
+# keyed fingerprint so two users sharing a workflow but not a key never share
+# a compiled graph, while the secret itself never ends up in the cache key.
+SECRET_CONFIG_KEYS = {"api_key", "connection_string", "password", "token"}
+
+# Per-process key: fingerprints cannot be brute-forced from a leaked cache key
+_FINGERPRINT_KEY = os.urandom(32)
+
+def fingerprint_secret(value: Any) -> str:
+    return hmac.new(_FINGERPRINT_KEY, str(value).encode(), hashlib.sha256).hexdigest()[:16]
+
+def _canonical_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        k: fingerprint_secret(v) if k in SECRET_CONFIG_KEYS and v else v
+        for k, v in config.items()
+    }
+
+def agent_graph_hash(workflow: WorkflowGraph) -> str:
+    """
+    Hash of the parts of a WorkflowGraph that affect the compiled graph.
+    Layout (position, frontend data), edge ids and the workflow name are ignored.
+    """
+    content = {
+        "nodes": sorted(
+            ({"id": n.id, "type": n.type.value, "config": _canonical_config(n.config)} for n in workflow.nodes),
+            key=lambda n: n["id"],
+        ),
+        "edges": sorted(
+            ([e.source, e.target, e.source_handle, e.target_handle, e.conditions] for e in workflow.edges),
+            key=lambda e: json.dumps(e, sort_keys=True, default=str),
+        ),
+    }
+    data = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.sha256(data).hexdigest()
+
+class AgentGraphCache:
+    """LRU cache of compiled agent graphs keyed by agent_graph_hash."""
+
+    def __init__(self, maxsize: int = AGENT_GRAPH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._graphs: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, workflow: WorkflowGraph, build: Callable[[WorkflowGraph], Any]) -> Any:
+        key = agent_graph_hash(workflow)
+        runnable = self._graphs.get(key)
+        if runnable is not None:
+            self._graphs.move_to_end(key)
+            self.hits += 1
+            return runnable
+        self.misses += 1
+        runnable = build(workflow)
+        self._graphs[key] = runnable
+        if len(self._graphs) > self.maxsize:
+            self._graphs.popitem(last=False)
+            self.evictions += 1
+        return runnable
+
+    def clear(self):
+        self._graphs.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._graphs), "maxsize": self.maxsize,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+        }
+
+agent_graph_cache = AgentGraphCache()
@@ -0,0 +1,518 @@
+"""
+Durable LangGraph checkpointers for agent conversations, so a thread_id
+resumes from its last checkpoint instead of the client resending history.
+
+Channel values are stored per version, not per checkpoint: the checkpoint
+row holds only channel versions and metadata, and a channel's value is
+written as a blob once per new version, keyed by (thread, namespace,
+channel, version). Unchanged channels keep pointing at blobs written by
+earlier checkpoints. A list channel that only grew since the version this
+saver last wrote or read (e.g. `messages` after a turn) is written as a
+delta: the appended items plus the `base` version they extend. A load walks
+the chain back to a full value with one indexed range read per channel, and
+a full value is written again every CHECKPOINT_DELTA_CHAIN deltas or when
+the list was rewritten (e.g. trimmed by src/agent/memory.py).
+
+Thread ids are scoped to their owner with scoped_thread_id() before they
+reach a checkpointer or message store, so a client-chosen thread_id can only
+address the caller's own conversations.
+
+CHECKPOINT_BACKEND selects "sqlite" (WAL file, single node) or "mongo"
+(shared across nodes). compact() keeps the newest CHECKPOINT_KEEP_LAST
+checkpoints per thread, drops threads idle for CHECKPOINT_RETENTION_DAYS and
+deletes blobs and writes nothing references any more, directly or as the
+base of a delta.
+"""
+import asyncio
+import contextlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP, BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple,
+    get_checkpoint_id, get_checkpoint_metadata, writes_sort_key,
+)
+from ..config import (
+    CHECKPOINT_BACKEND, CHECKPOINT_SQLITE_PATH, CHECKPOINT_KEEP_LAST, CHECKPOINT_RETENTION_DAYS,
+    CHECKPOINT_DELTA_CHAIN, CHECKPOINT_DELTA_CACHE, get_mongodb_uri,
+)
+
+def scoped_thread_id(user_id: Any, thread_id: str) -> str:
+    """Storage key of a client thread_id for one user."""
+    return f"{user_id}:{thread_id}"
+
+def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[RunnableConfig]:
+    if not checkpoint_id:
+        return None
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+def _matches(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    return not filter or all(metadata.get(k) == v for k, v in filter.items())
+
+def _follow(blobs, version: str) -> List[Tuple[str, bytes]]:
+    """Blobs from `version` back to its full value, given (version, base, type, value) rows newest first."""
+    chain = []
+    for blob_version, base, type_, value in blobs:
+        if blob_version != version:
+            continue
+        chain.append((type_, value))
+        if base is None:
+            return chain
+        version = base
+    return []
+
+class _VersionedSaver(BaseCheckpointSaver[str]):
+    """Serialization shared by the SQLite and Mongo savers."""
+
+    def __init__(self, *, serde=None):
+        super().__init__(serde=serde)
+        # (thread_id, checkpoint_ns, channel) -> (version, copy of the list value, deltas since a full value)
+        self._heads = OrderedDict()
+        self._heads_lock = threading.Lock()
+
+    def _head(self, key: Tuple[str, str, str]):
+        with self._heads_lock:
+            return self._heads.get(key)
+
+    def _remember(self, key: Tuple[str, str, str], version: str, value: Any, chain: int):
+        if not isinstance(value, list):
+            return
+        with self._heads_lock:
+            self._heads[key] = (version, list(value), chain)
+            self._heads.move_to_end(key)
+            while len(self._heads) > CHECKPOINT_DELTA_CACHE:
+                self._heads.popitem(last=False)
+
+    def _dump_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: str, values: Dict[str, Any]):
+        """(channel, version, base, type, value); `base` is set when value holds only the items appended to it."""
+        if channel not in values:
+            return (channel, version, None, "empty", b"")
+        value = values[channel]
+        key = (thread_id, checkpoint_ns, channel)
+        head = self._head(key)
+        if (isinstance(value, list) and head and head[0] < version and head[2] < CHECKPOINT_DELTA_CHAIN
+                and value[:len(head[1])] == head[1]):
+            self._remember(key, version, value, head[2] + 1)
+            return (channel, version, head[0], *self.serde.dumps_typed(value[len(head[1]):]))
+        self._remember(key, version, value, 0)
+        return (channel, version, None, *self.serde.dumps_typed(value))
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Zero-padded so versions also sort correctly as strings in SQL and Mongo
+        current_v = 0 if current is None else current if isinstance(current, int) else int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def _dump_checkpoint(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                         new_versions: ChannelVersions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        stripped = checkpoint.copy()
+        values = stripped.pop("channel_values")
+        blobs = [
+            self._dump_blob(thread_id, checkpoint_ns, channel, str(version), values)
+            for channel, version in new_versions.items()
+        ]
+        return (
+            self.serde.dumps_typed(stripped),
+            self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            json.dumps({k: str(v) for k, v in checkpoint["channel_versions"].items()}),
+            blobs,
+        )
+
+    def _dump_writes(self, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str):
+        """[(idx, channel, type, value, task_path, replace)]; special writes replace, regular ones are written once."""
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            rows.append((idx, channel, *self.serde.dumps_typed(value), task_path, idx < 0))
+        return rows
+
+    def _load_tuple(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, parent_id: Optional[str],
+                    checkpoint: Tuple[str, bytes], metadata: Tuple[str, bytes],
+                    chains: Dict[str, List[Tuple[str, bytes]]], writes: List[Tuple[str, str, str, bytes, str, int]]) -> CheckpointTuple:
+        loaded = self.serde.loads_typed(checkpoint)
+        values = {}
+        for channel, version in loaded["channel_versions"].items():
+            chain = chains.get(channel)
+            if not chain or chain[-1][0] == "empty":
+                continue
+            value = self.serde.loads_typed(chain[-1])
+            for delta in reversed(chain[:-1]):
+                value = value + self.serde.loads_typed(delta)
+            values[channel] = value
+            self._remember((thread_id, checkpoint_ns, channel), str(version), value, len(chain) - 1)
+        writes = sorted(writes, key=lambda w: writes_sort_key(w[4], w[0], w[5]))
+        return CheckpointTuple(
+            config=_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint={**loaded, "channel_values": values},
+            metadata=self.serde.loads_typed(metadata),
+            parent_config=_config(thread_id, checkpoint_ns, parent_id),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value, _, _ in writes],
+        )
+
+class SQLiteCheckpointSaver(_VersionedSaver):
+    """Checkpoints in a WAL-mode SQLite file; async methods run the sync ones in a thread."""
+
+    def __init__(self, path: str = CHECKPOINT_SQLITE_PATH, *, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,"
+                " parent_id TEXT, type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB,"
+                " channel_versions TEXT NOT NULL, created_at REAL NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));"
+                "CREATE TABLE IF NOT EXISTS checkpoint_blobs ("
+                " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, channel TEXT NOT NULL, version TEXT NOT NULL,"
+                " base TEXT, type TEXT NOT NULL, value BLOB, PRIMARY KEY (thread_id, checkpoint_ns, channel, version));"
+                "CREATE TABLE IF NOT EXISTS checkpoint_writes ("
+                " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, value BLOB,"
+                " task_path TEXT NOT NULL DEFAULT '',"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));"
+                "CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints (created_at);"
+            )
+            # Files written before deltas were stored only hold full values
+            if "base" not in {row[1] for row in conn.execute("PRAGMA table_info(checkpoint_blobs)")}:
+                conn.execute("ALTER TABLE checkpoint_blobs ADD COLUMN base TEXT")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _read(self, conn, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata, channel_versions = row
+        chains = {}
+        for channel, version in json.loads(channel_versions).items():
+            # Primary key range scan; rows of other branches between the links are skipped
+            chains[channel] = _follow(conn.execute(
+                "SELECT version, base, type, value FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ?"
+                " AND channel = ? AND version <= ? ORDER BY version DESC",
+                (thread_id, checkpoint_ns, channel, version),
+            ), version)
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value, task_path, idx FROM checkpoint_writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return self._load_tuple(thread_id, checkpoint_ns, checkpoint_id, parent_id,
+                                (type_, checkpoint), (metadata_type, metadata), chains, writes)
+
+    _COLUMNS = "checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata, channel_versions"
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._connect() as conn:
+            if checkpoint_id:
+                row = conn.execute(
+                    f"SELECT {self._COLUMNS} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    f"SELECT {self._COLUMNS} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._read(conn, thread_id, checkpoint_ns, row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            where.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        sql = f"SELECT thread_id, checkpoint_ns, {self._COLUMNS} FROM checkpoints"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+        results = []
+        with self._connect() as conn:
+            for thread_id, checkpoint_ns, *row in conn.execute(sql, params).fetchall():
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter and not _matches(self.serde.loads_typed((row[4], row[5])), filter):
+                    continue
+                results.append(self._read(conn, thread_id, checkpoint_ns, row))
+        yield from results
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        dumped, dumped_metadata, channel_versions, blobs = self._dump_checkpoint(config, checkpoint, metadata, new_versions)
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint_blobs (thread_id, checkpoint_ns, channel, version, base, type, value)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(thread_id, checkpoint_ns, *blob) for blob in blobs],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint,"
+                " metadata_type, metadata, channel_versions, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], get_checkpoint_id(config),
+                 *dumped, *dumped_metadata, channel_versions, time.time()),
+            )
+        return _config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        key = (config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", ""),
+               config["configurable"]["checkpoint_id"], task_id)
+        with self._connect() as conn:
+            for idx, channel, type_, value, path, replace in self._dump_writes(writes, task_id, task_path):
+                conn.execute(
+                    f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO checkpoint_writes"
+                    " (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*key, idx, channel, type_, value, path),
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._connect() as conn:
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def compact(self, keep_last: int = CHECKPOINT_KEEP_LAST, retention_days: float = CHECKPOINT_RETENTION_DAYS) -> Dict[str, int]:
+        stats = {"threads_expired": 0, "checkpoints": 0, "blobs": 0, "writes": 0}
+        cutoff = time.time() - retention_days * 86400
+        with self._connect() as conn:
+            expired = [r[0] for r in conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?", (cutoff,)
+            )]
+            for thread_id in expired:
+                for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                    conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            stats["threads_expired"] = len(expired)
+            stats["checkpoints"] = conn.execute(
+                "DELETE FROM checkpoints WHERE rowid IN (SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER"
+                " (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS n FROM checkpoints) WHERE n > ?)",
+                (keep_last,),
+            ).rowcount
+            stats["writes"] = conn.execute(
+                "DELETE FROM checkpoint_writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints c WHERE"
+                " c.thread_id = checkpoint_writes.thread_id AND c.checkpoint_ns = checkpoint_writes.checkpoint_ns"
+                " AND c.checkpoint_id = checkpoint_writes.checkpoint_id)"
+            ).rowcount
+            # A blob is live while a remaining checkpoint references its (channel, version) or a live delta extends it
+            stats["blobs"] = conn.execute(
+                "DELETE FROM checkpoint_blobs WHERE (thread_id, checkpoint_ns, channel, version) NOT IN ("
+                " WITH RECURSIVE live (thread_id, checkpoint_ns, channel, version) AS ("
+                " SELECT c.thread_id, c.checkpoint_ns, v.key, v.value FROM checkpoints c, json_each(c.channel_versions) v"
+                " UNION SELECT b.thread_id, b.checkpoint_ns, b.channel, b.base FROM checkpoint_blobs b JOIN live l"
+                " ON b.thread_id = l.thread_id AND b.checkpoint_ns = l.checkpoint_ns AND b.channel = l.channel"
+                " AND b.version = l.version WHERE b.base IS NOT NULL)"
+                " SELECT * FROM live)"
+            ).rowcount
+        return stats
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in results:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def acompact(self, keep_last: int = CHECKPOINT_KEEP_LAST, retention_days: float = CHECKPOINT_RETENTION_DAYS) -> Dict[str, int]:
+        return await asyncio.to_thread(self.compact, keep_last, retention_days)
+
+class MongoCheckpointSaver(_VersionedSaver):
+    """Same layout as SQLiteCheckpointSaver in three Mongo collections; async only."""
+
+    def __init__(self, db, *, serde=None):
+        super().__init__(serde=serde)
+        self.checkpoints = db.agent_checkpoints
+        self.blobs = db.agent_checkpoint_blobs
+        self.writes = db.agent_checkpoint_writes
+        self._indexed = False
+
+    async def _ensure_indexes(self):
+        if not self._indexed:
+            await self.checkpoints.create_index([("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)], unique=True)
+            await self.checkpoints.create_index("created_at")
+            await self.blobs.create_index([("thread_id", 1), ("checkpoint_ns", 1), ("channel", 1), ("version", 1)], unique=True)
+            await self.writes.create_index(
+                [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", 1), ("task_id", 1), ("idx", 1)], unique=True
+            )
+            self._indexed = True
+
+    async def _read(self, doc) -> CheckpointTuple:
+        thread_id, checkpoint_ns = doc["thread_id"], doc["checkpoint_ns"]
+        chains = {}
+        for channel, version in doc["channel_versions"].items():
+            # Same walk as _follow, over a range of the (thread_id, checkpoint_ns, channel, version) index
+            chain, want = [], version
+            async for blob in self.blobs.find(
+                {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "channel": channel, "version": {"$lte": version}},
+                {"version": 1, "base": 1, "type": 1, "value": 1},
+            ).sort("version", -1):
+                if blob["version"] != want:
+                    continue
+                chain.append((blob["type"], blob["value"]))
+                want = blob.get("base")
+                if want is None:
+                    break
+            chains[channel] = chain if want is None else []
+        writes = [
+            (w["task_id"], w["channel"], w["type"], w["value"], w["task_path"], w["idx"])
+            async for w in self.writes.find({"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": doc["checkpoint_id"]})
+        ]
+        return self._load_tuple(thread_id, checkpoint_ns, doc["checkpoint_id"], doc.get("parent_id"),
+                                (doc["type"], doc["checkpoint"]), (doc["metadata_type"], doc["metadata"]), chains, writes)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        await self._ensure_indexes()
+        query = {"thread_id": config["configurable"]["thread_id"], "checkpoint_ns": config["configurable"].get("checkpoint_ns", "")}
+        if get_checkpoint_id(config):
+            query["checkpoint_id"] = get_checkpoint_id(config)
+        doc = await self.checkpoints.find_one(query, sort=[("checkpoint_id", -1)])
+        return await self._read(doc) if doc else None
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        await self._ensure_indexes()
+        query: Dict[str, Any] = {}
+        if config:
+            query["thread_id"] = config["configurable"]["thread_id"]
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query["checkpoint_ns"] = config["configurable"]["checkpoint_ns"]
+            if get_checkpoint_id(config):
+                query["checkpoint_id"] = get_checkpoint_id(config)
+        if before and get_checkpoint_id(before):
+            query["checkpoint_id"] = {"$lt": get_checkpoint_id(before)}
+        count = 0
+        async for doc in self.checkpoints.find(query).sort("checkpoint_id", -1):
+            if limit is not None and count >= limit:
+                break
+            if filter and not _matches(self.serde.loads_typed((doc["metadata_type"], doc["metadata"])), filter):
+                continue
+            count += 1
+            yield await self._read(doc)
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        from pymongo import UpdateOne
+        await self._ensure_indexes()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        dumped, dumped_metadata, channel_versions, blobs = self._dump_checkpoint(config, checkpoint, metadata, new_versions)
+        if blobs:
+            await self.blobs.bulk_write([
+                UpdateOne(
+                    {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "channel": channel, "version": version},
+                    {"$set": {"base": base, "type": type_, "value": value}}, upsert=True,
+                )
+                for channel, version, base, type_, value in blobs
+            ], ordered=False)
+        await self.checkpoints.update_one(
+            {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]},
+            {"$set": {
+                "parent_id": get_checkpoint_id(config), "type": dumped[0], "checkpoint": dumped[1],
+                "metadata_type": dumped_metadata[0], "metadata": dumped_metadata[1],
+                "channel_versions": json.loads(channel_versions), "created_at": time.time(),
+            }},
+            upsert=True,
+        )
+        return _config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        from pymongo import UpdateOne
+        await self._ensure_indexes()
+        key = {"thread_id": config["configurable"]["thread_id"], "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+               "checkpoint_id": config["configurable"]["checkpoint_id"], "task_id": task_id}
+        ops = []
+        for idx, channel, type_, value, path, replace in self._dump_writes(writes, task_id, task_path):
+            fields = {"channel": channel, "type": type_, "value": value, "task_path": path}
+            ops.append(UpdateOne({**key, "idx": idx}, {"$set": fields} if replace else {"$setOnInsert": fields}, upsert=True))
+        if ops:
+            await self.writes.bulk_write(ops, ordered=False)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        for collection in (self.checkpoints, self.blobs, self.writes):
+            await collection.delete_many({"thread_id": thread_id})
+
+    async def acompact(self, keep_last: int = CHECKPOINT_KEEP_LAST, retention_days: float = CHECKPOINT_RETENTION_DAYS) -> Dict[str, int]:
+        await self._ensure_indexes()
+        stats = {"threads_expired": 0, "checkpoints": 0, "blobs": 0, "writes": 0}
+        cutoff = time.time() - retention_days * 86400
+        async for group in self.checkpoints.aggregate([
+            {"$group": {"_id": "$thread_id", "last": {"$max": "$created_at"}}},
+            {"$match": {"last": {"$lt": cutoff}}},
+        ]):
+            await self.adelete_thread(group["_id"])
+            stats["threads_expired"] += 1
+        async for group in self.checkpoints.aggregate([
+            {"$group": {"_id": {"thread_id": "$thread_id", "checkpoint_ns": "$checkpoint_ns"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": keep_last}}},
+        ]):
+            scope = group["_id"]
+            kept = [doc async for doc in self.checkpoints.find(scope, {"checkpoint_id": 1, "channel_versions": 1})
+                    .sort("checkpoint_id", -1).limit(keep_last)]
+            kept_ids = [doc["checkpoint_id"] for doc in kept]
+            live = {(c, v) for doc in kept for c, v in doc["channel_versions"].items()}
+            stats["checkpoints"] += (await self.checkpoints.delete_many({**scope, "checkpoint_id": {"$nin": kept_ids}})).deleted_count
+            stats["writes"] += (await self.writes.delete_many({**scope, "checkpoint_id": {"$nin": kept_ids}})).deleted_count
+            blobs = [blob async for blob in self.blobs.find(scope, {"channel": 1, "version": 1, "base": 1})]
+            bases = {(blob["channel"], blob["version"]): blob.get("base") for blob in blobs}
+            pending = list(live)
+            while pending:
+                channel, version = pending.pop()
+                base = bases.get((channel, version))
+                if base is not None and (channel, base) not in live:
+                    live.add((channel, base))
+                    pending.append((channel, base))
+            dead = [blob["_id"] for blob in blobs if (blob["channel"], blob["version"]) not in live]
+            if dead:
+                stats["blobs"] += (await self.blobs.delete_many({"_id": {"$in": dead}})).deleted_count
+        return stats
+
+_checkpointer = None
+
+def get_checkpointer():
+    """Process-wide checkpointer for the configured backend (CHECKPOINT_BACKEND)."""
+    global _checkpointer
+    if _checkpointer is None:
+        if CHECKPOINT_BACKEND == "mongo":
+            from ..db import get_db_from_uri
+            _, db = get_db_from_uri(get_mongodb_uri())
+            _checkpointer = MongoCheckpointSaver(db)
+        else:
+            _checkpointer = SQLiteCheckpointSaver()
+    return _checkpointer
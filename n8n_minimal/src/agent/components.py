@@ -5,23 +5,42 @@ from langchain_together import TogetherLLM
 from langchain_cohere import ChatCohere
 from langchain_mistralai import ChatMistralAI
 from langchain.tools import tool
+from langchain_core.tools import StructuredTool
+from ..llm_cache import LangChainLLMCache
+from ..rate_limit import governed_model_kwargs
+from .llm_pool import LLMClientPool, llm_pool
 from langchain_tavily import TavilySearch
 import smtplib
 import os
 import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import json
 
 # --- Tool Registry ---
 
+# Blocking tools (SMTP, requests) run here instead of on the event loop that
+# serves the agent streams; the bound caps how many run at once.
+TOOL_THREAD_POOL_SIZE = int(os.environ.get("TOOL_THREAD_POOL_SIZE", "8"))
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_THREAD_POOL_SIZE, thread_name_prefix="agent-tool")
+
+def offloaded_tool(func: Callable[..., Any]) -> StructuredTool:
+    """Wrap a blocking function as a tool whose async path runs in the tool thread pool."""
+    async def coroutine(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(tool_executor, functools.partial(func, *args, **kwargs))
+    return StructuredTool.from_function(func=func, coroutine=coroutine, name=func.__name__)
+
 @tool
 def multiply(a: int, b: int) -> int:
     """Multiply two integers."""
     return a * b
 
-@tool
+@offloaded_tool
 def send_email(to: str, subject: str, body: str, smtp_config: Optional[Dict[str, Any]] = None) -> str:
     """Send an email using SMTP."""
     # Use provided config or environment variables
@@ -54,7 +73,7 @@ def send_email(to: str, subject: str, body: str, smtp_config: Optional[Dict[str,
     except Exception as e:
         return f"Failed to send email: {str(e)}"
 
-@tool
+@offloaded_tool
 def post_to_slack(channel: str, message: str, webhook_url: Optional[str] = None) -> str:
     """Post a message to a Slack channel."""
     if not webhook_url:
@@ -76,7 +95,7 @@ def post_to_slack(channel: str, message: str, webhook_url: Optional[str] = None)
     except Exception as e:
         return f"Failed to post to Slack: {str(e)}"
 
-@tool
+@offloaded_tool
 def http_request(method: str, url: str, headers: Optional[Dict[str, str]] = None, 
                 data: Optional[Dict[str, Any]] = None) -> str:
     """Make an HTTP request."""
@@ -118,9 +137,13 @@ TOOL_REGISTRY = {
 
 # --- LLM Registry ---
 
+
 def create_llm(provider: str, model: str, api_key: Optional[str] = None, 
-               temperature: float = 0.7, max_tokens: Optional[int] = None) -> Any:
-    """Create an LLM instance based on provider and configuration."""
+               temperature: float = 0.7, max_tokens: Optional[int] = None, cache: Any = None) -> Any:
+    """
+    Return a pooled LLM instance for the provider and configuration.
+    `cache` (true or {"ttl": seconds}) routes responses through the LLM response cache.
+    """
     
     # Use provided API key or environment variable
     if not api_key:
@@ -129,14 +152,28 @@ def create_llm(provider: str, model: str, api_key: Optional[str] = None,
     if not api_key:
         raise ValueError(f"API key not found for provider {provider}")
     
+    if provider not in LLM_REGISTRY:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    
+    key = LLMClientPool.key(provider, model, api_key, temperature, max_tokens) + (json.dumps(cache, sort_keys=True),)
+    return llm_pool.get(key, lambda: _build_llm(provider, model, api_key, temperature, max_tokens, cache))
+
+def _build_llm(provider: str, model: str, api_key: str, temperature: float, max_tokens: Optional[int], cache: Any = None) -> Any:
     common_kwargs = {
         "temperature": temperature,
         "api_key": api_key
     }
     
+    if cache:
+        common_kwargs["cache"] = LangChainLLMCache(ttl=cache.get("ttl") if isinstance(cache, dict) else None)
+    
     if max_tokens:
         common_kwargs["max_tokens"] = max_tokens
     
+    if provider != "together":
+        # Chat model calls share the provider's budget with the workflow nodes
+        common_kwargs.update(governed_model_kwargs(provider, api_key, max_tokens))
+    
     if provider == "groq":
         return ChatGroq(model=model, **common_kwargs)
     elif provider == "openai":
@@ -198,26 +235,35 @@ AVAILABLE_MODELS = {
 
 # --- Memory Backends ---
 
+# Prompt-size fields shared by every backend (see agent/memory.py)
+MEMORY_BUDGET_FIELDS = [
+    {"name": "max_tokens", "label": "Max Prompt Tokens", "type": "number", "default": 3000},
+    {"name": "summarize", "label": "Summarize Older Messages", "type": "boolean", "default": False},
+]
+
 MEMORY_BACKENDS = {
     "window_buffer": {
         "display_name": "Window Buffer",
-        "description": "In-memory buffer with sliding window",
+        "description": "Sliding window over the conversation, bounded by messages and tokens",
         "config_fields": [
-            {"name": "window_size", "label": "Window Size", "type": "number", "default": 10}
+            {"name": "window_size", "label": "Window Size", "type": "number", "default": 10},
+            *MEMORY_BUDGET_FIELDS,
         ]
     },
     "mongodb": {
         "display_name": "MongoDB",
-        "description": "MongoDB database for persistent storage",
+        "description": "Sliding window; older messages are kept in MongoDB by thread",
         "config_fields": [
-            {"name": "connection_string", "label": "Connection String", "type": "text", "default": "mongodb://localhost:27017"}
+            {"name": "connection_string", "label": "Connection String", "type": "text", "default": "mongodb://localhost:27017"},
+            *MEMORY_BUDGET_FIELDS,
         ]
     },
     "sqlite": {
         "display_name": "SQLite",
-        "description": "Lightweight SQLite database",
+        "description": "Sliding window; older messages are kept in a SQLite file by thread",
         "config_fields": [
-            {"name": "database_path", "label": "Database Path", "type": "text", "default": "./memory.db"}
+            {"name": "database_path", "label": "Database Path", "type": "text", "default": "./memory.db"},
+            *MEMORY_BUDGET_FIELDS,
         ]
     }
 } 
\ No newline at end of file
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# LLM clients are shared between graphs so repeated agent runs reuse their
+# HTTP connection pools. Clients unused for LLM_POOL_IDLE_TTL seconds are dropped.
+LLM_POOL_MAX_SIZE = int(os.environ.get("LLM_POOL_MAX_SIZE", "64"))
+LLM_POOL_IDLE_TTL = float(os.environ.get("LLM_POOL_IDLE_TTL", "600"))
+
+class LLMClientPool:
+    """Process-wide, thread-safe pool of LLM clients with idle eviction."""
+
+    def __init__(self, max_size: int = LLM_POOL_MAX_SIZE, idle_ttl: float = LLM_POOL_IDLE_TTL):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._clients: Dict[tuple, list] = {}  # key -> [client, last_used]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(provider: str, model: str, api_key: str, temperature: float, max_tokens: Optional[int]) -> tuple:
+        # The key is hashed so the pool never holds it as a dict key
+        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        return (provider, model, key_hash, temperature, max_tokens)
+
+    def get(self, key: tuple, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            client = self._touch(key)
+            if client is not None:
+                return client
+        # Built outside the lock so a slow constructor does not stall lookups of other keys
+        built = factory()
+        with self._lock:
+            client = self._touch(key)
+            if client is not None:
+                # Another thread built the same client first; theirs is kept
+                return client
+            self.misses += 1
+            self._clients[key] = [built, time.monotonic()]
+            if len(self._clients) > self.max_size:
+                oldest = min(self._clients, key=lambda k: self._clients[k][1])
+                del self._clients[oldest]
+            return built
+
+    def _touch(self, key: tuple) -> Any:
+        entry = self._clients.get(key)
+        if entry is None:
+            return None
+        entry[1] = time.monotonic()
+        self.hits += 1
+        return entry[0]
+
+    def _evict_idle(self, now: float):
+        expired = [k for k, (_, last_used) in self._clients.items() if now - last_used > self.idle_ttl]
+        for k in expired:
+            del self._clients[k]
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._clients), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+llm_pool = LLMClientPool()
@@ -0,0 +1,195 @@
+"""
+Bounded conversation memory for the agent's MEMORY node. The prompt for a
+turn is an optional rolling summary plus the newest messages that fit in a
+token budget (`max_tokens`) and a message cap (`window_size`). Older messages
+are removed from the graph state. If `summarize` is set, they are folded into
+the summary first. With the "sqlite" and "mongodb" backends they are also
+appended to a message store indexed by thread, which a thread without
+state (e.g. after checkpoint retention) resumes from.
+"""
+import asyncio
+import contextlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.messages import (
+    BaseMessage, HumanMessage, RemoveMessage, SystemMessage, message_to_dict, messages_from_dict,
+)
+
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "3000"))
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "300"))
+
+SUMMARY_PROMPT = (
+    "Extend the summary of a conversation with the new messages below. Keep names, facts, "
+    "decisions and open questions; drop small talk. Answer with the updated summary only, "
+    "in at most {max_tokens} tokens.\n\nCurrent summary:\n{summary}\n\nNew messages:\n{messages}"
+)
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    tool_calls = getattr(message, "tool_calls", None)
+    return f"{content} {json.dumps(tool_calls, default=str)}" if tool_calls else str(content)
+
+def count_tokens(messages: List[BaseMessage]) -> int:
+    """Approximate token count (~4 characters per token plus per-message overhead); no tokenizer needed."""
+    return sum(len(_text(m)) // 4 + 4 for m in messages)
+
+def window_start(messages: List[BaseMessage], max_tokens: int, window_size: Optional[int] = None) -> int:
+    """
+    Index of the first message of the newest window within `max_tokens` and
+    `window_size` messages. The window starts at a human message so a tool
+    result never loses the AI message that called it; a single turn larger
+    than the budget is kept whole.
+    """
+    used, start = 0, len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        used += count_tokens([messages[i]])
+        if used > max_tokens or (window_size and len(messages) - i > window_size):
+            break
+        start = i
+    while start < len(messages) and not isinstance(messages[start], HumanMessage):
+        start += 1
+    if start == len(messages):
+        start = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), 0)
+    return start
+
+class SQLiteMessageStore:
+    """Evicted messages per thread in a SQLite file, keyed by (thread_id, seq)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS memory_messages ("
+                " thread_id TEXT NOT NULL, seq INTEGER NOT NULL, message TEXT NOT NULL,"
+                " PRIMARY KEY (thread_id, seq))"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _append(self, thread_id: str, messages: List[BaseMessage]):
+        with self._connect() as conn:
+            last = conn.execute("SELECT MAX(seq) FROM memory_messages WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+            start = -1 if last is None else last
+            conn.executemany(
+                "INSERT INTO memory_messages (thread_id, seq, message) VALUES (?, ?, ?)",
+                [(thread_id, start + 1 + i, json.dumps(message_to_dict(m))) for i, m in enumerate(messages)],
+            )
+
+    def _recent(self, thread_id: str, limit: int) -> List[BaseMessage]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT message FROM memory_messages WHERE thread_id = ? ORDER BY seq DESC LIMIT ?", (thread_id, limit)
+            ).fetchall()
+        return messages_from_dict([json.loads(r[0]) for r in reversed(rows)])
+
+    async def append(self, thread_id: str, messages: List[BaseMessage]):
+        await asyncio.to_thread(self._append, thread_id, messages)
+
+    async def recent(self, thread_id: str, limit: int) -> List[BaseMessage]:
+        return await asyncio.to_thread(self._recent, thread_id, limit)
+
+class MongoMessageStore:
+    """Same as SQLiteMessageStore in a Mongo collection with a (thread_id, seq) index."""
+
+    def __init__(self, db, collection: str = "memory_messages"):
+        self.messages = db[collection]
+        self._indexed = False
+
+    async def _ensure_indexes(self):
+        if not self._indexed:
+            await self.messages.create_index([("thread_id", 1), ("seq", -1)], unique=True)
+            self._indexed = True
+
+    async def append(self, thread_id: str, messages: List[BaseMessage]):
+        await self._ensure_indexes()
+        last = await self.messages.find_one({"thread_id": thread_id}, {"seq": 1}, sort=[("seq", -1)])
+        start = -1 if last is None else last["seq"]
+        await self.messages.insert_many([
+            {"thread_id": thread_id, "seq": start + 1 + i, "message": message_to_dict(m)}
+            for i, m in enumerate(messages)
+        ], ordered=True)
+
+    async def recent(self, thread_id: str, limit: int) -> List[BaseMessage]:
+        await self._ensure_indexes()
+        docs = await self.messages.find({"thread_id": thread_id}, {"message": 1}).sort("seq", -1).limit(limit).to_list(limit)
+        return messages_from_dict([d["message"] for d in reversed(docs)])
+
+_stores: Dict[Tuple[str, str], Any] = {}
+
+def get_message_store(memory_config: Dict[str, Any]):
+    """Shared store for a MEMORY node config, or None for window_buffer."""
+    backend = memory_config.get("type", "window_buffer")
+    if backend == "sqlite":
+        key = (backend, memory_config.get("database_path") or "./memory.db")
+        if key not in _stores:
+            _stores[key] = SQLiteMessageStore(key[1])
+    elif backend == "mongodb":
+        from ..config import get_mongodb_uri
+        from ..db import get_db_from_uri
+        key = (backend, memory_config.get("connection_string") or get_mongodb_uri())
+        if key not in _stores:
+            _stores[key] = MongoMessageStore(get_db_from_uri(key[1])[1])
+    else:
+        return None
+    return _stores[key]
+
+class ConversationMemory:
+    def __init__(self, memory_config: Dict[str, Any], llm=None):
+        self.max_tokens = int(memory_config.get("max_tokens") or MEMORY_MAX_TOKENS)
+        self.window_size = int(memory_config.get("window_size") or 0) or None
+        self.summary_max_tokens = int(memory_config.get("summary_max_tokens") or MEMORY_SUMMARY_MAX_TOKENS)
+        self.llm = llm if memory_config.get("summarize") else None
+        self.store = get_message_store(memory_config)
+
+    async def _summarize(self, summary: Optional[str], evicted: List[BaseMessage]) -> str:
+        transcript = "\n".join(f"{m.type}: {_text(m)}" for m in evicted)
+        response = await self.llm.ainvoke(SUMMARY_PROMPT.format(
+            max_tokens=self.summary_max_tokens, summary=summary or "(none)", messages=transcript,
+        ))
+        # Hard cap in case the model ignores the length instruction
+        return str(response.content)[: self.summary_max_tokens * 4]
+
+    async def prepare(self, state: Dict[str, Any], thread_id: Optional[str]) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+        """
+        (prompt messages, state update) for one agent turn. The update removes
+        evicted messages from state["messages"] and carries the summary in
+        state["memory"].
+        """
+        messages = list(state["messages"])
+        memory = dict(state.get("memory") or {})
+        summary = memory.get("summary")
+        system = [m for m in messages[:1] if isinstance(m, SystemMessage)]
+        messages = messages[len(system):]
+
+        if self.store and thread_id and not memory.get("evicted") and len(messages) == 1:
+            # No in-graph history for this thread: resume from the store
+            history = await self.store.recent(thread_id, self.window_size or 50)
+            if history:
+                history = history[window_start(history, self.max_tokens - count_tokens(messages)):]
+            return system + history + messages, {}
+
+        budget = self.max_tokens - count_tokens(system) - (count_tokens([SystemMessage(summary)]) if summary else 0)
+        start = window_start(messages, budget, self.window_size)
+        evicted, window = messages[:start], messages[start:]
+        update: Dict[str, Any] = {}
+        if evicted:
+            if self.store and thread_id:
+                await self.store.append(thread_id, evicted)
+            if self.llm is not None:
+                summary = await self._summarize(summary, evicted)
+            memory.update(summary=summary, evicted=memory.get("evicted", 0) + len(evicted))
+            update = {"messages": [RemoveMessage(id=m.id) for m in evicted if m.id], "memory": memory}
+        prompt = system + ([SystemMessage(f"Summary of the earlier conversation:\n{summary}")] if summary else []) + window
+        return prompt, update
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List
 from .db import get_db_from_uri
 from .models import ExecutionModel
 from bson import ObjectId
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from .config import SECRET_KEY
+from .config import SECRET_KEY, get_mongodb_uri
+from .pagination import DEFAULT_PAGE_SIZE, paginated_response
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 ALGORITHM = "HS256"
@@ -38,13 +39,13 @@ async def get_execution(execution_id: str, username: str = Depends(get_current_u
     execution["_id"] = str(execution["_id"])
     return execution
 
-@router.get("/", response_model=List[ExecutionModel])
-async def list_executions(username: str = Depends(get_current_user), workflow_id: str = None):
+@router.get("/")
+async def list_executions(username: str = Depends(get_current_user), workflow_id: str = None, after: str = None,
+                          limit: int = Query(DEFAULT_PAGE_SIZE, ge=1), view: str = "full"):
+    """Newest first; pass the X-Next-After header as `after` for the next page. view=summary omits log/result."""
     query = {"user": username}
     if workflow_id:
         query["workflowId"] = workflow_id
-    executions = []
-    async for ex in get_db_from_uri().executions.find(query):
-        ex["_id"] = str(ex["_id"])
-        executions.append(ex)
-    return executions 
\ No newline at end of file
+    _, db = get_db_from_uri(get_mongodb_uri())
+    return await paginated_response(db.executions, query, after, limit, view)
+ 
\ No newline at end of file
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, Body, FastAPI, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Body, FastAPI, Query, status
 from typing import List
 from .db import get_db_from_uri
 from .models import WorkflowModel, ProjectModel
 from bson import ObjectId
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from .config import SECRET_KEY
+from .config import SECRET_KEY, get_mongodb_uri
+from .job_queue import get_job_queue
+from .pagination import DEFAULT_PAGE_SIZE, paginated_response
 from pydantic import BaseModel, Field
 from pymongo import MongoClient
 import pymongo.errors
@@ -42,13 +44,12 @@ async def get_workflow(workflow_id: str, username: str = Depends(get_current_use
     workflow["_id"] = str(workflow["_id"])
     return workflow
 
-@router.get("/", response_model=List[WorkflowModel])
-async def list_workflows(username: str = Depends(get_current_user)):
-    workflows = []
-    async for wf in db.workflows.find({"createdBy": username}):
-        wf["_id"] = str(wf["_id"])
-        workflows.append(wf)
-    return workflows
+@router.get("/")
+async def list_workflows(username: str = Depends(get_current_user), after: str = None,
+                         limit: int = Query(DEFAULT_PAGE_SIZE, ge=1), view: str = "full"):
+    """Newest first; pass the X-Next-After header as `after` for the next page. view=summary omits nodes/connections."""
+    _, db = get_db_from_uri(get_mongodb_uri())
+    return await paginated_response(db.workflows, {"createdBy": username}, after, limit, view)
 
 @router.put("/{workflow_id}", response_model=WorkflowModel)
 async def update_workflow(workflow_id: str, workflow: WorkflowModel, username: str = Depends(get_current_user)):
@@ -75,13 +76,12 @@ async def create_project(project: ProjectModel, username: str = Depends(get_curr
     project_dict["_id"] = str(result.inserted_id)
     return project_dict
 
-@router.get("/projects", response_model=List[ProjectModel])
-async def list_projects(username: str = Depends(get_current_user)):
-    projects = []
-    async for p in db.projects.find({"createdBy": username}):
-        p["_id"] = str(p["_id"])
-        projects.append(p)
-    return projects
+@router.get("/projects")
+async def list_projects(username: str = Depends(get_current_user), after: str = None,
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1)):
+    """Newest first; pass the X-Next-After header as `after` for the next page."""
+    _, db = get_db_from_uri(get_mongodb_uri())
+    return await paginated_response(db.projects, {"createdBy": username}, after, limit)
 
 @router.get("/projects/{project_id}", response_model=ProjectModel)
 async def get_project(project_id: str, username: str = Depends(get_current_user)):
@@ -141,9 +141,10 @@ async def validate_mongodb_connection(request: MongoValidationRequest):
             client.close()
 
 @router.post("/execute/{workflow_id}")
-async def execute_workflow_async(workflow_id: str, background_tasks: BackgroundTasks, username: str = Depends(get_current_user)):
+async def execute_workflow_async(workflow_id: str, username: str = Depends(get_current_user), input: dict = Body(None)):
+    """Queue the workflow for a worker process (python -m src.worker) to run."""
     job_id = str(uuid.uuid4())
-    client, db = get_db_from_uri()  # You may want to use a system connection string for executions
+    client, db = get_db_from_uri(get_mongodb_uri())
     await db.executions.insert_one({
         "job_id": job_id,
         "workflow_id": workflow_id,
@@ -152,12 +153,12 @@ async def execute_workflow_async(workflow_id: str, background_tasks: BackgroundT
         "error": None,
         "user": username
     })
-    background_tasks.add_task(run_workflow_job, workflow_id, job_id, username)
+    await get_job_queue().enqueue(job_id, {"workflow_id": workflow_id, "username": username, "input": input})
     return {"job_id": job_id, "status": "PENDING"}
 
 @router.get("/status/{job_id}")
 async def get_workflow_status(job_id: str, username: str = Depends(get_current_user)):
-    client, db = get_db_from_uri()
+    client, db = get_db_from_uri(get_mongodb_uri())
     execution = await db.executions.find_one({"job_id": job_id, "user": username})
     if not execution:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -166,20 +167,4 @@ async def get_workflow_status(job_id: str, username: str = Depends(get_current_u
         "status": execution["status"],
         "result": execution["result"],
         "error": execution["error"]
-    }
-
-# Helper function for background execution
-async def run_workflow_job(workflow_id: str, job_id: str, username: str):
-    client, db = get_db_from_uri()
-    try:
-        # Load workflow from DB (implement as needed)
-        workflow = await db.workflows.find_one({"_id": ObjectId(workflow_id), "createdBy": username})
-        if not workflow:
-            await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "FAILED", "error": "Workflow not found"}})
-            return
-        # Execute workflow (reuse your engine)
-        from .engine import execute_workflow
-        result = await execute_workflow(workflow)
-        await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "SUCCESS", "result": result}})
-    except Exception as e:
-        await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "FAILED", "error": str(e)}}) 
\ No newline at end of file
+    }
\ No newline at end of file
@@ -0,0 +1,126 @@
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .retry import get_retry_policy
+
+# Number of compiled workflows kept in memory. Shared by the API, the
+# scheduler and the webhook path since they all go through the engine.
+PLAN_CACHE_SIZE = 256
+
+class CompiledCondition:
+    __slots__ = ("path", "equals")
+
+    def __init__(self, cond: Dict[str, Any]):
+        # "json.value" -> ("value",); the leading segment names the item payload
+        self.path = tuple(cond.get("field", "").split(".")[1:])
+        self.equals = cond.get("equals")
+
+    def matches(self, data: Any) -> bool:
+        val = data
+        # Item lists are matched against the first item's json payload
+        if isinstance(val, list):
+            val = val[0].get("json", {}) if val else {}
+        for part in self.path:
+            val = val.get(part) if isinstance(val, dict) else None
+        return val == self.equals
+
+class CompiledWorkflow:
+    """
+    Execution plan for a workflow: node definitions with their resolved node
+    classes and retry policies, adjacency lists, parsed connection conditions
+    and a topological order. Built once per workflow content hash.
+    """
+
+    def __init__(self, workflow_hash: str, nodes: Dict[str, Dict[str, Any]], node_classes: Dict[str, Any],
+                 outgoing: Dict[str, List[Tuple[str, Optional[CompiledCondition]]]],
+                 incoming_count: Dict[str, int], trigger_nodes: List[str], order: List[str], settings: Dict[str, Any]):
+        self.hash = workflow_hash
+        self.nodes = nodes
+        self.node_classes = node_classes
+        self.outgoing = outgoing
+        self.incoming_count = incoming_count
+        self.trigger_nodes = trigger_nodes
+        self.order = order
+        self.settings = settings
+        self.join_modes = {nid: node.get("config", {}).get("join", "all") for nid, node in nodes.items()}
+        self.retry_policies = {nid: get_retry_policy(node["type"], node.get("config")) for nid, node in nodes.items()}
+
+def workflow_hash(workflow: Dict[str, Any]) -> str:
+    """Hash of the parts of a workflow that affect execution (not _id, name, timestamps)."""
+    content = {
+        "nodes": workflow.get("nodes", []),
+        "connections": workflow.get("connections", []),
+        "settings": workflow.get("settings") or {},
+    }
+    data = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.sha256(data).hexdigest()
+
+def compile_workflow(workflow: Dict[str, Any], resolve_node_class: Callable[[str], Any], workflow_hash_: str = None) -> CompiledWorkflow:
+    # Plans outlive the request that compiled them, so they must not share the caller's dicts
+    workflow = copy.deepcopy({"nodes": workflow["nodes"], "connections": workflow.get("connections", []),
+                              "settings": workflow.get("settings") or {}})
+    nodes = {node["id"] if "id" in node else str(i): node for i, node in enumerate(workflow["nodes"])}
+    outgoing = {nid: [] for nid in nodes}
+    incoming_count = {nid: 0 for nid in nodes}
+    for conn in workflow.get("connections", []):
+        if conn["source"] not in nodes or conn["target"] not in nodes:
+            raise ValueError(f"Connection references unknown node: {conn['source']} -> {conn['target']}")
+        cond = conn.get("conditions")
+        outgoing[conn["source"]].append((conn["target"], CompiledCondition(cond) if cond else None))
+        incoming_count[conn["target"]] += 1
+
+    # Kahn's algorithm; anything left over is part of a cycle
+    remaining = dict(incoming_count)
+    ready = [nid for nid, count in remaining.items() if count == 0]
+    order = []
+    while ready:
+        nid = ready.pop()
+        order.append(nid)
+        for target, _ in outgoing[nid]:
+            remaining[target] -= 1
+            if remaining[target] == 0:
+                ready.append(target)
+    if len(order) != len(nodes):
+        raise ValueError("Workflow contains cycles")
+
+    trigger_nodes = [nid for nid, node in nodes.items() if node["type"].endswith("TriggerNode")]
+    if not trigger_nodes and nodes:
+        trigger_nodes = [next(iter(nodes))]
+    node_classes = {nid: resolve_node_class(node["type"]) for nid, node in nodes.items()}
+    return CompiledWorkflow(
+        workflow_hash_ or workflow_hash(workflow), nodes, node_classes, outgoing,
+        incoming_count, trigger_nodes, order, workflow.get("settings") or {},
+    )
+
+class PlanCache:
+    """LRU cache of CompiledWorkflow objects keyed by workflow content hash."""
+
+    def __init__(self, maxsize: int = PLAN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[str, CompiledWorkflow]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, workflow: Dict[str, Any], resolve_node_class: Callable[[str], Any]) -> CompiledWorkflow:
+        key = workflow_hash(workflow)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+        self.misses += 1
+        plan = compile_workflow(workflow, resolve_node_class, key)
+        self._plans[key] = plan
+        if len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        self._plans.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._plans), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+plan_cache = PlanCache()
@@ -33,4 +33,63 @@ def get_database_name() -> str:
     """Get database name from URI or default"""
     if "lawsa" in MONGODB_URL:
         return "lawsa"
-    return "yourappdb" 
\ No newline at end of file
+    return "yourappdb" 
+
+# Outbound HTTP connection pooling (shared by all workflow nodes)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+# Durable execution queue ("sqlite" for single-host/offline, "mongo" for shared)
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "sqlite")
+QUEUE_SQLITE_PATH = os.getenv("QUEUE_SQLITE_PATH", "job_queue.sqlite")
+QUEUE_VISIBILITY_TIMEOUT = float(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "300"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "1"))
+
+# LLM response cache, opt-in per node with config "cache" ("memory", "sqlite" or "mongo")
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "llm_cache.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# CodeNode sandbox: worker processes and per-snippet limits
+SANDBOX_PROCESSES = int(os.getenv("SANDBOX_PROCESSES", str(os.cpu_count() or 1)))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "5"))
+# The worker running a call is killed after this long, whatever the call is doing
+SANDBOX_WALL_SECONDS = float(os.getenv("SANDBOX_WALL_SECONDS", "15"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "512"))
+SANDBOX_CODE_CACHE_SIZE = int(os.getenv("SANDBOX_CODE_CACHE_SIZE", "256"))
+
+# Finished executions older than this are removed by a Mongo TTL index
+EXECUTION_RETENTION_DAYS = int(os.getenv("EXECUTION_RETENTION_DAYS", "30"))
+
+# Agent conversation checkpoints ("sqlite" for a single node, "mongo" when shared)
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "checkpoints.sqlite")
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_RETENTION_DAYS = float(os.getenv("CHECKPOINT_RETENTION_DAYS", "30"))
+CHECKPOINT_COMPACT_INTERVAL = float(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "3600"))
+# A growing list channel (e.g. messages) is stored as appended items; every
+# CHECKPOINT_DELTA_CHAIN deltas it is written in full to bound the reads of a load
+CHECKPOINT_DELTA_CHAIN = int(os.getenv("CHECKPOINT_DELTA_CHAIN", "50"))
+# Threads whose last list values are kept in memory to compute those deltas
+CHECKPOINT_DELTA_CACHE = int(os.getenv("CHECKPOINT_DELTA_CACHE", "1024"))
+
+# Local vector memory (ChromaRememberNode / ChromaRecallNode)
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "vector_store")
+VECTOR_EMBEDDER = os.getenv("VECTOR_EMBEDDER", "hashing")
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "384"))
+VECTOR_IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "16"))
+# Seconds between saves of a changed HNSW index (it is also saved on close)
+VECTOR_INDEX_FLUSH_SECONDS = float(os.getenv("VECTOR_INDEX_FLUSH_SECONDS", "30"))
+
+# Outbound rate governor: per-provider limits as JSON, e.g. {"groq": {"rpm": 30, "tpm": 6000}},
+# merged over the defaults in src/rate_limit.py; "mongo" shares the budget across processes
+RATE_LIMITS_JSON = os.getenv("RATE_LIMITS_JSON", "")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+
+# Token budget for search results placed in an LLM prompt (SearchContextNode)
+SEARCH_CONTEXT_MAX_TOKENS = int(os.getenv("SEARCH_CONTEXT_MAX_TOKENS", "1500"))
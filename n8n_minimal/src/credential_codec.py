@@ -0,0 +1,30 @@
+import ast
+import json
+from typing import Any, Dict
+from cryptography.fernet import Fernet
+
+# Plaintext layout inside the Fernet token: b"v1:" + canonical JSON (UTF-8).
+# Payloads written before versioning are str(dict) reprs; they start with "{"
+# and are parsed with ast.literal_eval, never eval.
+CODEC_VERSION = 1
+_V1_PREFIX = b"v1:"
+
+def encode_credential_data(data: Dict[str, Any]) -> bytes:
+    return _V1_PREFIX + json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+def is_legacy_payload(plaintext: bytes) -> bool:
+    return not plaintext.startswith(_V1_PREFIX)
+
+def decode_credential_data(plaintext: bytes) -> Dict[str, Any]:
+    if plaintext.startswith(_V1_PREFIX):
+        return json.loads(plaintext[len(_V1_PREFIX):])
+    data = ast.literal_eval(plaintext.decode())
+    if not isinstance(data, dict):
+        raise ValueError("Legacy credential payload is not a dict")
+    return data
+
+def encrypt_credential_data(fernet: Fernet, data: Dict[str, Any]) -> str:
+    return fernet.encrypt(encode_credential_data(data)).decode()
+
+def decrypt_credential_data(fernet: Fernet, token: str) -> Dict[str, Any]:
+    return decode_credential_data(fernet.decrypt(token))
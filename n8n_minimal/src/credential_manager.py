@@ -1,5 +1,9 @@
+import copy
 import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from cryptography.fernet import Fernet
 from .schemas import (
@@ -7,7 +11,9 @@ from .schemas import (
     CredentialValidationRequest, CredentialValidationResponse,
     WorkflowGraph, WorkflowNode, NodeType
 )
+from .config import get_mongodb_uri
 from .db import get_db_from_uri
+from .credential_codec import encrypt_credential_data, decrypt_credential_data
 from .audit import log_audit_action
 import logging
 
@@ -19,11 +25,46 @@ if not FERNET_KEY:
     raise RuntimeError("FERNET_KEY environment variable must be set for credential encryption.")
 fernet = Fernet(FERNET_KEY.encode() if isinstance(FERNET_KEY, str) else FERNET_KEY)
 
+# Seconds a decrypted credential is reused before it is read from the database again
+CREDENTIAL_CACHE_TTL = float(os.environ.get("CREDENTIAL_CACHE_TTL", "60"))
+# Decrypted credentials kept at most; the least recently used are evicted first
+CREDENTIAL_CACHE_MAX_ENTRIES = int(os.environ.get("CREDENTIAL_CACHE_MAX_ENTRIES", "1024"))
+
 class CredentialManager:
     """Manages user credentials for workflow execution"""
     
-    def __init__(self):
-        self.db = get_db_from_uri()
+    def __init__(self, max_cached: int = CREDENTIAL_CACHE_MAX_ENTRIES, cache_ttl: float = CREDENTIAL_CACHE_TTL):
+        _, self.db = get_db_from_uri(get_mongodb_uri())
+        self.max_cached = max_cached
+        self.cache_ttl = cache_ttl
+        # LRU of (user_id, credential_id) -> (expires_at, decrypted credential);
+        # callers always get a copy, so a node editing its credential cannot change the cached one
+        self._secret_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _cached_credential(self, user_id: str, credential_id: str) -> Optional[Dict[str, Any]]:
+        key = (user_id, credential_id)
+        with self._cache_lock:
+            entry = self._secret_cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._secret_cache[key]
+                return None
+            self._secret_cache.move_to_end(key)
+            return copy.deepcopy(entry[1])
+    
+    def _cache_credential(self, user_id: str, credential: Dict[str, Any]):
+        key = (user_id, credential["id"])
+        with self._cache_lock:
+            self._secret_cache[key] = (time.monotonic() + self.cache_ttl, copy.deepcopy(credential))
+            self._secret_cache.move_to_end(key)
+            while len(self._secret_cache) > self.max_cached:
+                self._secret_cache.popitem(last=False)
+    
+    def _invalidate_cached_credential(self, user_id: str, credential_id: str):
+        with self._cache_lock:
+            self._secret_cache.pop((user_id, credential_id), None)
     
     def encrypt_data(self, data: str) -> str:
         """Encrypt sensitive data"""
@@ -42,7 +83,7 @@ class CredentialManager:
                 raise ValueError(f"Invalid credential data: {validation.message}")
             
             # Encrypt the credential data
-            encrypted_data = self.encrypt_data(str(request.data))
+            encrypted_data = encrypt_credential_data(fernet, request.data)
             
             # Create credential document
             credential_id = str(uuid.uuid4())
@@ -75,30 +116,54 @@ class CredentialManager:
             logger.error(f"Failed to create credential for user {user_id}: {e}")
             raise
     
+    def _credential_from_doc(self, credential_doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": credential_doc["_id"],
+            "name": credential_doc["name"],
+            "type": credential_doc["type"],
+            "provider": credential_doc.get("provider"),
+            "description": credential_doc.get("description"),
+            "data": decrypt_credential_data(fernet, credential_doc["encrypted_data"]),
+            "created_at": credential_doc.get("created_at")
+        }
+    
+    async def get_credentials(self, user_id: str, credential_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve several credentials of a user at once. Recently decrypted
+        credentials come from a bounded LRU cache with a TTL; the rest are
+        fetched with a single $in query and decrypted once each. Unknown or
+        inactive ids are left out of the result.
+        """
+        resolved = {}
+        missing = []
+        for credential_id in dict.fromkeys(credential_ids):
+            credential = self._cached_credential(user_id, credential_id)
+            if credential is not None:
+                resolved[credential_id] = credential
+            else:
+                missing.append(credential_id)
+        
+        if missing:
+            async for credential_doc in self.db.credentials.find({
+                "_id": {"$in": missing},
+                "user_id": user_id,
+                "is_active": True
+            }):
+                try:
+                    credential = self._credential_from_doc(credential_doc)
+                except Exception as e:
+                    logger.error(f"Failed to decrypt credential {credential_doc['_id']} for user {user_id}: {e}")
+                    continue
+                self._cache_credential(user_id, credential)
+                resolved[credential["id"]] = credential
+        
+        return resolved
+    
     async def get_credential(self, user_id: str, credential_id: str) -> Optional[Dict[str, Any]]:
         """Get a credential for a user"""
         try:
-            credential_doc = await self.db.credentials.find_one({
-                "_id": credential_id,
-                "user_id": user_id,
-                "is_active": True
-            })
-            
-            if not credential_doc:
-                return None
-            
-            # Decrypt the data
-            decrypted_data = self.decrypt_data(credential_doc["encrypted_data"])
-            
-            return {
-                "id": credential_doc["_id"],
-                "name": credential_doc["name"],
-                "type": credential_doc["type"],
-                "provider": credential_doc.get("provider"),
-                "description": credential_doc.get("description"),
-                "data": eval(decrypted_data),  # Convert string back to dict
-                "created_at": credential_doc.get("created_at")
-            }
+            credentials = await self.get_credentials(user_id, [credential_id])
+            return credentials.get(credential_id)
             
         except Exception as e:
             logger.error(f"Failed to get credential {credential_id} for user {user_id}: {e}")
@@ -138,7 +203,7 @@ class CredentialManager:
                 update_data["description"] = updates["description"]
             if "data" in updates:
                 # Re-encrypt the data
-                encrypted_data = self.encrypt_data(str(updates["data"]))
+                encrypted_data = encrypt_credential_data(fernet, updates["data"])
                 update_data["encrypted_data"] = encrypted_data
             
             if not update_data:
@@ -148,6 +213,7 @@ class CredentialManager:
                 {"_id": credential_id, "user_id": user_id, "is_active": True},
                 {"$set": update_data}
             )
+            self._invalidate_cached_credential(user_id, credential_id)
             
             if result.modified_count > 0:
                 log_audit_action(user_id, "update_credential", {
@@ -170,6 +236,7 @@ class CredentialManager:
                 {"_id": credential_id, "user_id": user_id},
                 {"$set": {"is_active": False}}
             )
+            self._invalidate_cached_credential(user_id, credential_id)
             
             if result.modified_count > 0:
                 log_audit_action(user_id, "delete_credential", {
@@ -412,18 +479,26 @@ class CredentialManager:
     async def inject_credentials_into_workflow(self, user_id: str, workflow: WorkflowGraph) -> WorkflowGraph:
         """Inject user credentials into workflow nodes"""
         try:
-            # Get all user credentials
-            user_credentials = await self.list_credentials(user_id)
-            credential_map = {cred["id"]: cred for cred in user_credentials}
+            credential_nodes = [
+                node for node in workflow.nodes
+                if node.type in (NodeType.LLM, NodeType.TOOL, NodeType.MEMORY) and node.config.get("credential_id")
+            ]
+            # Resolve every referenced credential in one round trip
+            credentials = await self.get_credentials(
+                user_id, [node.config["credential_id"] for node in credential_nodes]
+            )
             
             # Process each node
-            for node in workflow.nodes:
+            for node in credential_nodes:
+                credential = credentials.get(node.config["credential_id"])
+                if not credential:
+                    continue
                 if node.type == NodeType.LLM:
-                    await self._inject_llm_credentials(node, user_id, credential_map)
+                    self._inject_llm_credentials(node, credential)
                 elif node.type == NodeType.TOOL:
-                    await self._inject_tool_credentials(node, user_id, credential_map)
+                    self._inject_tool_credentials(node, credential)
                 elif node.type == NodeType.MEMORY:
-                    await self._inject_memory_credentials(node, user_id, credential_map)
+                    self._inject_memory_credentials(node, credential)
             
             return workflow
             
@@ -431,38 +506,20 @@ class CredentialManager:
             logger.error(f"Failed to inject credentials into workflow for user {user_id}: {e}")
             raise
     
-    async def _inject_llm_credentials(self, node: WorkflowNode, user_id: str, credential_map: Dict[str, Any]):
+    def _inject_llm_credentials(self, node: WorkflowNode, credential: Dict[str, Any]):
         """Inject credentials into LLM node"""
-        config = node.config
-        credential_id = config.get("credential_id")
-        
-        if credential_id and credential_id in credential_map:
-            credential = await self.get_credential(user_id, credential_id)
-            if credential:
-                config["api_key"] = credential["data"].get("api_key")
-                logger.info(f"Injected credential {credential_id} into LLM node {node.id}")
+        node.config["api_key"] = credential["data"].get("api_key")
+        logger.info(f"Injected credential {credential['id']} into LLM node {node.id}")
     
-    async def _inject_tool_credentials(self, node: WorkflowNode, user_id: str, credential_map: Dict[str, Any]):
+    def _inject_tool_credentials(self, node: WorkflowNode, credential: Dict[str, Any]):
         """Inject credentials into tool node"""
-        config = node.config
-        credential_id = config.get("credential_id")
-        
-        if credential_id and credential_id in credential_map:
-            credential = await self.get_credential(user_id, credential_id)
-            if credential:
-                config["api_key"] = credential["data"].get("api_key")
-                logger.info(f"Injected credential {credential_id} into tool node {node.id}")
+        node.config["api_key"] = credential["data"].get("api_key")
+        logger.info(f"Injected credential {credential['id']} into tool node {node.id}")
     
-    async def _inject_memory_credentials(self, node: WorkflowNode, user_id: str, credential_map: Dict[str, Any]):
+    def _inject_memory_credentials(self, node: WorkflowNode, credential: Dict[str, Any]):
         """Inject credentials into memory node"""
-        config = node.config
-        credential_id = config.get("credential_id")
-        
-        if credential_id and credential_id in credential_map:
-            credential = await self.get_credential(user_id, credential_id)
-            if credential:
-                config["connection_string"] = credential["data"].get("connection_string")
-                logger.info(f"Injected credential {credential_id} into memory node {node.id}")
+        node.config["connection_string"] = credential["data"].get("connection_string")
+        logger.info(f"Injected credential {credential['id']} into memory node {node.id}")
     
     async def get_workflow_credential_requirements(self, workflow: WorkflowGraph) -> Dict[str, Any]:
         """Analyze workflow and return required credentials"""
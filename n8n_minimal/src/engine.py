@@ -1,7 +1,13 @@
 import importlib
-from typing import Dict, Any, List
+import functools
+from typing import Dict, Any, List, Optional, Union, AsyncIterator, Tuple
 from .models import WorkflowModel, NodeModel
+from .compiler import CompiledWorkflow, plan_cache
+from .http_pool import HttpClientRegistry, http_clients as default_http_clients
+from .tracing import tracer, payload_size
+from .retry import RetryBudget, RetryPolicy, WORKFLOW_RETRY_BUDGET
 import asyncio
+import time
 
 NODE_CLASS_MAP = {
     "ManualTriggerNode": "nodes.manual_trigger.ManualTriggerNode",
@@ -16,61 +22,268 @@ NODE_CLASS_MAP = {
     "OpenAINode": "nodes.openai_node.OpenAINode",
     "AnthropicNode": "nodes.anthropic_node.AnthropicNode",
     "TavilyNode": "nodes.tavily_node.TavilyNode",
+    "ChromaRememberNode": "nodes.chroma_remember_node.ChromaRememberNode",
+    "ChromaRecallNode": "nodes.chroma_recall_node.ChromaRecallNode",
+    "SearchContextNode": "nodes.search_context_node.SearchContextNode",
 }
 
-RETRYABLE_ERRORS = (asyncio.TimeoutError,)
-MAX_RETRIES = 3
+# Upper bound on nodes running at once within a single workflow run.
+# Can be overridden per workflow with settings.max_concurrency.
+MAX_CONCURRENCY = 10
+# Items buffered per node inbox in streaming mode. Producers block when a
+# consumer's inbox is full, so memory is bounded by this, not the data size.
+STREAM_BUFFER_SIZE = 100
+_END = object()
 
+class NodeExecutionError(Exception):
+    def __init__(self, node_id: str, error: Any):
+        super().__init__(str(error))
+        self.node_id = node_id
+        self.error = error
+
+@functools.lru_cache(maxsize=None)
 def get_node_class(node_type: str):
     module_path, class_name = NODE_CLASS_MAP[node_type].rsplit(".", 1)
     module = importlib.import_module(f"src.{module_path}")
     return getattr(module, class_name)
 
-async def execute_workflow(workflow: Dict[str, Any], input_data: Any = None, job_id: str = None, db=None) -> Any:
-    nodes = {node["id"] if "id" in node else str(i): node for i, node in enumerate(workflow["nodes"])}
-    connections = workflow.get("connections", [])
-    trigger_nodes = [nid for nid, node in nodes.items() if node["type"].endswith("TriggerNode")]
-    if not trigger_nodes:
-        trigger_nodes = [list(nodes.keys())[0]]
-    queue = [(nid, input_data) for nid in trigger_nodes]
+def get_compiled_workflow(workflow: Union[Dict[str, Any], CompiledWorkflow]) -> CompiledWorkflow:
+    """Return the cached execution plan for a workflow, compiling it on first use."""
+    if isinstance(workflow, CompiledWorkflow):
+        return workflow
+    return plan_cache.get(workflow, get_node_class)
+
+def _owner(workflow: Union[Dict[str, Any], CompiledWorkflow]) -> Optional[str]:
+    """User a run's spans belong to; plans are shared across owners so it comes from the dict."""
+    return workflow.get("createdBy") if isinstance(workflow, dict) else None
+
+def _normalize_result(result: Any):
+    """
+    Nodes either return a status object ({'status': ..., 'data'/'error': ...})
+    or a plain list of items. Returns (ok, data, error).
+    """
+    if isinstance(result, dict) and "status" in result:
+        if result["status"] == "SUCCESS":
+            return True, result.get("data"), None
+        return False, None, result.get("error")
+    return True, result, None
+
+def _join_inputs(inputs: Dict[str, Any]) -> Any:
+    """Merge the outputs delivered by several parents into one node input."""
+    if len(inputs) == 1:
+        return next(iter(inputs.values()))
+    if all(isinstance(v, list) for v in inputs.values()):
+        return [item for v in inputs.values() for item in v]
+    return inputs
+
+async def _run_node(nid: str, NodeClass: Any, node_def: Dict[str, Any], data: Any, semaphore: asyncio.Semaphore, options: Dict[str, Any], policy: RetryPolicy, budget: RetryBudget) -> Any:
+    span = tracer.start_span(options["trace_id"], nid, node_def["type"], options["owner"])
+    try:
+        output = await _execute_with_retries(nid, NodeClass, node_def, data, semaphore, options, policy, budget, span)
+        if tracer.measure_payloads and tracer.enabled:
+            span.payload_bytes = payload_size(output)
+        return output
+    except NodeExecutionError as e:
+        span.status = "ERROR"
+        span.error = str(e.error)
+        raise
+    finally:
+        tracer.end_span(span)
+
+async def _execute_with_retries(nid, NodeClass, node_def, data, semaphore, options, policy, budget, span) -> Any:
+    node = NodeClass(node_def.get("config", {}), node_def.get("credentials", {}))
+    for attempt in range(policy.max_attempts):
+        span.retries = attempt
+        exc = None
+        try:
+            waiting_since = time.time()
+            async with semaphore:
+                span.queue_wait += time.time() - waiting_since
+                result = await node.execute(data, options)
+            span.attributes.update(getattr(node, "span_attributes", None) or {})
+            ok, output, error = _normalize_result(result)
+            if ok:
+                return output
+            if not policy.retry_failed_results:
+                raise NodeExecutionError(nid, error)
+        except NodeExecutionError:
+            raise
+        except Exception as e:
+            if not policy.is_retryable(e):
+                raise NodeExecutionError(nid, str(e))
+            exc, error = e, str(e)
+        if attempt == policy.max_attempts - 1 or not budget.try_acquire():
+            raise NodeExecutionError(nid, error)
+        # Sleeps outside the semaphore so other ready branches keep running
+        await asyncio.sleep(policy.delay(attempt, exc))
+
+async def execute_workflow(workflow: Union[Dict[str, Any], CompiledWorkflow], input_data: Any = None, job_id: str = None, db=None, max_concurrency: int = None, http_clients: HttpClientRegistry = None) -> Any:
+    """
+    Run the workflow as a DAG: every node whose inputs are ready is started as
+    its own task, bounded by a per-workflow concurrency cap.
+
+    A node with several incoming connections waits for all of its parents by
+    default (config "join": "all") and receives their merged output. With
+    "join": "any" it runs as soon as the first parent delivers data. Parents
+    whose connection condition does not match count as skipped; a node whose
+    parents were all skipped is skipped as well.
+
+    `workflow` may be a workflow dict or a CompiledWorkflow; dicts are planned
+    once per content hash and served from the shared plan cache afterwards.
+
+    Nodes receive the engine's pooled HTTP clients as options['http_clients'].
+    Each node execution is recorded as a tracing span (see src/tracing.py).
+
+    Failed nodes are retried according to their RetryPolicy (src/retry.py),
+    with jittered exponential backoff and Retry-After support, until the
+    workflow-wide retry budget (settings.retry_budget) runs out.
+    """
+    plan = get_compiled_workflow(workflow)
+    nodes = plan.nodes
+
+    if max_concurrency is None:
+        max_concurrency = plan.settings.get("max_concurrency", MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    options = {"http_clients": http_clients or default_http_clients, "trace_id": tracer.new_trace_id(), "owner": _owner(workflow)}
+    budget = RetryBudget(plan.settings.get("retry_budget", WORKFLOW_RETRY_BUDGET))
+
     results = {}
-    while queue:
-        nid, data = queue.pop(0)
-        node_def = nodes[nid]
-        NodeClass = get_node_class(node_def["type"])
-        node = NodeClass(node_def.get("config", {}), node_def.get("credentials", {}))
-        # Retry logic
-        for attempt in range(MAX_RETRIES):
-            try:
-                result = await node.execute(data)
-                if result.get("status") == "SUCCESS":
-                    results[nid] = result["data"]
-                    break
-                else:
-                    if attempt == MAX_RETRIES - 1:
-                        if db and job_id:
-                            await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "FAILED", "error": result.get("error")}})
-                        return {"error": result.get("error"), "node": nid}
-            except RETRYABLE_ERRORS as e:
-                if attempt == MAX_RETRIES - 1:
-                    if db and job_id:
-                        await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "FAILED", "error": str(e)}})
-                    return {"error": str(e), "node": nid}
-                await asyncio.sleep(1)
-            except Exception as e:
-                if db and job_id:
-                    await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "FAILED", "error": str(e)}})
-                return {"error": str(e), "node": nid}
-        outgoing = [c for c in connections if c["source"] == nid]
-        for conn in outgoing:
-            cond = conn.get("conditions")
-            if cond:
-                field = cond.get("field")
-                equals = cond.get("equals")
-                val = results[nid]
-                for part in field.split(".")[1:]:
-                    val = val.get(part)
-                if val != equals:
-                    continue
-            queue.append((conn["target"], results[nid]))
-    return results 
\ No newline at end of file
+    # Per node: parent id -> delivered data, and number of edges resolved so far
+    delivered = {nid: {} for nid in nodes}
+    resolved = {nid: 0 for nid in nodes}
+    started = set()
+    tasks = {}
+
+    def start(nid: str, data: Any):
+        started.add(nid)
+        task = asyncio.create_task(_run_node(
+            nid, plan.node_classes[nid], nodes[nid], data, semaphore, options, plan.retry_policies[nid], budget,
+        ))
+        tasks[task] = nid
+
+    def resolve_edge(source: str, target: str, data: Any = None, skipped: bool = False):
+        if target in started:
+            return
+        resolved[target] += 1
+        if not skipped:
+            delivered[target][source] = data
+        if plan.join_modes[target] == "any" and delivered[target]:
+            start(target, _join_inputs(delivered[target]))
+        elif resolved[target] == plan.incoming_count[target]:
+            if delivered[target]:
+                start(target, _join_inputs(delivered[target]))
+            else:
+                skip(target)
+
+    def skip(nid: str):
+        started.add(nid)
+        for target, _ in plan.outgoing[nid]:
+            resolve_edge(nid, target, skipped=True)
+
+    for nid in plan.trigger_nodes:
+        start(nid, input_data)
+
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                nid = tasks.pop(task)
+                results[nid] = task.result()
+                for target, cond in plan.outgoing[nid]:
+                    if cond is not None and not cond.matches(results[nid]):
+                        resolve_edge(nid, target, skipped=True)
+                    else:
+                        resolve_edge(nid, target, results[nid])
+    except NodeExecutionError as e:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if db and job_id:
+            await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "FAILED", "error": e.error}})
+        return {"error": e.error, "node": e.node_id}
+    return results
+
+async def stream_workflow(workflow: Union[Dict[str, Any], CompiledWorkflow], input_data: Any = None, buffer_size: int = STREAM_BUFFER_SIZE, http_clients: HttpClientRegistry = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Item-streaming execution mode. Every node runs as a long-lived task that
+    consumes upstream items through Node.stream() and pushes its own items to
+    its children through bounded queues (backpressure). Connection conditions
+    are evaluated per item. Yields (node_id, item) for items produced by leaf
+    nodes instead of materializing every node's output.
+
+    Nodes are not retried in this mode since part of their output may already
+    have been consumed downstream.
+    """
+    plan = get_compiled_workflow(workflow)
+    options = {"http_clients": http_clients or default_http_clients, "trace_id": tracer.new_trace_id(), "owner": _owner(workflow)}
+    inboxes = {nid: asyncio.Queue(maxsize=buffer_size) for nid in plan.nodes if plan.incoming_count[nid]}
+    outbox = asyncio.Queue(maxsize=buffer_size)
+    leaves = [nid for nid in plan.nodes if not plan.outgoing[nid]]
+    trigger_items = input_data if isinstance(input_data, list) else ([] if input_data is None else [input_data])
+
+    async def read_inbox(nid: str):
+        remaining = plan.incoming_count[nid]
+        while remaining:
+            item = await inboxes[nid].get()
+            if item is _END:
+                remaining -= 1
+            else:
+                yield item
+
+    async def from_list(items: List[Any]):
+        for item in items:
+            yield item
+
+    async def run(nid: str):
+        node_def = plan.nodes[nid]
+        node = plan.node_classes[nid](node_def.get("config", {}), node_def.get("credentials", {}))
+        if nid in plan.trigger_nodes:
+            inputs = from_list(trigger_items) if trigger_items else None
+        elif plan.incoming_count[nid]:
+            inputs = read_inbox(nid)
+        else:
+            inputs = from_list([])
+        span = tracer.start_span(options["trace_id"], nid, node_def["type"], options["owner"])
+        span.attributes["node.items"] = 0
+        try:
+            async for item in node.stream(inputs, options):
+                span.attributes["node.items"] += 1
+                if tracer.measure_payloads and tracer.enabled:
+                    span.payload_bytes += payload_size(item)
+                if not plan.outgoing[nid]:
+                    await outbox.put((nid, item))
+                for target, cond in plan.outgoing[nid]:
+                    if cond is None or cond.matches([item]):
+                        await inboxes[target].put(item)
+            # Drain anything the node did not consume so parents never block
+            if inputs is not None:
+                async for _ in inputs:
+                    pass
+        except Exception as e:
+            span.status = "ERROR"
+            span.error = str(e)
+            tracer.end_span(span)
+            # Reported through the outbox so the consumer fails fast
+            await outbox.put((nid, NodeExecutionError(nid, str(e))))
+            return
+        tracer.end_span(span)
+        for target, _ in plan.outgoing[nid]:
+            await inboxes[target].put(_END)
+        if not plan.outgoing[nid]:
+            await outbox.put((nid, _END))
+
+    tasks = [asyncio.create_task(run(nid)) for nid in plan.nodes]
+    try:
+        open_leaves = len(leaves)
+        while open_leaves:
+            nid, item = await outbox.get()
+            if item is _END:
+                open_leaves -= 1
+            elif isinstance(item, NodeExecutionError):
+                raise item
+            else:
+                yield nid, item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
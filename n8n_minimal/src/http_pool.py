@@ -0,0 +1,75 @@
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from urllib.parse import urlsplit
+import httpx
+from .config import (
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY,
+    HTTP_TIMEOUT, HTTP2_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class HttpClientRegistry:
+    """
+    Engine-owned registry of pooled httpx.AsyncClient instances, one per
+    scheme+host, so repeated node runs reuse warm keep-alive connections
+    instead of paying a TCP+TLS handshake each time. Connections are bound
+    to the event loop that opened them, so each loop gets clients of its
+    own; a loop's clients are dropped with the loop.
+    """
+
+    def __init__(self, max_connections: int = HTTP_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+                 timeout: float = HTTP_TIMEOUT,
+                 http2: bool = HTTP2_ENABLED):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        # event loop -> {scheme://host: client}
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                clients[key] = client
+        return client
+
+    async def aclose(self):
+        """Close every client: this loop's here, those of other running loops on their own loop."""
+        current = asyncio.get_running_loop()
+        with self._lock:
+            pools = list(self._clients.items())
+            self._clients.clear()
+        for loop, clients in pools:
+            if loop is current:
+                await _close_all(clients.values())
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(_close_all(list(clients.values())), loop)
+
+async def _close_all(clients):
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception:
+            logger.debug("Closing a pooled HTTP client failed", exc_info=True)
+
+# Process-wide default registry
+http_clients = HttpClientRegistry()
@@ -0,0 +1,107 @@
+"""
+Index declarations for the application's Mongo collections. ensure_indexes()
+runs at startup and is idempotent: existing indexes are left alone, missing
+ones are created and a changed TTL is applied with collMod.
+"""
+import logging
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from .config import EXECUTION_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "workflows": [
+        IndexModel([("createdBy", ASCENDING), ("_id", DESCENDING)], name="createdBy_id"),
+    ],
+    "projects": [
+        IndexModel([("createdBy", ASCENDING), ("_id", DESCENDING)], name="createdBy_id"),
+    ],
+    "executions": [
+        IndexModel([("job_id", ASCENDING)], name="job_id"),
+        IndexModel([("user", ASCENDING), ("_id", DESCENDING)], name="user_id"),
+        IndexModel([("user", ASCENDING), ("workflowId", ASCENDING), ("_id", DESCENDING)], name="user_workflowId_id"),
+        # Only finished executions carry finishedAt, so pending ones never expire
+        IndexModel([("finishedAt", ASCENDING)], name="finishedAt_ttl",
+                   expireAfterSeconds=EXECUTION_RETENTION_DAYS * 86400),
+    ],
+    "credentials": [
+        IndexModel([("user_id", ASCENDING), ("is_active", ASCENDING)], name="user_id_is_active"),
+        IndexModel([("userId", ASCENDING)], name="userId"),
+        IndexModel([("credential_id", ASCENDING)], name="credential_id", sparse=True),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username", unique=True),
+        IndexModel([("email", ASCENDING)], name="email", sparse=True),
+    ],
+}
+
+# Representative query shapes of the API, checked by check_query_plans()
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"collection": "workflows", "filter": {"createdBy": "u"}, "sort": [("_id", DESCENDING)]},
+    {"collection": "projects", "filter": {"createdBy": "u"}, "sort": [("_id", DESCENDING)]},
+    {"collection": "executions", "filter": {"job_id": "j", "user": "u"}},
+    {"collection": "executions", "filter": {"user": "u"}, "sort": [("_id", DESCENDING)]},
+    {"collection": "executions", "filter": {"user": "u", "workflowId": "w"}, "sort": [("_id", DESCENDING)]},
+    {"collection": "credentials", "filter": {"user_id": "u", "is_active": True}},
+    {"collection": "credentials", "filter": {"userId": "u"}},
+    {"collection": "users", "filter": {"username": "u"}},
+    {"collection": "users", "filter": {"email": "e"}},
+]
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    summary = {"created": [], "existing": [], "updated": [], "failed": []}
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        for model in models:
+            spec = model.document
+            name = f"{collection}.{spec['name']}"
+            current = existing.get(spec["name"])
+            if current is None:
+                try:
+                    await db[collection].create_indexes([model])
+                    summary["created"].append(name)
+                except OperationFailure as e:
+                    # e.g. duplicate usernames in old data blocking a unique index
+                    logger.error(f"Could not create index {name}: {e}")
+                    summary["failed"].append(name)
+            elif "expireAfterSeconds" in spec and current.get("expireAfterSeconds") != spec["expireAfterSeconds"]:
+                await db.command("collMod", collection, index={
+                    "keyPattern": dict(spec["key"]), "expireAfterSeconds": spec["expireAfterSeconds"],
+                })
+                summary["updated"].append(name)
+            else:
+                summary["existing"].append(name)
+    return summary
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage")]
+    for child in ("inputStage", "queryPlan"):
+        if child in plan:
+            stages += _plan_stages(plan[child])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return [stage for stage in stages if stage]
+
+async def check_query_plans(db) -> List[Dict[str, Any]]:
+    """
+    explain() every query shape in QUERY_SHAPES and flag those that scan the
+    whole collection (COLLSCAN) or sort in memory (SORT).
+    """
+    report = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape["collection"]].find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        explain = await cursor.explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        report.append({
+            "collection": shape["collection"],
+            "filter": list(shape["filter"]),
+            "sort": [field for field, _ in shape.get("sort", [])],
+            "stages": stages,
+            "indexed": "COLLSCAN" not in stages,
+            "in_memory_sort": "SORT" in stages,
+        })
+    return report
@@ -0,0 +1,240 @@
+import asyncio
+import contextlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+from .config import (
+    QUEUE_BACKEND, QUEUE_SQLITE_PATH, QUEUE_VISIBILITY_TIMEOUT, QUEUE_MAX_ATTEMPTS,
+    get_mongodb_uri,
+)
+
+# Job states
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+DONE = "DONE"
+DEAD = "DEAD"
+
+class SQLiteJobQueue:
+    """
+    Persistent job queue in a local SQLite file. A claim leases the job to one
+    worker until `lease_expires`; if the worker dies and the lease lapses
+    (visibility timeout), the job becomes claimable again. Jobs that used up
+    `max_attempts` are marked DEAD.
+    """
+
+    def __init__(self, path: str = QUEUE_SQLITE_PATH, visibility_timeout: float = QUEUE_VISIBILITY_TIMEOUT,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, worker_id TEXT, lease_expires REAL,"
+                " created_at REAL NOT NULL, error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_expires, created_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Autocommit mode; claims open an explicit write transaction
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _enqueue(self, job_id: str, payload: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, payload, status, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(payload), QUEUED, time.time()),
+            )
+
+    def _claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that used every attempt are left to reap_expired()
+                row = conn.execute(
+                    "SELECT job_id, payload, attempts FROM jobs"
+                    " WHERE status = ? OR (status = ? AND lease_expires < ? AND attempts < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now, self.max_attempts),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1"
+                        " WHERE job_id = ?",
+                        (RUNNING, worker_id, now + self.visibility_timeout, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"job_id": row[0], "payload": json.loads(row[1]), "attempts": row[2] + 1}
+
+    def _extend_lease(self, job_id: str, worker_id: str) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND worker_id = ? AND status = ?",
+                (time.time() + self.visibility_timeout, job_id, worker_id, RUNNING),
+            )
+            return cur.rowcount == 1
+
+    def _reap_expired(self) -> List[str]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [r[0] for r in conn.execute(
+                    "SELECT job_id FROM jobs WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                    (RUNNING, time.time(), self.max_attempts),
+                ).fetchall()]
+                conn.executemany(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires = NULL,"
+                    " error = 'Lease expired too many times' WHERE job_id = ?",
+                    [(DEAD, job_id) for job_id in ids],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def _finish(self, job_id: str, worker_id: str, error: Optional[str], retry: bool) -> Optional[str]:
+        with self._connect() as conn:
+            if retry:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT attempts FROM jobs WHERE job_id = ? AND worker_id = ?", (job_id, worker_id),
+                ).fetchone()
+                status = None if row is None else DEAD if row[0] >= self.max_attempts else QUEUED
+                if status:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires = NULL, error = ? WHERE job_id = ?",
+                        (status, error, job_id),
+                    )
+                conn.execute("COMMIT")
+                return status
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, lease_expires = NULL, error = ? WHERE job_id = ? AND worker_id = ?",
+                    (DONE, error, job_id, worker_id),
+                )
+
+    async def enqueue(self, job_id: str, payload: Dict[str, Any]):
+        await asyncio.to_thread(self._enqueue, job_id, payload)
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._claim, worker_id)
+
+    async def extend_lease(self, job_id: str, worker_id: str) -> bool:
+        return await asyncio.to_thread(self._extend_lease, job_id, worker_id)
+
+    async def complete(self, job_id: str, worker_id: str, error: str = None):
+        await asyncio.to_thread(self._finish, job_id, worker_id, error, False)
+
+    async def release(self, job_id: str, worker_id: str, error: str = None) -> Optional[str]:
+        """
+        Give the job back to the queue for another attempt, or mark it DEAD.
+        Returns the new status, or None if the worker no longer holds the job.
+        """
+        return await asyncio.to_thread(self._finish, job_id, worker_id, error, True)
+
+    async def reap_expired(self) -> List[str]:
+        """Mark jobs whose last allowed lease expired as DEAD; returns their ids."""
+        return await asyncio.to_thread(self._reap_expired)
+
+class MongoJobQueue:
+    """Same semantics as SQLiteJobQueue, backed by a Mongo collection for multi-host workers."""
+
+    def __init__(self, db, visibility_timeout: float = QUEUE_VISIBILITY_TIMEOUT,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS, collection: str = "job_queue"):
+        self.jobs = db[collection]
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._indexed = False
+
+    async def _ensure_indexes(self):
+        if not self._indexed:
+            await self.jobs.create_index([("status", 1), ("lease_expires", 1), ("created_at", 1)])
+            self._indexed = True
+
+    async def enqueue(self, job_id: str, payload: Dict[str, Any]):
+        await self._ensure_indexes()
+        await self.jobs.insert_one({
+            "_id": job_id, "payload": payload, "status": QUEUED, "attempts": 0,
+            "worker_id": None, "lease_expires": None, "created_at": time.time(), "error": None,
+        })
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        from pymongo import ReturnDocument
+        await self._ensure_indexes()
+        now = time.time()
+        doc = await self.jobs.find_one_and_update(
+            {"$or": [{"status": QUEUED},
+                     {"status": RUNNING, "lease_expires": {"$lt": now}, "attempts": {"$lt": self.max_attempts}}]},
+            {"$set": {"status": RUNNING, "worker_id": worker_id, "lease_expires": now + self.visibility_timeout},
+             "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            return None
+        return {"job_id": doc["_id"], "payload": doc["payload"], "attempts": doc["attempts"]}
+
+    async def extend_lease(self, job_id: str, worker_id: str) -> bool:
+        result = await self.jobs.update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": RUNNING},
+            {"$set": {"lease_expires": time.time() + self.visibility_timeout}},
+        )
+        return result.matched_count == 1
+
+    async def complete(self, job_id: str, worker_id: str, error: str = None):
+        await self.jobs.update_one(
+            {"_id": job_id, "worker_id": worker_id},
+            {"$set": {"status": DONE, "lease_expires": None, "error": error}},
+        )
+
+    async def release(self, job_id: str, worker_id: str, error: str = None) -> Optional[str]:
+        doc = await self.jobs.find_one({"_id": job_id, "worker_id": worker_id}, {"attempts": 1})
+        if doc is None:
+            return None
+        status = DEAD if doc["attempts"] >= self.max_attempts else QUEUED
+        result = await self.jobs.update_one(
+            {"_id": job_id, "worker_id": worker_id},
+            {"$set": {"status": status, "worker_id": None, "lease_expires": None, "error": error}},
+        )
+        return status if result.matched_count else None
+
+    async def reap_expired(self) -> List[str]:
+        await self._ensure_indexes()
+        expired = {"status": RUNNING, "lease_expires": {"$lt": time.time()}, "attempts": {"$gte": self.max_attempts}}
+        ids = [doc["_id"] async for doc in self.jobs.find(expired, {"_id": 1})]
+        if ids:
+            # Re-check the filter so a job re-leased in between is left alone
+            await self.jobs.update_many(
+                {**expired, "_id": {"$in": ids}},
+                {"$set": {"status": DEAD, "worker_id": None, "lease_expires": None, "error": "Lease expired too many times"}},
+            )
+        return ids
+
+_queue = None
+
+def get_job_queue():
+    """Process-wide queue for the configured backend (QUEUE_BACKEND)."""
+    global _queue
+    if _queue is None:
+        if QUEUE_BACKEND == "mongo":
+            from .db import get_db_from_uri
+            _, db = get_db_from_uri(get_mongodb_uri())
+            _queue = MongoJobQueue(db)
+        else:
+            _queue = SQLiteJobQueue()
+    return _queue
@@ -0,0 +1,322 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+from .config import (
+    LLM_CACHE_BACKEND, LLM_CACHE_SQLITE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES,
+    get_mongodb_uri,
+)
+
+def normalize_messages(messages: Any) -> list:
+    """Prompt string or chat messages as a list of {"role", "content"} with trimmed content."""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalized = []
+    for message in messages or []:
+        if isinstance(message, (list, tuple)):
+            role, content = message
+        else:
+            role, content = message.get("role", "user"), message.get("content", "")
+        normalized.append({"role": role, "content": content.strip() if isinstance(content, str) else content})
+    return normalized
+
+def llm_cache_key(provider: str, model: str, messages: Any, temperature: float = None,
+                  tools: Any = None, params: Dict[str, Any] = None) -> str:
+    content = {
+        "provider": provider,
+        "model": model,
+        "messages": normalize_messages(messages),
+        "temperature": temperature,
+        "tools": tools,
+        "params": params or {},
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+class MemoryLLMCache:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_sync(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set_sync(self, key: str, value: str, ttl: float = None):
+        with self._lock:
+            self._entries[key] = (time.time() + (ttl or self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear_sync(self):
+        with self._lock:
+            self._entries.clear()
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.get_sync(key)
+
+    async def set(self, key: str, value: str, ttl: float = None):
+        self.set_sync(key, value, ttl)
+
+    async def clear(self):
+        self.clear_sync()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+class SQLiteLLMCache:
+    """Cache in a local SQLite file, shared by all processes on the host."""
+
+    def __init__(self, path: str = LLM_CACHE_SQLITE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 ttl: float = LLM_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM llm_cache WHERE key = ? AND expires_at >= ?", (key, now)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set_sync(self, key: str, value: str, ttl: float = None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + (ttl or self.ttl), now),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            # Least recently used entries beyond the size bound
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear_sync(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def set(self, key: str, value: str, ttl: float = None):
+        await asyncio.to_thread(self.set_sync, key, value, ttl)
+
+    async def clear(self):
+        await asyncio.to_thread(self.clear_sync)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+class MongoLLMCache:
+    """
+    Cache in a Mongo collection shared by all hosts. Expiry is left to a TTL
+    index; the size bound is enforced every `trim_every` writes.
+    """
+
+    def __init__(self, db, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL,
+                 collection: str = "llm_cache", trim_every: int = 100):
+        self.entries = db[collection]
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.trim_every = trim_every
+        self._writes = 0
+        self._indexed = False
+        self.hits = 0
+        self.misses = 0
+
+    async def _ensure_indexes(self):
+        if not self._indexed:
+            await self.entries.create_index("expires_at", expireAfterSeconds=0)
+            await self.entries.create_index("accessed_at")
+            self._indexed = True
+
+    async def get(self, key: str) -> Optional[str]:
+        now = datetime.utcnow()
+        doc = await self.entries.find_one_and_update(
+            {"_id": key, "expires_at": {"$gte": now}}, {"$set": {"accessed_at": now}}, projection={"value": 1},
+        )
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return doc["value"]
+
+    async def set(self, key: str, value: str, ttl: float = None):
+        await self._ensure_indexes()
+        now = datetime.utcnow()
+        await self.entries.replace_one(
+            {"_id": key},
+            {"value": value, "expires_at": now + timedelta(seconds=ttl or self.ttl), "accessed_at": now},
+            upsert=True,
+        )
+        self._writes += 1
+        if self._writes % self.trim_every == 0:
+            await self._trim()
+
+    async def _trim(self):
+        excess = await self.entries.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        stale = await self.entries.find({}, {"_id": 1}).sort("accessed_at", 1).limit(excess).to_list(excess)
+        await self.entries.delete_many({"_id": {"$in": [doc["_id"] for doc in stale]}})
+
+    async def clear(self):
+        await self.entries.delete_many({})
+
+    # Motor is async-only; synchronous LangChain calls simply bypass the cache
+    def get_sync(self, key: str) -> Optional[str]:
+        return None
+
+    def set_sync(self, key: str, value: str, ttl: float = None):
+        pass
+
+    def clear_sync(self):
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+_cache = None
+
+def get_llm_cache():
+    """Process-wide LLM response cache for the configured backend (LLM_CACHE_BACKEND)."""
+    global _cache
+    if _cache is None:
+        if LLM_CACHE_BACKEND == "mongo":
+            from .db import get_db_from_uri
+            _, db = get_db_from_uri(get_mongodb_uri())
+            _cache = MongoLLMCache(db)
+        elif LLM_CACHE_BACKEND == "sqlite":
+            _cache = SQLiteLLMCache()
+        else:
+            _cache = MemoryLLMCache()
+    return _cache
+
+def llm_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters of the process-wide cache (zeros until it is first used)."""
+    return _cache.stats() if _cache is not None else {"hits": 0, "misses": 0}
+
+def _cache_ttl(setting: Any) -> Optional[float]:
+    return setting.get("ttl") if isinstance(setting, dict) else None
+
+async def cached_response_json(node, provider: str, payload: Dict[str, Any],
+                               send: Callable[[], Awaitable[httpx.Response]]) -> Any:
+    """
+    JSON body of `await send()`. When the node opts in with config "cache"
+    (true or {"ttl": seconds}) identical requests are answered from the LLM
+    cache; only successful responses are stored. Hits and misses are recorded
+    on the node's span as "llm.cache_hit".
+    """
+    setting = node.config.get("cache")
+    if not setting:
+        return (await send()).json()
+    cache = get_llm_cache()
+    params = {k: v for k, v in payload.items() if k not in ("model", "prompt", "messages", "temperature", "tools")}
+    key = llm_cache_key(
+        provider, payload.get("model"), payload.get("messages", payload.get("prompt")),
+        payload.get("temperature"), payload.get("tools"), params,
+    )
+    cached = await cache.get(key)
+    node.span_attributes["llm.cache_hit"] = cached is not None
+    if cached is not None:
+        return json.loads(cached)
+    response = await send()
+    data = response.json()
+    if response.is_success:
+        await cache.set(key, json.dumps(data), _cache_ttl(setting))
+    return data
+
+try:
+    from langchain_core.caches import BaseCache
+    from langchain_core.load import dumps, loads
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation
+    # Only generation/message types may be revived from a (possibly shared) cache
+    _CACHED_TYPES = [Generation, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+except ImportError:  # pragma: no cover - langchain is only needed by the agent
+    BaseCache = object
+
+class LangChainLLMCache(BaseCache):
+    """
+    Adapter exposing an LLM cache backend as a LangChain cache, for the agent's
+    chat models. LangChain's llm_string already covers model, temperature and
+    bound tools; the prompt is the serialized message list.
+    """
+
+    def __init__(self, backend=None, ttl: float = None):
+        self._backend = backend
+        self.ttl = ttl
+
+    @property
+    def backend(self):
+        return self._backend or get_llm_cache()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str):
+        value = self.backend.get_sync(self._key(prompt, llm_string))
+        return loads(value, allowed_objects=_CACHED_TYPES) if value is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        self.backend.set_sync(self._key(prompt, llm_string), dumps(return_val), self.ttl)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.backend.clear_sync()
+
+    async def alookup(self, prompt: str, llm_string: str):
+        value = await self.backend.get(self._key(prompt, llm_string))
+        return loads(value, allowed_objects=_CACHED_TYPES) if value is not None else None
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val) -> None:
+        await self.backend.set(self._key(prompt, llm_string), dumps(return_val), self.ttl)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        await self.backend.clear()
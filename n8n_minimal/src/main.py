@@ -1,6 +1,11 @@
 from fastapi import FastAPI, HTTPException, Header
 from fastapi import Request
 from .engine import execute_workflow
+from .http_pool import http_clients
+from .sandbox import shutdown_sandbox_pool
+from .indexes import ensure_indexes, check_query_plans
+from .db import get_db_from_uri
+from .config import get_mongodb_uri, CHECKPOINT_COMPACT_INTERVAL
 import asyncio
 import time
 from .api_workflows import router as workflows_router
@@ -17,10 +22,13 @@ import json
 from .schemas import ExecutionRequest
 from .agent.builder import create_agentic_graph, AgentState, validate_workflow, get_workflow_metadata
 from .agent.components import AVAILABLE_MODELS, MEMORY_BACKENDS, TOOL_REGISTRY
+from .agent.cache import agent_graph_cache
 from .credential_manager import credential_manager
-from langgraph.checkpoint.sqlite import SqliteSaver
+from .agent.checkpointer import get_checkpointer, scoped_thread_id
+from .rate_limit import current_user, governor
 import logging
 from .monitoring import add_metrics
+from .tracing import span_exporter
 from .hitl import router as hitl_router
 from .git_memory import save_state, get_state, list_states
 from fastapi import APIRouter
@@ -45,7 +53,7 @@ logger = logging.getLogger(__name__)
 # )
 
 app = FastAPI()
-# add_metrics(app)
+add_metrics(app)
 
 # Add CORS middleware
 app.add_middleware(
@@ -54,8 +62,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After"],
 )
 
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        _, db = get_db_from_uri(get_mongodb_uri())
+        summary = await ensure_indexes(db)
+        logger.info(f"Mongo indexes: {summary}")
+    except Exception as e:
+        # The API still starts (slower queries) when Mongo is unreachable
+        logger.error(f"Failed to ensure Mongo indexes: {e}")
+
+async def compact_checkpoints():
+    while True:
+        try:
+            stats = await get_checkpointer().acompact()
+            logger.info(f"Checkpoint compaction: {stats}")
+        except Exception as e:
+            logger.error(f"Checkpoint compaction failed: {e}")
+        await asyncio.sleep(CHECKPOINT_COMPACT_INTERVAL)
+
+@app.on_event("startup")
+async def start_checkpoint_compaction():
+    app.state.checkpoint_compaction = asyncio.create_task(compact_checkpoints())
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await http_clients.aclose()
+    shutdown_sandbox_pool()
+
 app.include_router(workflows_router, prefix="/api/workflows")
 app.include_router(executions_router)
 app.include_router(credentials_router)
@@ -65,9 +102,6 @@ app.include_router(auth_router, prefix="/api/users")
 app.include_router(hitl_router)
 app.include_router(credentials_router, prefix="/api/credentials")
 
-# Persistent memory for conversations (in-memory SQLite for now)
-memory = SqliteSaver.from_conn_string(":memory:")
-
 memory_router = APIRouter(prefix="/memory", tags=["memory"])
 
 @memory_router.post("/save")
@@ -219,6 +253,38 @@ async def get_providers(user=Depends(get_current_user)):
         }
     ]
 
+@api_router.get("/traces")
+async def get_traces(user=Depends(get_current_user)):
+    """
+    Returns recent node execution spans as an OTLP/JSON export request.
+    Admins see every workflow's spans, other users only their own.
+    """
+    owner = None if user.get("role") == "admin" else user["username"]
+    return span_exporter.to_otlp(owner=owner)
+
+@api_router.get("/db/index-check")
+async def get_index_check(user=Depends(get_current_user)):
+    """
+    Explains the API's main query shapes and flags collection scans and in-memory sorts.
+    """
+    _, db = get_db_from_uri(get_mongodb_uri())
+    report = await check_query_plans(db)
+    return {"ok": all(q["indexed"] and not q["in_memory_sort"] for q in report), "queries": report}
+
+@api_router.get("/agent-graph-cache")
+async def get_agent_graph_cache_stats(user=Depends(get_current_user)):
+    """
+    Returns size and hit/miss counters of the compiled agent graph cache.
+    """
+    return agent_graph_cache.stats()
+
+@api_router.get("/rate-limits")
+async def get_rate_limits(user=Depends(get_current_user)):
+    """
+    Returns queue depth and admission counters of the outbound rate governor, per provider and credential.
+    """
+    return governor.stats()
+
 app.include_router(api_router)
 
 @app.get("/", response_class=HTMLResponse)
@@ -370,17 +436,18 @@ async def execute_agent(request: ExecutionRequest, user=Depends(get_current_user
         raise HTTPException(status_code=400, detail=f"Workflow validation failed: {str(e)}")
     
     try:
-        # 1. Dynamically build the graph from the frontend's definition
-        graph_builder = create_agentic_graph(workflow)
-        # 2. Compile the graph with memory persistence
-        runnable = graph_builder.compile()
+        # 1-2. Build and compile the graph, reusing the compiled graph for
+        # workflows (and credentials) that have been seen before
+        runnable = agent_graph_cache.get(workflow, lambda wf: create_agentic_graph(wf).compile(checkpointer=get_checkpointer()))
     except ValueError as e:
         logger.error(f"Failed to build agentic graph for user {user}: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
     # 3. Define the async generator for streaming responses
     async def stream_generator():
-        config = {"configurable": {"thread_id": request.thread_id}}
+        current_user.set(user.get("username", "anonymous"))
+        # Threads are stored per user so a guessed thread_id cannot reach another user's conversation
+        config = {"configurable": {"thread_id": scoped_thread_id(user["_id"], request.thread_id)}}
         async for event in runnable.astream_events(
             {"messages": [("user", request.input)]},
             config=config,
@@ -12,7 +12,8 @@ from dotenv import load_dotenv
 load_dotenv()
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 load_dotenv(os.path.join(PROJECT_ROOT, '.env'), override=False)
-import httpx
+from .engine import NodeExecutionError, stream_workflow
+from .rate_limit import current_user
 
 # Simple in-memory storage for development
 mock_users = {}
@@ -254,111 +255,110 @@ async def get_providers(user=Depends(get_current_user)):
         }
     ]
 
-@app.post("/execute-real")
-async def execute_real(request: dict, user=Depends(get_current_user)):
-    try:
-        graph = request.get("graph", {})
-        user_input = request.get("input", "")
+SEARCH_NODE_TYPES = ("tavily_search", "TavilyNode", "tool")
+LLM_NODE_TYPES = ("llm", "GroqNode", "OpenAINode")
 
-        # Resolve keys later per-node to allow node-specific overrides
+def build_real_workflow(graph: dict, user_input: str) -> dict:
+    """
+    Engine workflow for a canvas graph: every search node runs concurrently,
+    their results are reduced to a relevance-ranked prompt (SearchContextNode)
+    and the first LLM node streams the answer.
+    """
+    nodes = graph.get("nodes", [])
+    search_nodes = [n for n in nodes if n.get("type") in SEARCH_NODE_TYPES]
+    llm_node = next((n for n in nodes if n.get("type") in LLM_NODE_TYPES), None)
+    workflow = {"nodes": [{"id": "input", "type": "ManualTriggerNode", "config": {}}], "connections": []}
 
-        # Very simple linear execution: input -> tavily_search -> llm
-        nodes = {n.get("id"): n for n in graph.get("nodes", [])}
+    for n in search_nodes:
+        config = n.get("config", {})
+        # Prefer node-provided key, fall back to env
+        tavily_key = config.get("api_key") or os.getenv("TAVILY_API_KEY")
+        if not tavily_key:
+            raise HTTPException(status_code=400, detail="Missing Tavily API key: provide in node config (api_key) or set TAVILY_API_KEY")
+        query_template = config.get("query_template")
+        workflow["nodes"].append({
+            "id": f"search:{n.get('id')}", "type": "TavilyNode",
+            "config": {"query": query_template.replace("{{input}}", user_input) if query_template else user_input,
+                       "num_results": config.get("num_results", 3)},
+            "credentials": {"api_key": tavily_key},
+        })
+        workflow["connections"].append({"source": "input", "target": f"search:{n.get('id')}"})
 
-        search_text = user_input
-        search_result = None
-        llm_result = None
-        clean_result = ""
+    if llm_node:
+        config = llm_node.get("config", {})
+        provider = config.get("provider", "groq")
+        if provider != "groq":
+            raise HTTPException(status_code=400, detail=f"Unsupported provider for real execution: {provider}")
+        groq_key = config.get("api_key") or os.getenv("GROQ_API_KEY")
+        if not groq_key:
+            raise HTTPException(status_code=400, detail="Missing Groq API key: provide in node config (api_key) or set GROQ_API_KEY")
+        llm = {
+            "id": "llm", "type": "GroqNode",
+            "config": {"model": config.get("model", "llama3-8b-8192"), "max_tokens": config.get("max_tokens", 256),
+                       "temperature": config.get("temperature", 0.7), "stream": True},
+            "credentials": {"api_key": groq_key},
+        }
+        if search_nodes:
+            workflow["nodes"].append({"id": "context", "type": "SearchContextNode", "config": {
+                "question": user_input, "max_tokens": config.get("context_tokens"),
+            }})
+            workflow["connections"] += [{"source": f"search:{n.get('id')}", "target": "context"} for n in search_nodes]
+            workflow["connections"].append({"source": "context", "target": "llm"})
+        else:
+            llm["config"]["prompt"] = f"{user_input}\nPlease answer concisely."
+            workflow["connections"].append({"source": "input", "target": "llm"})
+        workflow["nodes"].append(llm)
+    return workflow
 
-        # Tavily web search
-        search_node = next((n for n in nodes.values() if n.get("type") in ["tavily_search", "TavilyNode", "tool"]), None)
-        if search_node and search_node.get("type") != "llm":
-            query_template = search_node.get("config", {}).get("query_template")
-            query = query_template.replace("{{input}}", user_input) if query_template else user_input
-            tavily_url = "https://api.tavily.com/search"
-            # Prefer node-provided key, fall back to env
-            tavily_key = search_node.get("config", {}).get("api_key") or os.getenv("TAVILY_API_KEY")
-            if not tavily_key:
-                raise HTTPException(status_code=400, detail="Missing Tavily API key: provide in node config (api_key) or set TAVILY_API_KEY")
-            tavily_headers = {"X-API-Key": tavily_key, "Content-Type": "application/json"}
-            tavily_payload = {"query": query, "num_results": search_node.get("config", {}).get("num_results", 3)}
-            try:
-                async with httpx.AsyncClient(timeout=30) as client:
-                    r = await client.post(tavily_url, json=tavily_payload, headers=tavily_headers)
-                    r.raise_for_status()
-                    search_result = r.json()
-                    
-                    # Extract clean search results
-                    if search_result and "results" in search_result:
-                        clean_result += f"🔍 Search Results for: {query}\n\n"
-                        for i, result in enumerate(search_result["results"], 1):
-                            title = result.get("title", "No title")
-                            content = result.get("content", "No content")
-                            url = result.get("url", "")
-                            clean_result += f"{i}. {title}\n"
-                            clean_result += f"   {content[:200]}{'...' if len(content) > 200 else ''}\n"
-                            clean_result += f"   URL: {url}\n\n"
-            except httpx.HTTPStatusError as e:
-                detail = e.response.text if e.response is not None else str(e)
-                raise HTTPException(status_code=400, detail=f"Tavily error: {e.response.status_code if e.response else 'HTTP'} {detail}")
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Tavily request failed: {str(e)}")
+def format_search_results(body: dict, query: str) -> str:
+    text = f"🔍 Search Results for: {query}\n\n"
+    for i, result in enumerate(body.get("results", []), 1):
+        content = result.get("content", "No content")
+        text += f"{i}. {result.get('title', 'No title')}\n"
+        text += f"   {content[:200]}{'...' if len(content) > 200 else ''}\n"
+        text += f"   URL: {result.get('url', '')}\n\n"
+    return text
 
-        # LLM via Groq
-        llm_node = next((n for n in nodes.values() if n.get("type") in ["llm", "GroqNode", "OpenAINode"]), None)
-        if llm_node:
-            provider = llm_node.get("config", {}).get("provider", "groq")
-            model = llm_node.get("config", {}).get("model", "llama3-8b-8192")
-            # Compose prompt: include search context if available
-            base_prompt = f"User input: {user_input}\n" + (f"Search context: {json.dumps(search_result)[:2000]}\n" if search_result else "") + "Please answer concisely."
+@app.post("/execute-real")
+async def execute_real(request: dict, user=Depends(get_current_user)):
+    current_user.set(user.get("email", "anonymous"))
+    user_input = request.get("input", "")
+    workflow = build_real_workflow(request.get("graph", {}), user_input)
+    if len(workflow["nodes"]) == 1:
+        return {"status": "success", "search": None, "llm": None}
+    queries = {n["id"]: n["config"].get("query") for n in workflow["nodes"]}
 
-            if provider == "groq":
-                groq_url = "https://api.groq.com/openai/v1/chat/completions"
-                # Prefer node-provided key, fall back to env
-                groq_key = llm_node.get("config", {}).get("api_key") or os.getenv("GROQ_API_KEY")
-                if not groq_key:
-                    raise HTTPException(status_code=400, detail="Missing Groq API key: provide in node config (api_key) or set GROQ_API_KEY")
-                groq_headers = {"Authorization": f"Bearer {groq_key}", "Content-Type": "application/json"}
-                groq_payload = {
-                    "model": model,
-                    "messages": [{"role": "user", "content": base_prompt}],
-                    "max_tokens": llm_node.get("config", {}).get("max_tokens", 256),
-                    "temperature": llm_node.get("config", {}).get("temperature", 0.7),
-                }
-                try:
-                    async with httpx.AsyncClient(timeout=60) as client:
-                        r = await client.post(groq_url, json=groq_payload, headers=groq_headers)
-                        r.raise_for_status()
-                        llm_result = r.json()
-                        
-                        # Extract clean LLM response
-                        if llm_result and "choices" in llm_result and len(llm_result["choices"]) > 0:
-                            llm_content = llm_result["choices"][0].get("message", {}).get("content", "")
-                            if llm_content:
-                                clean_result += f"🤖 AI Response:\n{llm_content}\n"
-                except httpx.HTTPStatusError as e:
-                    detail = e.response.text if e.response is not None else str(e)
-                    raise HTTPException(status_code=400, detail=f"Groq error: {e.response.status_code if e.response else 'HTTP'} {detail}")
-                except Exception as e:
-                    raise HTTPException(status_code=400, detail=f"Groq request failed: {str(e)}")
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported provider for real execution: {provider}")
+    async def chunks():
+        async for nid, item in stream_workflow(workflow):
+            body = item.get("json", {})
+            if nid != "llm":
+                yield format_search_results(body, queries[nid])
+            elif "delta" in body:
+                yield body["delta"]
+            elif body.get("sources"):
+                yield "\n\nSources:\n" + "\n".join(f"[{i}] {s['title']} - {s['url']}" for i, s in enumerate(body["sources"], 1))
 
-        # Return clean result if available, otherwise return the structured data
-        if clean_result.strip():
-            from fastapi.responses import PlainTextResponse
-            return PlainTextResponse(content=clean_result.strip())
-        else:
-            return {
-                "status": "success",
-                "search": search_result,
-                "llm": llm_result,
-            }
-    except HTTPException:
-        raise
+    # Search and LLM errors before the first chunk still become a 400
+    stream = chunks()
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except NodeExecutionError as e:
+        raise HTTPException(status_code=400, detail=f"{e.node_id} failed: {e.error}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"execute_real failed: {str(e)}")
 
+    async def body():
+        yield ("🤖 AI Response:\n" if "llm" in queries else "") + first
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            yield f"\n\n[error] {e}"
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
+
 @app.get("/api/tools")
 async def get_tools(user=Depends(get_current_user)):
     return [
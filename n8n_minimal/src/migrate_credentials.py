@@ -0,0 +1,70 @@
+"""
+Rewrites credentials stored in the legacy str(dict) format into the
+versioned JSON codec (src/credential_codec.py):
+
+    python -m src.migrate_credentials --batch-size 500 [--dry-run]
+
+Safe to re-run: documents already in the current format are skipped, and
+each update only applies if the document was not changed in the meantime.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from cryptography.fernet import Fernet
+from pymongo import UpdateOne
+from .config import get_mongodb_uri
+from .credential_codec import CODEC_VERSION, encode_credential_data, decode_credential_data, is_legacy_payload
+from .db import get_db_from_uri
+
+logger = logging.getLogger(__name__)
+
+async def migrate_credentials(db, fernet: Fernet, batch_size: int = 500, dry_run: bool = False) -> dict:
+    stats = {"scanned": 0, "migrated": 0, "current": 0, "failed": 0}
+    ops = []
+
+    async def flush():
+        if ops and not dry_run:
+            result = await db.credentials.bulk_write(ops, ordered=False)
+            stats["migrated"] += result.modified_count
+        elif dry_run:
+            stats["migrated"] += len(ops)
+        ops.clear()
+
+    cursor = db.credentials.find({"encrypted_data": {"$exists": True}}, {"encrypted_data": 1}, batch_size=batch_size)
+    async for doc in cursor:
+        stats["scanned"] += 1
+        try:
+            plaintext = fernet.decrypt(doc["encrypted_data"])
+            if not is_legacy_payload(plaintext):
+                stats["current"] += 1
+                continue
+            token = fernet.encrypt(encode_credential_data(decode_credential_data(plaintext))).decode()
+        except Exception as e:
+            logger.error(f"Cannot migrate credential {doc['_id']}: {e}")
+            stats["failed"] += 1
+            continue
+        ops.append(UpdateOne(
+            {"_id": doc["_id"], "encrypted_data": doc["encrypted_data"]},
+            {"$set": {"encrypted_data": token, "codec_version": CODEC_VERSION}},
+        ))
+        if len(ops) >= batch_size:
+            await flush()
+    await flush()
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate stored credentials to the versioned codec.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="Count documents to migrate without writing")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    key = os.environ.get("FERNET_KEY")
+    if not key:
+        raise SystemExit("FERNET_KEY environment variable must be set.")
+    _, db = get_db_from_uri(get_mongodb_uri())
+    stats = asyncio.run(migrate_credentials(db, Fernet(key.encode()), args.batch_size, args.dry_run))
+    logger.info(f"Credential migration finished: {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,76 @@
 from prometheus_fastapi_instrumentator import Instrumentator
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from .agent.cache import agent_graph_cache
+from .llm_cache import llm_cache_stats
+from .rate_limit import governor
+from .tracing import tracer, Span
+
+NODE_DURATION = Histogram(
+    "workflow_node_duration_seconds", "Wall time of workflow node executions",
+    ["node_type", "status"],
+)
+NODE_QUEUE_WAIT = Histogram(
+    "workflow_node_queue_wait_seconds", "Time nodes waited for a concurrency slot",
+    ["node_type"],
+)
+NODE_PAYLOAD_BYTES = Histogram(
+    "workflow_node_payload_bytes", "Serialized size of node outputs",
+    ["node_type"], buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+NODE_RETRIES = Counter(
+    "workflow_node_retries_total", "Retries used by workflow nodes",
+    ["node_type"],
+)
+
+AGENT_GRAPH_CACHE = Gauge(
+    "agent_graph_cache", "Compiled agent graph cache counters",
+    ["counter"],
+)
+for _counter in ("size", "hits", "misses", "evictions"):
+    AGENT_GRAPH_CACHE.labels(_counter).set_function(lambda c=_counter: agent_graph_cache.stats()[c])
+LLM_CACHE_NODE_LOOKUPS = Counter(
+    "workflow_llm_cache_lookups_total", "LLM response cache lookups by workflow nodes",
+    ["node_type", "result"],
+)
+LLM_CACHE = Gauge(
+    "llm_cache", "LLM response cache counters (workflow nodes and agents)",
+    ["counter"],
+)
+for _counter in ("hits", "misses"):
+    LLM_CACHE.labels(_counter).set_function(lambda c=_counter: llm_cache_stats()[c])
+
+class RateLimitCollector:
+    """Governor state per provider; providers appear as they are first called."""
+
+    def collect(self):
+        depth = GaugeMetricFamily("rate_limit_queue_depth", "Calls waiting for a provider's rate limit", labels=["provider"])
+        calls = CounterMetricFamily("rate_limit_calls", "Calls admitted by the rate governor", labels=["provider", "result"])
+        waited = CounterMetricFamily("rate_limit_wait_seconds", "Time calls spent queued by the rate governor", labels=["provider"])
+        totals = {}
+        for stats in governor.stats().values():
+            t = totals.setdefault(stats["provider"], {"queued": 0, "immediate": 0, "throttled": 0, "wait_seconds": 0.0})
+            for k in t:
+                t[k] += stats[k]
+        for provider, t in totals.items():
+            depth.add_metric([provider], t["queued"])
+            calls.add_metric([provider, "immediate"], t["immediate"])
+            calls.add_metric([provider, "queued"], t["throttled"])
+            waited.add_metric([provider], t["wait_seconds"])
+        return [depth, calls, waited]
+
+REGISTRY.register(RateLimitCollector())
+
+def record_node_span(span: Span):
+    NODE_DURATION.labels(span.node_type, span.status).observe(span.duration)
+    NODE_QUEUE_WAIT.labels(span.node_type).observe(span.queue_wait)
+    if tracer.measure_payloads:
+        NODE_PAYLOAD_BYTES.labels(span.node_type).observe(span.payload_bytes)
+    if span.retries:
+        NODE_RETRIES.labels(span.node_type).inc(span.retries)
+    if "llm.cache_hit" in span.attributes:
+        LLM_CACHE_NODE_LOOKUPS.labels(span.node_type, "hit" if span.attributes["llm.cache_hit"] else "miss").inc()
 
 def add_metrics(app):
-    Instrumentator().instrument(app).expose(app, include_in_schema=False, should_gzip=True) 
\ No newline at end of file
+    Instrumentator().instrument(app).expose(app, include_in_schema=False, should_gzip=True)
+    tracer.add_exporter(record_node_span)
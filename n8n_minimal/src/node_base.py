@@ -1,9 +1,13 @@
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+from .http_pool import http_clients
 
 class Node:
     def __init__(self, config: Dict[str, Any], credentials: Dict[str, Any] = None):
         self.config = config
         self.credentials = credentials or {}
+        # Extra attributes the engine copies onto this node's trace span
+        self.span_attributes: Dict[str, Any] = {}
 
     async def execute(self, inputs: Any, options: Dict[str, Any] = None) -> Any:
         """
@@ -12,6 +16,36 @@ class Node:
         """
         raise NotImplementedError("Each node must implement the execute method.")
 
+    async def stream(self, inputs: Optional[AsyncIterator[Any]], options: Dict[str, Any] = None) -> AsyncIterator[Any]:
+        """
+        Item-streaming entry point used by the engine's streaming mode.
+        `inputs` is an async iterator of upstream items (None for triggers).
+
+        The default collects the upstream items, calls execute() once and
+        yields its output items. Nodes that can produce or transform items
+        incrementally override this with an async generator.
+        """
+        data = None
+        if inputs is not None:
+            data = [item async for item in inputs]
+            if not data:
+                return
+        result = await self.execute(data, options)
+        if isinstance(result, dict) and "status" in result:
+            if result["status"] != "SUCCESS":
+                raise RuntimeError(result.get("error"))
+            result = result.get("data")
+        for item in (result if isinstance(result, list) else [result]):
+            yield item
+
+    def http_client(self, url: str, options: Dict[str, Any] = None) -> httpx.AsyncClient:
+        """
+        Pooled client for `url`. The engine passes its registry as
+        options['http_clients']; otherwise the process-wide registry is used.
+        """
+        registry = (options or {}).get("http_clients") or http_clients
+        return registry.get(url)
+
     @property
     def metadata(self) -> Dict[str, Any]:
         return {
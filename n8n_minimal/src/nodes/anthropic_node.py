@@ -1,6 +1,8 @@
+from ..llm_cache import cached_response_json
 from ..node_base import Node
+from ..rate_limit import governed_send
+from ..retry import raise_for_retryable_status
 from typing import Any, Dict
-import httpx
 from ..config import ANTHROPIC_API_KEY
 
 class AnthropicNode(Node):
@@ -17,9 +19,14 @@ class AnthropicNode(Node):
             "prompt": prompt,
             "max_tokens_to_sample": self.config.get("max_tokens", 256),
         }
-        async with httpx.AsyncClient() as client:
+        client = self.http_client(url, options)
+
+        async def send():
             response = await client.post(url, json=payload, headers=headers)
-            return [{"json": response.json()}]
+            raise_for_retryable_status(response)
+            return response
+
+        return [{"json": await cached_response_json(self, "anthropic", payload, governed_send("anthropic", ANTHROPIC_API_KEY, payload, send))}]
 
     @property
     def metadata(self) -> Dict[str, Any]:
@@ -1 +1,37 @@
- 
\ No newline at end of file
+from ..node_base import Node
+from typing import Any, Dict
+from ..vector_store import get_collection
+
+class ChromaRecallNode(Node):
+    """
+    Top-k recall from a local vector collection. The query is `query` from
+    the config, or `query_field` (default "query") of each upstream item,
+    one result set per item. `where` filters on stored metadata
+    ({"source": "docs", "year": {"$gte": 2023}}); `min_score` drops weak hits.
+    """
+
+    async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
+        collection = get_collection(self.config.get("collection", "default"), self.config.get("embedder", "hashing"),
+                                    owner=(options or {}).get("owner"))
+        query_field = self.config.get("query_field", "query")
+        if self.config.get("query"):
+            queries = [str(self.config["query"])]
+        else:
+            rows = [item.get("json", item) if isinstance(item, dict) else {query_field: item} for item in inputs or []]
+            queries = [str(row[query_field]) for row in rows if row.get(query_field)]
+        if not queries:
+            return []
+        results = await collection.aquery(queries, k=self.config.get("top_k", 5), where=self.config.get("where"))
+        min_score = self.config.get("min_score")
+        return [
+            {"json": {"query": query, **hit}}
+            for query, hits in zip(queries, results)
+            for hit in hits if min_score is None or hit["score"] >= min_score
+        ]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "name": "ChromaRecallNode",
+            "description": "Recalls the most similar items from a local vector collection.",
+        }
@@ -1 +1,45 @@
- 
\ No newline at end of file
+from ..node_base import Node
+from typing import Any, Dict
+import hashlib
+from ..vector_store import get_collection
+
+class ChromaRememberNode(Node):
+    """
+    Stores upstream items in a local vector collection. The text to embed is
+    read from `text_field` (default "text"); the item id from `id_field`
+    (default: a hash of the text, so re-storing the same text replaces it).
+    The remaining fields, or only `metadata_fields` if given, are kept as
+    filterable metadata. Items are embedded and written `batch_size` at a time.
+    Collections are private to the workflow's owner.
+    """
+
+    async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
+        collection = get_collection(self.config.get("collection", "default"), self.config.get("embedder", "hashing"),
+                                    owner=(options or {}).get("owner"))
+        text_field = self.config.get("text_field", "text")
+        id_field = self.config.get("id_field")
+        metadata_fields = self.config.get("metadata_fields")
+        batch_size = self.config.get("batch_size", 256)
+        rows = [item.get("json", item) if isinstance(item, dict) else {text_field: item} for item in inputs or []]
+        if "text" in self.config:
+            rows.append({text_field: self.config["text"], **self.config.get("metadata", {})})
+        rows = [row for row in rows if row.get(text_field)]
+        stored = 0
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            texts = [str(row[text_field]) for row in batch]
+            ids = [str(row[id_field]) if id_field and row.get(id_field) is not None
+                   else hashlib.sha256(text.encode()).hexdigest()[:32] for row, text in zip(batch, texts)]
+            metadatas = [
+                {k: v for k, v in row.items() if k != text_field and (metadata_fields is None or k in metadata_fields)}
+                for row in batch
+            ]
+            stored += await collection.aadd(ids, texts, metadatas)
+        return [{"json": {"collection": self.config.get("collection", "default"), "stored": stored, "total": collection.count}}]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "name": "ChromaRememberNode",
+            "description": "Embeds items and stores them in a local vector collection.",
+        }
@@ -1,19 +1,53 @@
 from ..node_base import Node
 from typing import Any, Dict
-from ..sandbox import run_in_sandbox
+from ..sandbox import run_in_sandbox_async, run_batch_in_sandbox
+from ..sandbox_helpers import to_columns, to_items
+
+def _is_columnar(output: Any) -> bool:
+    if not isinstance(output, dict) or not output or not all(isinstance(v, list) for v in output.values()):
+        return False
+    return len({len(v) for v in output.values()}) == 1
+
+def _to_item(output: Any) -> Dict[str, Any]:
+    if isinstance(output, dict):
+        return {"json": output}
+    return {"json": {"result": output}}
 
 class CodeNode(Node):
+    """
+    Runs `code` in the restricted sandbox (in a worker process). By default
+    the snippet runs once with upstream items exposed as `items`; with
+    "mode": "each_item" it runs once per item with that item's json bound
+    to `item`, all in a single worker call. With "mode": "columns" it runs
+    once with the items also exposed as `columns` ({field: [values]}) for
+    the vectorized helpers; a columnar result is turned back into items.
+    """
+
     async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
         code = self.config["code"]
+        if self.config.get("mode") == "each_item" and isinstance(inputs, list):
+            results = await run_batch_in_sandbox(code, [item.get("json", item) for item in inputs])
+            return [{"json": {"error": r["error"]}} if "error" in r else _to_item(r["result"]) for r in results]
+        columnar = self.config.get("mode") == "columns"
         input_vars = inputs or {}
-        result = run_in_sandbox(code, input_vars)
+        if isinstance(input_vars, list):
+            # Upstream item lists are exposed to the snippet as `items`
+            input_vars = {"items": input_vars}
+            if columnar:
+                input_vars["columns"] = to_columns(inputs)
+        result = await run_in_sandbox_async(code, input_vars)
         if "error" in result:
             return [{"json": {"error": result["error"]}}]
-        return [{"json": {"result": result["result"]}}]
+        output = result["result"]
+        if columnar and _is_columnar(output):
+            return to_items(output)
+        if columnar and isinstance(output, list):
+            return [item if isinstance(item, dict) and "json" in item else _to_item(item) for item in output]
+        return [_to_item(output)]
 
     @property
     def metadata(self) -> Dict[str, Any]:
         return {
             "name": "CodeNode",
             "description": "Executes custom Python code in a restricted environment.",
-        } 
\ No newline at end of file
+        }
@@ -1,6 +1,5 @@
 from ..node_base import Node
 from typing import Any, Dict
-import httpx
 import base64
 
 class GmailNode(Node):
@@ -14,12 +13,12 @@ class GmailNode(Node):
         url = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
         headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
         payload = {"raw": encoded_message}
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            try:
-                return [{"json": response.json()}]
-            except Exception:
-                return [{"json": {"error": response.text}}]
+        client = self.http_client(url, options)
+        response = await client.post(url, json=payload, headers=headers)
+        try:
+            return [{"json": response.json()}]
+        except Exception:
+            return [{"json": {"error": response.text}}]
 
     @property
     def metadata(self) -> Dict[str, Any]:
@@ -1,29 +1,106 @@
-from ..node_base import Node
-from typing import Any, Dict
+import json
 import httpx
+from ..llm_cache import cached_response_json
+from ..node_base import Node
+from ..rate_limit import estimate_tokens, governor, governed_send, usage_tokens
+from ..retry import RETRYABLE_STATUS_CODES, raise_for_retryable_status
+from typing import Any, AsyncIterator, Dict, Optional
 from ..config import GROQ_API_KEY
 
+CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+def _input_prompt(inputs: Any) -> Optional[str]:
+    """`prompt` of the first upstream item, e.g. from SearchContextNode."""
+    for item in inputs if isinstance(inputs, list) else [inputs]:
+        body = item.get("json", item) if isinstance(item, dict) else None
+        if isinstance(body, dict) and body.get("prompt"):
+            return str(body["prompt"])
+    return None
+
 class GroqNode(Node):
+    """
+    Groq text generation. The prompt is config "prompt" or the `prompt` of the
+    upstream item. With "stream": true the engine's streaming mode receives
+    the answer as it is generated: {"delta"} items, then a final {"text",
+    "usage"} item that also carries the upstream `sources`.
+    """
+
+    @property
+    def api_key(self) -> str:
+        return self.credentials.get("api_key") or GROQ_API_KEY
+
     async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
-        prompt = self.config["prompt"]
+        prompt = self.config.get("prompt") or _input_prompt(inputs)
         url = "https://api.groq.com/v1/completions"
-        headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
         payload = {
             "model": self.config.get("model", "mixtral-8x7b-32768"),
             "prompt": prompt,
             "max_tokens": self.config.get("max_tokens", 256),
         }
+        client = self.http_client(url, options)
+
+        async def send():
+            response = await client.post(url, json=payload, headers=headers)
+            # Rate limits and upstream outages are left to the engine's retry policy
+            raise_for_retryable_status(response)
+            response.raise_for_status()
+            return response
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                return {"status": "SUCCESS", "data": response.json()}
-        except Exception as e:
+            return {"status": "SUCCESS", "data": await cached_response_json(self, "groq", payload, governed_send("groq", self.api_key, payload, send))}
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in RETRYABLE_STATUS_CODES:
+                raise
+            return {"status": "FAILED", "error": str(e)}
+        except ValueError as e:
             return {"status": "FAILED", "error": str(e)}
 
+    async def stream(self, inputs: Optional[AsyncIterator[Any]], options: Dict[str, Any] = None) -> AsyncIterator[Any]:
+        if not self.config.get("stream"):
+            async for item in super().stream(inputs, options):
+                yield item
+            return
+        upstream = [item async for item in inputs] if inputs is not None else []
+        prompt = self.config.get("prompt") or _input_prompt(upstream)
+        if not prompt:
+            raise ValueError("GroqNode needs a prompt in its config or from the upstream item")
+        payload = {
+            "model": self.config.get("model", "llama3-8b-8192"),
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.config.get("max_tokens", 256),
+            "temperature": self.config.get("temperature", 0.7),
+            "stream": True,
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        client = self.http_client(CHAT_URL, options)
+        text, usage = [], None
+        async with governor.limit("groq", self.api_key, estimate_tokens(payload["messages"], payload["max_tokens"])) as report_usage:
+            async with client.stream("POST", CHAT_URL, json=payload, headers=headers) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    usage = usage_tokens(chunk) or usage_tokens(chunk.get("x_groq")) or usage
+                    for choice in chunk.get("choices", []):
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            text.append(delta)
+                            yield {"json": {"delta": delta}}
+            report_usage(usage)
+        sources = [s for item in upstream if isinstance(item, dict) for s in item.get("json", {}).get("sources", [])]
+        self.span_attributes["llm.tokens"] = usage
+        yield {"json": {"text": "".join(text), "usage": usage, "sources": sources}}
+
     @property
     def metadata(self) -> Dict[str, Any]:
         return {
             "name": "GroqNode",
             "description": "Calls Groq LLM API for text generation.",
-        } 
\ No newline at end of file
+        }
@@ -1,6 +1,11 @@
 from ..node_base import Node
+from ..retry import raise_for_retryable_status
 from typing import Any, Dict
-import httpx
+
+def _get_path(data: Any, path: str) -> Any:
+    for part in path.split(".") if path else []:
+        data = data.get(part) if isinstance(data, dict) else None
+    return data
 
 class HttpRequestNode(Node):
     async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
@@ -8,13 +13,46 @@ class HttpRequestNode(Node):
         url = self.config["url"]
         headers = self.config.get("headers", {})
         data = self.config.get("data", None)
-        async with httpx.AsyncClient() as client:
+        client = self.http_client(url, options)
+        response = await client.request(method, url, headers=headers, data=data)
+        raise_for_retryable_status(response)
+        return [{"json": response.json()}]
+
+    async def stream(self, inputs=None, options: Dict[str, Any] = None):
+        """
+        With a "pagination" config ({"items_field": "results", "next_field": "next",
+        "max_pages": 100}) pages are fetched one at a time and their items are
+        yielded as they arrive, so only one page is held in memory.
+        """
+        pagination = self.config.get("pagination")
+        if not pagination:
+            async for item in super().stream(inputs, options):
+                yield item
+            return
+        if inputs is not None:
+            received = 0
+            async for _ in inputs:
+                received += 1
+            if not received:
+                return
+        method = self.config.get("method", "GET")
+        url = self.config["url"]
+        headers = self.config.get("headers", {})
+        data = self.config.get("data", None)
+        client = self.http_client(url, options)
+        for _ in range(pagination.get("max_pages", 100)):
             response = await client.request(method, url, headers=headers, data=data)
-            return [{"json": response.json()}]
+            raise_for_retryable_status(response)
+            body = response.json()
+            for item in _get_path(body, pagination.get("items_field")) or []:
+                yield {"json": item}
+            url = _get_path(body, pagination.get("next_field", "next"))
+            if not url:
+                break
 
     @property
     def metadata(self) -> Dict[str, Any]:
         return {
             "name": "HttpRequestNode",
             "description": "Performs an HTTP request and returns the response.",
-        } 
\ No newline at end of file
+        }
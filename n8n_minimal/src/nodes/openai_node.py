@@ -1,6 +1,8 @@
+from ..llm_cache import cached_response_json
 from ..node_base import Node
+from ..rate_limit import governed_send
+from ..retry import raise_for_retryable_status
 from typing import Any, Dict
-import httpx
 from ..config import OPENAI_API_KEY
 
 class OpenAINode(Node):
@@ -13,9 +15,14 @@ class OpenAINode(Node):
             "prompt": prompt,
             "max_tokens": self.config.get("max_tokens", 256),
         }
-        async with httpx.AsyncClient() as client:
+        client = self.http_client(url, options)
+
+        async def send():
             response = await client.post(url, json=payload, headers=headers)
-            return [{"json": response.json()}]
+            raise_for_retryable_status(response)
+            return response
+
+        return [{"json": await cached_response_json(self, "openai", payload, governed_send("openai", OPENAI_API_KEY, payload, send))}]
 
     @property
     def metadata(self) -> Dict[str, Any]:
@@ -0,0 +1,47 @@
+from ..node_base import Node
+from typing import Any, Dict
+from ..config import SEARCH_CONTEXT_MAX_TOKENS
+from ..snippets import format_context, select_snippets
+
+DEFAULT_PROMPT = (
+    "Answer the question using the search results below and cite them as [n]. "
+    "If they do not contain the answer, say so.\n\n"
+    "Search results:\n{context}\n\nQuestion: {question}"
+)
+
+class SearchContextNode(Node):
+    """
+    Merges the results of one or more upstream search nodes (TavilyNode) into
+    a prompt. Results are deduplicated by URL and reduced to the passages most
+    relevant to `question` within `max_tokens` (see src/snippets.py). Emits
+    one item {"prompt", "context", "sources"} for an LLM node without a
+    configured prompt.
+    """
+
+    async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
+        question = str(self.config.get("question", ""))
+        documents, urls = [], set()
+        for item in inputs or []:
+            body = item.get("json", item) if isinstance(item, dict) else {}
+            for result in body.get("results") or []:
+                if result.get("url") in urls:
+                    continue
+                urls.add(result.get("url"))
+                documents.append(result)
+        sources = select_snippets(question, documents, int(self.config.get("max_tokens") or SEARCH_CONTEXT_MAX_TOKENS))
+        context = format_context(sources)
+        self.span_attributes["search.documents"] = len(documents)
+        self.span_attributes["search.sources"] = len(sources)
+        prompt = self.config.get("prompt", DEFAULT_PROMPT).replace("{context}", context or "(no results)").replace("{question}", question)
+        return [{"json": {
+            "prompt": prompt,
+            "context": context,
+            "sources": [{"title": s["title"], "url": s["url"]} for s in sources],
+        }}]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "name": "SearchContextNode",
+            "description": "Builds a token-budgeted LLM prompt from the most relevant search result passages.",
+        }
@@ -1,6 +1,5 @@
 from ..node_base import Node
 from typing import Any, Dict
-import httpx
 import logging
 import os
 
@@ -22,15 +21,15 @@ class SlackNode(Node):
             if blocks:
                 payload["blocks"] = blocks
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(url, json=payload, headers={**headers, "Content-Type": "application/json"})
-                    data = response.json()
-                    if not data.get("ok"):
-                        logging.error(f"Slack API error: {data}")
-                        results.append({"json": {"status": "FAILED", "error": data.get("error", "Unknown error"), "response": data}})
-                    else:
-                        logging.info(f"Slack message sent: {data}")
-                        results.append({"json": {"status": "SUCCESS", "ts": data.get("ts"), "channel": channel}})
+                client = self.http_client(url, options)
+                response = await client.post(url, json=payload, headers={**headers, "Content-Type": "application/json"})
+                data = response.json()
+                if not data.get("ok"):
+                    logging.error(f"Slack API error: {data}")
+                    results.append({"json": {"status": "FAILED", "error": data.get("error", "Unknown error"), "response": data}})
+                else:
+                    logging.info(f"Slack message sent: {data}")
+                    results.append({"json": {"status": "SUCCESS", "ts": data.get("ts"), "channel": channel}})
             except Exception as e:
                 logging.exception("SlackNode message send failed")
                 results.append({"json": {"status": "FAILED", "error": str(e)}})
@@ -41,15 +40,15 @@ class SlackNode(Node):
                 with open(file_path, "rb") as f:
                     files = {"file": (os.path.basename(file_path), f)}
                     data = {"channels": channel, "title": file_title}
-                    async with httpx.AsyncClient() as client:
-                        response = await client.post(url, data=data, files=files, headers=headers)
-                        data = response.json()
-                        if not data.get("ok"):
-                            logging.error(f"Slack file upload error: {data}")
-                            results.append({"json": {"status": "FAILED", "error": data.get("error", "Unknown error"), "response": data}})
-                        else:
-                            logging.info(f"Slack file uploaded: {data}")
-                            results.append({"json": {"status": "SUCCESS", "file_id": data.get("file", {}).get("id"), "channel": channel}})
+                    client = self.http_client(url, options)
+                    response = await client.post(url, data=data, files=files, headers=headers)
+                    data = response.json()
+                    if not data.get("ok"):
+                        logging.error(f"Slack file upload error: {data}")
+                        results.append({"json": {"status": "FAILED", "error": data.get("error", "Unknown error"), "response": data}})
+                    else:
+                        logging.info(f"Slack file uploaded: {data}")
+                        results.append({"json": {"status": "SUCCESS", "file_id": data.get("file", {}).get("id"), "channel": channel}})
             except Exception as e:
                 logging.exception("SlackNode file upload failed")
                 results.append({"json": {"status": "FAILED", "error": str(e)}})
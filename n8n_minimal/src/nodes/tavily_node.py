@@ -1,20 +1,29 @@
 from ..node_base import Node
+from ..rate_limit import governed_send
+from ..retry import raise_for_retryable_status
 from typing import Any, Dict
-import httpx
 from ..config import TAVILY_API_KEY
 
 class TavilyNode(Node):
     async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
         query = self.config["query"]
         url = "https://api.tavily.com/search"
-        headers = {"Authorization": f"Bearer {TAVILY_API_KEY}", "Content-Type": "application/json"}
+        api_key = self.credentials.get("api_key") or TAVILY_API_KEY
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
         payload = {
             "query": query,
-            "num_results": self.config.get("num_results", 3),
+            "max_results": self.config.get("num_results", 3),
         }
-        async with httpx.AsyncClient() as client:
+        client = self.http_client(url, options)
+
+        async def send():
             response = await client.post(url, json=payload, headers=headers)
-            return [{"json": response.json()}]
+            raise_for_retryable_status(response)
+            response.raise_for_status()
+            return response
+
+        response = await governed_send("tavily", api_key, payload, send)()
+        return [{"json": response.json()}]
 
     @property
     def metadata(self) -> Dict[str, Any]:
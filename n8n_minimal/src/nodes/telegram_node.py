@@ -1,6 +1,5 @@
 from ..node_base import Node
 from typing import Any, Dict
-import httpx
 
 class TelegramNode(Node):
     async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
@@ -9,9 +8,9 @@ class TelegramNode(Node):
         message = self.config["message"]
         url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
         payload = {"chat_id": chat_id, "text": message}
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload)
-            return [{"json": response.json()}]
+        client = self.http_client(url, options)
+        response = await client.post(url, json=payload)
+        return [{"json": response.json()}]
 
     @property
     def metadata(self) -> Dict[str, Any]:
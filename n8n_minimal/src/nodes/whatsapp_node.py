@@ -1,6 +1,5 @@
 from ..node_base import Node
 from typing import Any, Dict
-import httpx
 
 class WhatsAppNode(Node):
     async def execute(self, inputs: Any = None, options: Dict[str, Any] = None) -> Any:
@@ -16,12 +15,12 @@ class WhatsAppNode(Node):
             "type": "text",
             "text": {"body": message}
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            try:
-                return [{"json": response.json()}]
-            except Exception:
-                return [{"json": {"error": response.text}}]
+        client = self.http_client(url, options)
+        response = await client.post(url, json=payload, headers=headers)
+        try:
+            return [{"json": response.json()}]
+        except Exception:
+            return [{"json": {"error": response.text}}]
 
     @property
     def metadata(self) -> Dict[str, Any]:
@@ -0,0 +1,67 @@
+"""
+Keyset pagination for list endpoints. Pages are ordered newest first by _id;
+the client passes the last _id it received as `after` to get the next page.
+The body is streamed as a JSON array, so a page is never held in memory as a
+whole. The cursor for the next page is returned in the X-Next-After header
+(absent on the last page). The header is sent before the body is read, so the
+body is bounded by the same last _id rather than by a second limit: documents
+inserted or deleted in between can change the page's length, but never let
+the next page skip one.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pymongo import DESCENDING
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Heavy fields left out of list responses with view=summary
+SUMMARY_PROJECTIONS = {
+    "workflows": {"nodes": 0, "connections": 0},
+    "executions": {"log": 0, "result": 0},
+}
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _keyset_query(query: Dict[str, Any], after: Optional[str]) -> Dict[str, Any]:
+    if not after:
+        return query
+    try:
+        return {**query, "_id": {"$lt": ObjectId(after)}}
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid 'after' cursor")
+
+async def paginated_response(collection, query: Dict[str, Any], after: Optional[str] = None,
+                             limit: int = DEFAULT_PAGE_SIZE, view: str = "full") -> StreamingResponse:
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = _keyset_query(query, after)
+    projection = SUMMARY_PROJECTIONS.get(collection.name) if view == "summary" else None
+
+    # Index-only probe for the last _id of this page and whether another page follows
+    boundary = await collection.find(query, {"_id": 1}).sort("_id", DESCENDING).skip(limit - 1).limit(2).to_list(2)
+    headers = {"X-Next-After": str(boundary[0]["_id"])} if len(boundary) == 2 else {}
+    if boundary:
+        query = {**query, "_id": {**query.get("_id", {}), "$gte": boundary[0]["_id"]}}
+
+    async def body():
+        yield "["
+        first = True
+        cursor = collection.find(query, projection).sort("_id", DESCENDING).batch_size(min(limit, 100))
+        async for doc in cursor:
+            yield ("" if first else ",") + json.dumps(doc, default=_json_default)
+            first = False
+        yield "]"
+
+    return StreamingResponse(body(), media_type="application/json", headers=headers)
@@ -0,0 +1,453 @@
+"""
+Outbound rate governor. Calls to a provider are admitted through token
+buckets keyed by (provider, credential fingerprint), one for requests per
+minute and one for tokens per minute, so concurrent workflows stay under the
+provider's limits instead of bursting into 429s and retrying.
+
+Callers that have to wait are queued per user and admitted round-robin, so
+one user's batch cannot starve everyone else. A 429 with Retry-After pauses
+the whole key, not just the failed call. With RATE_LIMIT_BACKEND=mongo every
+admission is also counted in a per-minute window shared by all processes;
+a call the window turns away gives its local slot back and queues again.
+"""
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import httpx
+from .config import RATE_LIMIT_BACKEND, RATE_LIMITS_JSON, SECRET_KEY, get_mongodb_uri
+from .retry import retry_after_seconds
+
+# Requests and tokens per minute by provider; None means unlimited.
+# Conservative free-tier defaults, overridable with RATE_LIMITS_JSON.
+DEFAULT_RATE_LIMITS: Dict[str, Dict[str, Optional[int]]] = {
+    "groq": {"rpm": 30, "tpm": 6000},
+    "openai": {"rpm": 500, "tpm": 200000},
+    "anthropic": {"rpm": 50, "tpm": 40000},
+    "together": {"rpm": 60, "tpm": None},
+    "cohere": {"rpm": 100, "tpm": None},
+    "mistral": {"rpm": 60, "tpm": 500000},
+    "tavily": {"rpm": 100, "tpm": None},
+}
+RATE_LIMITS = {**DEFAULT_RATE_LIMITS, **json.loads(RATE_LIMITS_JSON or "{}")}
+
+# User the current request runs for; set by the API endpoints and inherited
+# by the tasks they start
+current_user: contextvars.ContextVar[str] = contextvars.ContextVar("rate_limit_user", default="anonymous")
+
+def credential_key(credential: Any) -> str:
+    """
+    Digest identifying a credential in limiter keys. Keyed with SECRET_KEY so
+    every API and worker process derives the same key (and the same Mongo
+    window) without the credential itself being stored.
+    """
+    return hmac.new(SECRET_KEY.encode(), str(credential).encode(), hashlib.sha256).hexdigest()[:16]
+
+def estimate_tokens(payload: Any, max_tokens: Optional[int] = None) -> int:
+    """Rough prompt size (~4 characters per token) plus the completion budget."""
+    return len(json.dumps(payload, default=str)) // 4 + (max_tokens or 0)
+
+class TokenBucket:
+    """`per_minute` units refilled continuously; may go negative when usage is settled after the fact."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A request larger than the bucket is admitted once the bucket is full
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+    def give(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class MongoWindow:
+    """Per-minute request/token counters in Mongo, shared by every process using the same key."""
+
+    def __init__(self, db, collection: str = "rate_limit_windows"):
+        self.windows = db[collection]
+        self._indexed = False
+
+    async def reserve(self, key: str, tokens: int, rpm: Optional[int], tpm: Optional[int]) -> float:
+        """0 if the call fits in the current window (and is counted), else seconds until the next one."""
+        from pymongo import ReturnDocument
+        if not self._indexed:
+            await self.windows.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        now = time.time()
+        window = int(now // 60)
+        doc = await self.windows.find_one_and_update(
+            {"_id": f"{key}:{window}"},
+            {"$inc": {"requests": 1, "tokens": tokens},
+             "$setOnInsert": {"expires_at": datetime.fromtimestamp((window + 2) * 60, timezone.utc)}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        # The first call of a window is always admitted, however large
+        if doc["requests"] > 1 and ((rpm and doc["requests"] > rpm) or (tpm and doc["tokens"] > tpm)):
+            await self.windows.update_one({"_id": f"{key}:{window}"}, {"$inc": {"requests": -1, "tokens": -tokens}})
+            return (window + 1) * 60 - now
+        return 0.0
+
+class _Waiter:
+    __slots__ = ("future", "tokens")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+
+class ProviderLimiter:
+    def __init__(self, provider: str, key: str, rpm: Optional[int], tpm: Optional[int], window: MongoWindow = None):
+        self.provider = provider
+        self.key = key
+        self.rpm, self.tpm = rpm, tpm
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.window = window
+        self.paused_until = 0.0
+        self.queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.granted = 0
+        self.immediate = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    def _wait_time(self, tokens: int) -> float:
+        now = time.monotonic()
+        wait = max(0.0, self.paused_until - now)
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def _take(self, tokens: int, queued: bool = False):
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(min(tokens, self.tokens.capacity))
+        self.granted += 1
+        self.immediate += not queued
+
+    def _refund(self, tokens: int, queued: bool):
+        with self.lock:
+            if self.requests:
+                self.requests.give(1)
+            if self.tokens:
+                self.tokens.give(min(tokens, self.tokens.capacity))
+            self.granted -= 1
+            self.immediate -= not queued
+
+    async def acquire(self, user: str, tokens: int = 0):
+        """Wait for this call's turn; callers of different users are admitted round-robin."""
+        started = time.monotonic()
+        waited = False
+        while True:
+            queued = await self._admit_local(user, tokens)
+            wait = await self.window.reserve(self.key, tokens, self.rpm, self.tpm) if self.window is not None else 0.0
+            waited = waited or queued or bool(wait)
+            if not wait:
+                break
+            # The shared window is full: hand the local slot back and queue again once it reopens
+            self._refund(tokens, queued)
+            await asyncio.sleep(wait)
+        if waited:
+            with self.lock:
+                self.wait_seconds += time.monotonic() - started
+
+    async def _admit_local(self, user: str, tokens: int) -> bool:
+        """Take this call's slot from the local buckets; True if it had to queue for it."""
+        with self.lock:
+            if not self.queues and not self._wait_time(tokens):
+                self._take(tokens)
+                immediate = True
+            else:
+                immediate = False
+                waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens)
+                self.queues.setdefault(user, deque()).append(waiter)
+                self.throttled += 1
+                if self.dispatcher is None or self.dispatcher.done():
+                    self.dispatcher = asyncio.create_task(self._dispatch())
+        if not immediate:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self.lock:
+                    if not waiter.future.done():
+                        waiter.future.cancel()
+                raise
+        return not immediate
+
+    async def _dispatch(self):
+        while True:
+            with self.lock:
+                # Next user in rotation; skip waiters that gave up
+                while self.queues:
+                    user, queue = next(iter(self.queues.items()))
+                    while queue and queue[0].future.done():
+                        queue.popleft()
+                    if queue:
+                        break
+                    del self.queues[user]
+                if not self.queues:
+                    self.dispatcher = None
+                    return
+                waiter = queue[0]
+                wait = self._wait_time(waiter.tokens)
+                if not wait:
+                    queue.popleft()
+                    self.queues.move_to_end(user)
+                    if not queue:
+                        del self.queues[user]
+                    self._take(waiter.tokens, queued=True)
+                    waiter.future.set_result(None)
+            if wait:
+                await asyncio.sleep(wait)
+
+    def acquire_blocking(self, tokens: int = 0):
+        """Thread-side admission for sync callers; not part of the fair queue."""
+        while True:
+            with self.lock:
+                wait = self._wait_time(tokens) if not self.queues else max(self._wait_time(tokens), 0.05)
+                if not wait:
+                    self._take(tokens)
+                    return
+            time.sleep(wait)
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once the provider reported the real usage."""
+        if self.tokens and actual is not None:
+            with self.lock:
+                self.tokens.take(min(actual, self.tokens.capacity) - min(estimated, self.tokens.capacity))
+
+    def pause(self, seconds: float):
+        """Hold every call for this key, e.g. after a 429 with Retry-After."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def pause_for(self, error: BaseException):
+        """Pause the key if `error` is a 429, for its Retry-After or one request interval."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is None and getattr(getattr(error, "response", None), "status_code", None) == 429:
+            retry_after = 60.0 / (self.rpm or 60)
+        if retry_after:
+            self.pause(retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider, "queued": self.queued, "users_waiting": len(self.queues),
+            "granted": self.granted, "immediate": self.immediate, "throttled": self.throttled, "wait_seconds": round(self.wait_seconds, 3),
+            "rpm": self.rpm, "tpm": self.tpm,
+        }
+
+class RateGovernor:
+    def __init__(self, limits: Dict[str, Dict[str, Optional[int]]] = None, backend: str = RATE_LIMIT_BACKEND):
+        self.limits = limits if limits is not None else RATE_LIMITS
+        self.backend = backend
+        self.limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self.lock = threading.Lock()
+        self._window = None
+
+    def _shared_window(self) -> Optional[MongoWindow]:
+        if self.backend != "mongo":
+            return None
+        if self._window is None:
+            from .db import get_db_from_uri
+            _, db = get_db_from_uri(get_mongodb_uri())
+            self._window = MongoWindow(db)
+        return self._window
+
+    def limiter(self, provider: str, credential: Any = None) -> Optional[ProviderLimiter]:
+        """Limiter for a provider and credential (keyed by fingerprint), or None if the provider is unlimited."""
+        limits = self.limits.get(provider)
+        if not limits or not (limits.get("rpm") or limits.get("tpm")):
+            return None
+        key = (provider, credential_key(credential) if credential else "default")
+        with self.lock:
+            if key not in self.limiters:
+                self.limiters[key] = ProviderLimiter(
+                    provider, ":".join(key), limits.get("rpm"), limits.get("tpm"), self._shared_window(),
+                )
+            return self.limiters[key]
+
+    @contextlib.asynccontextmanager
+    async def limit(self, provider: str, credential: Any = None, tokens: int = 0, user: str = None):
+        """
+        Admit one call. Yields a function to report the real token usage;
+        a 429 raised inside the block pauses the key for its Retry-After.
+        """
+        limiter = self.limiter(provider, credential)
+        if limiter is None:
+            yield lambda actual: None
+            return
+        await limiter.acquire(user or current_user.get(), tokens)
+        try:
+            yield lambda actual: limiter.settle(tokens, actual)
+        except Exception as e:
+            limiter.pause_for(e)
+            raise
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {limiter.key: limiter.stats() for limiter in list(self.limiters.values())}
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths: Dict[str, int] = {}
+        for limiter in list(self.limiters.values()):
+            depths[limiter.provider] = depths.get(limiter.provider, 0) + limiter.queued
+        return depths
+
+governor = RateGovernor()
+
+def usage_tokens(body: Any) -> Optional[int]:
+    """Total tokens reported in an OpenAI/Groq/Anthropic style response body."""
+    usage = body.get("usage") if isinstance(body, dict) else None
+    if not isinstance(usage, dict):
+        return None
+    if "total_tokens" in usage:
+        return usage["total_tokens"]
+    if "input_tokens" in usage or "output_tokens" in usage:
+        return usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    return None
+
+def governed_send(provider: str, credential: Any, payload: Dict[str, Any],
+                  send: Callable[[], Awaitable[httpx.Response]]) -> Callable[[], Awaitable[httpx.Response]]:
+    """
+    `send` admitted through the governor, for use with cached_response_json
+    so cache hits never take from the provider's budget.
+    """
+    async def governed():
+        tokens = estimate_tokens(payload.get("messages", payload.get("prompt", payload.get("query"))), payload.get("max_tokens") or payload.get("max_tokens_to_sample"))
+        async with governor.limit(provider, credential, tokens) as report_usage:
+            response = await send()
+            with contextlib.suppress(ValueError):
+                report_usage(usage_tokens(response.json()))
+            return response
+    return governed
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.rate_limiters import BaseRateLimiter
+except ImportError:  # pragma: no cover - langchain is only needed by the agent
+    BaseCallbackHandler = BaseRateLimiter = object
+
+# Size of the model call about to be made in this context, set by
+# GovernorCallbackHandler and admitted by GovernorRateLimiter
+_model_call: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("rate_limit_model_call", default=None)
+
+def llm_result_tokens(result: Any) -> Optional[int]:
+    """Total tokens of a LangChain LLMResult, from usage_metadata or the provider's llm_output."""
+    totals = [
+        g.message.usage_metadata["total_tokens"]
+        for generations in result.generations for g in generations
+        if getattr(getattr(g, "message", None), "usage_metadata", None) and "total_tokens" in g.message.usage_metadata
+    ]
+    if totals:
+        return sum(totals)
+    output = result.llm_output or {}
+    return usage_tokens({"usage": output.get("token_usage") or output.get("usage")})
+
+class GovernorCallbackHandler(BaseCallbackHandler):
+    """
+    Sizes LangChain model calls for GovernorRateLimiter and settles them.
+
+    It runs inline, in the calling task before the LLM cache lookup and the
+    model's rate limiter, so the limiter admits the call with an estimate of
+    its prompt plus max_tokens. on_llm_end replaces that estimate with the
+    usage the provider reported; cache hits were never admitted and are
+    not charged.
+    """
+    run_inline = True
+
+    def __init__(self, max_tokens: Optional[int] = None):
+        self.max_tokens = max_tokens
+        self._calls: Dict[Any, Dict[str, Any]] = {}
+
+    def _start(self, run_id, payload: Any):
+        call = {"tokens": estimate_tokens(payload, self.max_tokens), "limiter": None}
+        self._calls[run_id] = call
+        _model_call.set(call)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, [[m.content for m in batch] for batch in messages])
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, prompts)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call and call["limiter"]:
+            call["limiter"].settle(call["tokens"], llm_result_tokens(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call and call["limiter"]:
+            call["limiter"].pause_for(error)
+
+class GovernorRateLimiter(BaseRateLimiter):
+    """LangChain rate limiter that admits chat model calls through the governor."""
+
+    def __init__(self, provider: str, credential: Any = None, max_tokens: Optional[int] = None):
+        self.provider = provider
+        self.credential = credential
+        self.max_tokens = max_tokens
+
+    def _call(self):
+        """(limiter, call, tokens) for the model call being admitted."""
+        call = _model_call.get()
+        tokens = call["tokens"] if call else estimate_tokens("", self.max_tokens)
+        return governor.limiter(self.provider, self.credential), call, tokens
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        limiter, call, tokens = self._call()
+        if limiter is None:
+            return True
+        if not blocking:
+            with limiter.lock:
+                if limiter.queues or limiter._wait_time(tokens):
+                    return False
+                limiter._take(tokens)
+        else:
+            limiter.acquire_blocking(tokens)
+        if call:
+            call["limiter"] = limiter
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        limiter, call, tokens = self._call()
+        if limiter is None:
+            return True
+        if not blocking:
+            return self.acquire(blocking=False)
+        await limiter.acquire(current_user.get(), tokens)
+        if call:
+            call["limiter"] = limiter
+        return True
+
+def governed_model_kwargs(provider: str, credential: Any, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """Chat model constructor kwargs that put the model behind the governor."""
+    return {
+        "rate_limiter": GovernorRateLimiter(provider, credential, max_tokens),
+        "callbacks": [GovernorCallbackHandler(max_tokens)],
+    }
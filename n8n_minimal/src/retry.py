@@ -0,0 +1,100 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+import httpx
+
+# Upstream statuses worth retrying; 429/503 may carry a Retry-After header
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Retries shared by all nodes of one workflow run, to stop retry storms
+WORKFLOW_RETRY_BUDGET = 10
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the n-th retry sleeps a random time
+    in [0, min(max_delay, base_delay * 2**n)], unless the upstream asked for a
+    specific delay via Retry-After.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 30.0,
+                 retry_failed_results: bool = True):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Whether {'status': 'FAILED'} results from a node are retried
+        self.retry_failed_results = retry_failed_results
+
+    def with_overrides(self, overrides: Optional[Dict[str, Any]]) -> "RetryPolicy":
+        if not overrides:
+            return self
+        return RetryPolicy(
+            max_attempts=overrides.get("max_attempts", self.max_attempts),
+            base_delay=overrides.get("base_delay", self.base_delay),
+            max_delay=overrides.get("max_delay", self.max_delay),
+            retry_failed_results=overrides.get("retry_failed_results", self.retry_failed_results),
+        )
+
+    def is_retryable(self, error: BaseException) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError))
+
+    def delay(self, attempt: int, error: BaseException = None) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+def retry_after_seconds(error: Optional[BaseException]) -> Optional[float]:
+    """Seconds requested by a 429/503 response's Retry-After header, if any."""
+    if not isinstance(error, httpx.HTTPStatusError) or error.response.status_code not in (429, 503):
+        return None
+    value = error.response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def raise_for_retryable_status(response: httpx.Response):
+    """Raise HTTPStatusError for responses the engine should retry."""
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        response.raise_for_status()
+
+class RetryBudget:
+    """Retries left for a whole workflow run."""
+
+    def __init__(self, retries: int = WORKFLOW_RETRY_BUDGET):
+        self.remaining = retries
+
+    def try_acquire(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+_LLM_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=60.0)
+
+RETRY_POLICIES = {
+    "GroqNode": _LLM_RETRY_POLICY,
+    "OpenAINode": _LLM_RETRY_POLICY,
+    "AnthropicNode": _LLM_RETRY_POLICY,
+    "TavilyNode": RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=30.0),
+    # Triggers and code are deterministic; retrying them only wastes time
+    "ManualTriggerNode": RetryPolicy(max_attempts=1),
+    "ScheduleTriggerNode": RetryPolicy(max_attempts=1),
+    "WebhookTriggerNode": RetryPolicy(max_attempts=1),
+    "CodeNode": RetryPolicy(max_attempts=1),
+}
+
+def get_retry_policy(node_type: str, config: Dict[str, Any] = None) -> RetryPolicy:
+    """Policy for a node type, with optional per-node overrides from config['retry']."""
+    policy = RETRY_POLICIES.get(node_type, DEFAULT_RETRY_POLICY)
+    return policy.with_overrides((config or {}).get("retry"))
@@ -1,8 +1,76 @@
+import asyncio
+import functools
+import hashlib
+import multiprocessing
+import operator
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
 from RestrictedPython import compile_restricted, safe_globals
+from RestrictedPython.Eval import default_guarded_getitem, default_guarded_getiter
+from RestrictedPython.Guards import full_write_guard, guarded_iter_unpack_sequence, guarded_unpack_sequence
+from .config import (
+    SANDBOX_PROCESSES, SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB, SANDBOX_CODE_CACHE_SIZE, SANDBOX_WALL_SECONDS,
+)
+from .sandbox_helpers import SANDBOX_HELPERS
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
 
 class SandboxError(Exception):
     pass
 
+class SandboxTimeout(SandboxError):
+    pass
+
+_INPLACE_OPS = {
+    "+=": operator.iadd, "-=": operator.isub, "*=": operator.imul, "/=": operator.itruediv,
+    "//=": operator.ifloordiv, "%=": operator.imod, "**=": operator.ipow,
+}
+
+def _inplacevar(op: str, x: Any, y: Any) -> Any:
+    if op not in _INPLACE_OPS:
+        raise SandboxError(f"Operator {op} is not allowed")
+    return _INPLACE_OPS[op](x, y)
+
+# safe_globals plus the guards RestrictedPython needs for indexing, loops,
+# unpacking and augmented assignment, a few pure builtins and the columnar helpers
+SANDBOX_GLOBALS = {
+    **safe_globals,
+    "__builtins__": {
+        **safe_globals["__builtins__"],
+        "list": list, "dict": dict, "set": set, "enumerate": enumerate,
+        "sum": sum, "min": min, "max": max, "any": any, "all": all,
+    },
+    "_getitem_": default_guarded_getitem,
+    "_getiter_": default_guarded_getiter,
+    "_iter_unpack_sequence_": guarded_iter_unpack_sequence,
+    "_unpack_sequence_": guarded_unpack_sequence,
+    "_write_": full_write_guard,
+    "_inplacevar_": _inplacevar,
+    **SANDBOX_HELPERS,
+}
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode()).hexdigest()
+
+@functools.lru_cache(maxsize=SANDBOX_CODE_CACHE_SIZE)
+def _compile_cached(key: str, code: str):
+    return compile_restricted(code, '<string>', 'exec')
+
+def compile_snippet(code: str):
+    """Restricted bytecode for `code`, compiled once per code hash (per process)."""
+    return _compile_cached(code_hash(code), code)
+
+def _exec(byte_code, input_vars: dict) -> Any:
+    local_vars = {}
+    exec(byte_code, {**SANDBOX_GLOBALS, **input_vars}, local_vars)
+    return local_vars.get("result")
+
 def run_in_sandbox(code: str, input_vars: dict = None) -> dict:
     """
     Execute user code in a restricted Python sandbox.
@@ -10,9 +78,195 @@ def run_in_sandbox(code: str, input_vars: dict = None) -> dict:
     """
     input_vars = input_vars or {}
     try:
-        byte_code = compile_restricted(code, '<string>', 'exec')
-        local_vars = {}
-        exec(byte_code, {**safe_globals, **input_vars}, local_vars)
-        return {"result": local_vars.get("result")}
+        return {"result": _exec(compile_snippet(code), input_vars)}
+    except Exception as e:
+        return {"error": str(e)}
+
+# --- Worker processes ---
+
+# Set once the running call has been sent SIGXCPU
+_cpu_overrun = False
+
+def _on_cpu_limit(signum, frame):
+    global _cpu_overrun
+    if _cpu_overrun:
+        # The kernel repeats SIGXCPU every CPU second; a second one means the
+        # snippet swallowed the first, so the worker dies (the pool replaces it)
+        os.kill(os.getpid(), signal.SIGKILL)
+    _cpu_overrun = True
+    raise SandboxTimeout(f"CPU time limit of {SANDBOX_CPU_SECONDS}s exceeded")
+
+def _init_worker(memory_mb: int):
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _cpu_budget(cpu_seconds: int):
+    """
+    RLIMIT_CPU counts the whole process lifetime, so each call moves the soft
+    limit to the CPU already used plus this call's budget. SIGXCPU then fires
+    inside the snippet that overran it.
+    """
+    global _cpu_overrun
+    _cpu_overrun = False
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, hard))
+
+def _clear_cpu_budget():
+    # Lifted between calls so an overrun snippet cannot signal the idle worker
+    if resource is not None:
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+def _run_in_worker(code: str, input_vars: dict, cpu_seconds: int) -> dict:
+    _cpu_budget(cpu_seconds)
+    try:
+        return {"result": _exec(compile_snippet(code), input_vars)}
+    except MemoryError:
+        return {"error": f"Memory limit of {SANDBOX_MEMORY_MB}MB exceeded"}
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        _clear_cpu_budget()
+
+def _run_batch_in_worker(code: str, items: List[Any], var_name: str, shared_vars: dict, cpu_seconds: int) -> List[dict]:
+    # One CPU budget for the whole batch
+    _cpu_budget(cpu_seconds)
+    results = []
+    try:
+        byte_code = compile_snippet(code)
+        for item in items:
+            try:
+                results.append({"result": _exec(byte_code, {**shared_vars, var_name: item})})
+            except SandboxTimeout:
+                raise
+            except MemoryError:
+                results.append({"error": f"Memory limit of {SANDBOX_MEMORY_MB}MB exceeded"})
+            except Exception as e:
+                results.append({"error": str(e)})
+    except Exception as e:
+        # Items the batch did not get to share the error that stopped it
+        results.extend([{"error": str(e)}] * (len(items) - len(results)))
+    finally:
+        _clear_cpu_budget()
+    return results
+
+def _worker_main(conn, memory_mb: int):
+    _init_worker(memory_mb)
+    while True:
+        try:
+            fn, args = conn.recv()
+        except EOFError:
+            return
+        conn.send(fn(*args))
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, SANDBOX_MEMORY_MB), daemon=True)
+        self.process.start()
+        child.close()
+
+    def call(self, fn, args, timeout: float) -> Any:
+        self.conn.send((fn, args))
+        if not self.conn.poll(timeout):
+            raise SandboxTimeout(f"Wall-clock limit of {timeout:g}s exceeded")
+        try:
+            return self.conn.recv()
+        except EOFError:
+            self.process.join(1)
+            if self.process.exitcode == -signal.SIGKILL:
+                raise SandboxTimeout("CPU time limit exceeded")
+            raise SandboxError("Sandbox worker crashed")
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class SandboxPool:
+    """
+    Worker processes that each run one call at a time. Calls are dispatched
+    from a thread per worker slot, so a call that outlives its wall-clock
+    limit, or whose worker dies, costs exactly that worker: it is killed and
+    the next call starts a fresh one.
+    """
+
+    def __init__(self, size: int = SANDBOX_PROCESSES):
+        # spawn: workers must not inherit the API's threads, sockets or event loop
+        self.ctx = multiprocessing.get_context("spawn")
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sandbox")
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _run(self, fn, args, timeout: float) -> Any:
+        with self._lock:
+            worker = self._idle.pop() if self._idle else None
+        worker = worker or _Worker(self.ctx)
+        try:
+            result = worker.call(fn, args, timeout)
+        except BaseException:
+            worker.kill()
+            raise
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                return result
+        worker.kill()
+        return result
+
+    async def run(self, fn, *args, timeout: float) -> Any:
+        return await asyncio.wrap_future(self.executor.submit(self._run, fn, args, timeout))
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+_pool = None
+
+def get_sandbox_pool() -> SandboxPool:
+    global _pool
+    if _pool is None:
+        _pool = SandboxPool(SANDBOX_PROCESSES)
+    return _pool
+
+def shutdown_sandbox_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+async def _submit(fn, *args, cpu_seconds: int) -> Any:
+    # Wall-clock backstop for what RLIMIT_CPU cannot see (blocking calls, idle waits)
+    return await get_sandbox_pool().run(fn, *args, timeout=max(SANDBOX_WALL_SECONDS, cpu_seconds + 1))
+
+async def run_in_sandbox_async(code: str, input_vars: dict = None, cpu_seconds: int = SANDBOX_CPU_SECONDS) -> dict:
+    """
+    Like run_in_sandbox, but in a worker process with CPU-time, wall-clock
+    and memory limits, so a heavy snippet cannot block the event loop.
+    """
+    try:
+        return await _submit(_run_in_worker, code, input_vars or {}, cpu_seconds, cpu_seconds=cpu_seconds)
+    except Exception as e:
+        return {"error": str(e)}
+
+async def run_batch_in_sandbox(code: str, items: List[Any], var_name: str = "item", shared_vars: Dict[str, Any] = None,
+                               cpu_seconds: int = SANDBOX_CPU_SECONDS) -> List[dict]:
+    """
+    Run one compiled snippet once per item in a single worker call. Each
+    item is bound to `var_name`; returns one {'result'}/{'error'} per item.
+    """
+    try:
+        return await _submit(_run_batch_in_worker, code, items, var_name, shared_vars or {}, cpu_seconds, cpu_seconds=cpu_seconds)
     except Exception as e:
-        return {"error": str(e)} 
\ No newline at end of file
+        return [{"error": str(e)}] * len(items)
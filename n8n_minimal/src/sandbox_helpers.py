@@ -0,0 +1,181 @@
+"""
+Columnar helpers exposed to CodeNode snippets. They run as regular Python
+(NumPy when installed) outside the restricted interpreter, so a transform
+over thousands of items is one helper call instead of a RestrictedPython
+loop. Inputs and outputs are plain lists and dicts; NumPy arrays never
+reach user code.
+"""
+import math
+import operator
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy only speeds up numeric columns
+    np = None
+
+Columns = Dict[str, List[Any]]
+
+COMPARISONS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge,
+    "in": lambda a, b: a in b, "not in": lambda a, b: a not in b,
+}
+
+TRANSFORMS = {
+    "+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv,
+    "//": operator.floordiv, "%": operator.mod, "**": operator.pow,
+    "abs": lambda a, _: abs(a), "round": lambda a, n: round(a, n or 0),
+    "str": lambda a, _: str(a), "int": lambda a, _: int(a), "float": lambda a, _: float(a),
+    "lower": lambda a, _: a.lower(), "upper": lambda a, _: a.upper(), "strip": lambda a, _: a.strip(),
+    "default": lambda a, b: b if a is None else a,
+}
+
+INT64_MAX = 2 ** 63 - 1
+
+def _numeric(values: List[Any]):
+    """`values` as an int64/float64 array if NumPy is available and every value is a number."""
+    if np is None or not values or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return None
+    try:
+        array = np.asarray(values)
+    except OverflowError:
+        return None
+    return array if array.dtype.kind in "if" else None
+
+def _largest(array) -> int:
+    return max(abs(int(array.max())), abs(int(array.min())))
+
+def _fits_int64(array, op: str, operand: Any) -> bool:
+    """Whether `array <op> operand` can be computed in NumPy without int64 wraparound."""
+    if array.dtype.kind == "f" or isinstance(operand, float) or op == "/":
+        return True
+    if op == "**":
+        # Python ints never overflow, and negative exponents give floats
+        return False
+    largest = _largest(array)
+    return (largest * abs(operand) if op == "*" else largest + abs(operand)) <= INT64_MAX
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+def _std(values):
+    if not values:
+        return None
+    m = _mean(values)
+    return math.sqrt(sum((v - m) ** 2 for v in values) / len(values))
+
+AGGREGATIONS = {
+    "count": len,
+    "sum": sum,
+    "mean": _mean,
+    "min": lambda v: min(v) if v else None,
+    "max": lambda v: max(v) if v else None,
+    "std": _std,
+    "first": lambda v: v[0] if v else None,
+    "last": lambda v: v[-1] if v else None,
+    "unique": lambda v: list(OrderedDict.fromkeys(v)),
+    "list": list,
+}
+
+_NUMPY_AGGREGATIONS = {"sum": "sum", "mean": "mean", "min": "min", "max": "max", "std": "std"}
+
+def to_columns(items: List[Any]) -> Columns:
+    """Item list ([{"json": {...}}] or plain dicts) as {field: [values]}; missing fields are None."""
+    rows = [item.get("json", item) if isinstance(item, dict) else {"value": item} for item in items]
+    fields = list(OrderedDict.fromkeys(key for row in rows if isinstance(row, dict) for key in row))
+    return {field: [row.get(field) if isinstance(row, dict) else None for row in rows] for field in fields}
+
+def to_items(columns: Columns) -> List[Dict[str, Any]]:
+    """Columns back into engine items; shorter columns are padded with None."""
+    length = max((len(values) for values in columns.values()), default=0)
+    return [
+        {"json": {field: values[i] if i < len(values) else None for field, values in columns.items()}}
+        for i in range(length)
+    ]
+
+def compare(column: List[Any], op: str, value: Any) -> List[bool]:
+    """Boolean mask of `column <op> value`."""
+    if op not in COMPARISONS:
+        raise ValueError(f"Unsupported comparison: {op}")
+    array = _numeric(column)
+    if array is not None and op in ("==", "!=", "<", "<=", ">", ">=") and isinstance(value, (int, float)):
+        return COMPARISONS[op](array, value).tolist()
+    fn = COMPARISONS[op]
+    return [v is not None and fn(v, value) for v in column]
+
+def filter_rows(columns: Columns, mask: Union[List[Any], Callable[[Dict[str, Any]], Any]]) -> Columns:
+    """Rows of `columns` where `mask` (a list of booleans or a row -> bool function) is true."""
+    if callable(mask):
+        mask = [mask(row["json"]) for row in to_items(columns)]
+    keep = [i for i, flag in enumerate(mask) if flag]
+    return {field: [values[i] for i in keep] for field, values in columns.items()}
+
+def map_column(column: List[Any], op: Union[str, Callable[[Any], Any]], operand: Any = None) -> List[Any]:
+    """`column` transformed element-wise by a named op ("+", "round", "lower", ...) or a function."""
+    if callable(op):
+        return [op(v) for v in column]
+    if op not in TRANSFORMS:
+        raise ValueError(f"Unsupported transform: {op}")
+    array = _numeric(column)
+    numeric_operand = isinstance(operand, (int, float)) and not isinstance(operand, bool)
+    if array is not None and op in ("+", "-", "*", "/", "**") and numeric_operand and _fits_int64(array, op, operand):
+        return TRANSFORMS[op](array, operand).tolist()
+    fn = TRANSFORMS[op]
+    return [None if v is None and op != "default" else fn(v, operand) for v in column]
+
+def groupby(columns: Columns, key: str) -> Dict[Any, Columns]:
+    """Split columns into {key value: columns}, keeping first-seen order."""
+    groups: Dict[Any, List[int]] = OrderedDict()
+    for i, value in enumerate(columns[key]):
+        groups.setdefault(value, []).append(i)
+    return {
+        value: {field: [values[i] for i in rows] for field, values in columns.items()}
+        for value, rows in groups.items()
+    }
+
+def _aggregate(values: List[Any], how: str) -> Any:
+    if how not in AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation: {how}")
+    if how in _NUMPY_AGGREGATIONS:
+        array = _numeric(values)
+        if array is not None and (how != "sum" or array.dtype.kind == "f" or _largest(array) * len(array) <= INT64_MAX):
+            return getattr(array, _NUMPY_AGGREGATIONS[how])().item()
+        values = [v for v in values if v is not None]
+    return AGGREGATIONS[how](values)
+
+def aggregate(columns: Columns, spec: Dict[str, Any], by: str = None) -> Columns:
+    """
+    Aggregate columns with spec {"output": ("column", "sum"|"mean"|"count"|...)}.
+    With `by`, rows are grouped by that column first and one row per group is
+    returned (the group value in column `by`).
+    """
+    groups = groupby(columns, by) if by else {None: columns}
+    out: Columns = {by: []} if by else {}
+    for name in spec:
+        out[name] = []
+    for value, group in groups.items():
+        if by:
+            out[by].append(value)
+        for name, (column, how) in spec.items():
+            out[name].append(_aggregate(group.get(column, []), how))
+    return out
+
+def sort_rows(columns: Columns, key: str, reverse: bool = False) -> Columns:
+    """Rows ordered by column `key`; rows where it is None stay last in either direction."""
+    values = columns[key]
+    order = sorted((i for i, v in enumerate(values) if v is not None), key=values.__getitem__, reverse=reverse)
+    order += [i for i, v in enumerate(values) if v is None]
+    return {field: [values[i] for i in order] for field, values in columns.items()}
+
+SANDBOX_HELPERS = {
+    "to_columns": to_columns,
+    "to_items": to_items,
+    "compare": compare,
+    "filter_rows": filter_rows,
+    "map_column": map_column,
+    "groupby": groupby,
+    "aggregate": aggregate,
+    "sort_rows": sort_rows,
+}
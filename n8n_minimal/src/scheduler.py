@@ -1,5 +1,5 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from .engine import execute_workflow
+from .engine import execute_workflow, get_compiled_workflow
 import asyncio
 
 scheduler = AsyncIOScheduler()
@@ -9,4 +9,6 @@ async def run_workflow_job(workflow):
     await execute_workflow(workflow)
 
 def register_schedule_job(workflow, cron):
-    scheduler.add_job(lambda: asyncio.create_task(run_workflow_job(workflow)), 'cron', **cron) 
\ No newline at end of file
+    # Plan once at registration; every tick reuses the compiled workflow
+    plan = get_compiled_workflow(workflow)
+    scheduler.add_job(lambda: asyncio.create_task(run_workflow_job(plan)), 'cron', **cron)
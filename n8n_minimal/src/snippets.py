@@ -0,0 +1,110 @@
+"""
+Relevance-ranked context for LLM prompts. Search results are split into
+passages, scored against the query with BM25 (plus a small prior from the
+search engine's own score) and packed into a token budget best-first, so the
+prompt carries the passages that answer the question rather than whatever
+fits in the first N bytes.
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+from .config import SEARCH_CONTEXT_MAX_TOKENS
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was were what "
+    "when where which who why will with".split()
+)
+PASSAGE_TOKENS = 60
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+def terms(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+def split_passages(text: str, max_tokens: int = PASSAGE_TOKENS) -> List[str]:
+    """Consecutive sentences grouped into passages of at most `max_tokens` (longer sentences are cut)."""
+    passages, current = [], ""
+    for sentence in filter(None, (s.strip() for s in _SENTENCE.split(text or ""))):
+        while count_tokens(sentence) > max_tokens:
+            cut = sentence.rfind(" ", 0, max_tokens * 4)
+            cut = cut if cut > 0 else max_tokens * 4
+            passages.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if current and count_tokens(current) + count_tokens(sentence) > max_tokens:
+            passages.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+    if current:
+        passages.append(current)
+    return passages
+
+def select_snippets(query: str, documents: List[Dict[str, Any]], max_tokens: int = SEARCH_CONTEXT_MAX_TOKENS,
+                    passage_tokens: int = PASSAGE_TOKENS) -> List[Dict[str, Any]]:
+    """
+    Best passages of `documents` ({"title", "url", "content", "score"}) for
+    `query` within `max_tokens`. Near-duplicate passages (the same text from
+    several results) are kept once. Returns one entry per source that
+    contributed, in result order: {"title", "url", "snippets": [...], "score"}.
+    """
+    passages = []  # (doc index, passage index, text, term counts)
+    for d, doc in enumerate(documents):
+        for p, text in enumerate(split_passages(doc.get("content") or "", passage_tokens)):
+            passages.append((d, p, text, Counter(terms(text))))
+    if not passages:
+        return []
+
+    query_terms = set(terms(query))
+    df = Counter(t for *_, counts in passages for t in query_terms & counts.keys())
+    avg_len = sum(sum(c.values()) for *_, c in passages) / len(passages) or 1
+    n = len(passages)
+    scored = []
+    for d, p, text, counts in passages:
+        length = sum(counts.values())
+        bm25 = sum(
+            math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+            * counts[t] * (K1 + 1) / (counts[t] + K1 * (1 - B + B * length / avg_len))
+            for t in query_terms if t in counts
+        )
+        # Ties go to higher-ranked results and to the start of a page
+        prior = 0.5 * float(documents[d].get("score") or 0) + 0.1 / (1 + p)
+        scored.append((bm25 + prior, d, p, text, counts))
+    scored.sort(key=lambda s: -s[0])
+
+    budget, picked, seen, cited = max_tokens, [], [], set()
+    for score, d, p, text, counts in scored:
+        cost = count_tokens(text)
+        if d not in cited:
+            # Header line of a source's first snippet
+            cost += count_tokens(f"[00] {documents[d].get('title', '')} ({documents[d].get('url', '')})")
+        if cost > budget:
+            continue
+        words = set(counts)
+        if any(len(words & other) >= 0.8 * max(len(words), 1) for other in seen):
+            continue
+        picked.append((d, p, text, score))
+        seen.append(words)
+        cited.add(d)
+        budget -= cost
+
+    sources: Dict[int, Dict[str, Any]] = {}
+    for d, p, text, score in sorted(picked):
+        doc = documents[d]
+        source = sources.setdefault(d, {"title": doc.get("title", ""), "url": doc.get("url", ""), "snippets": [], "score": 0.0})
+        source["snippets"].append(text)
+        source["score"] = max(source["score"], score)
+    return [sources[d] for d in sorted(sources)]
+
+def format_context(sources: List[Dict[str, Any]]) -> str:
+    """Numbered sources with their snippets, for citing as [n] in an answer."""
+    return "\n\n".join(
+        f"[{i}] {s['title']} ({s['url']})\n" + " … ".join(s["snippets"])
+        for i, s in enumerate(sources, 1)
+    )
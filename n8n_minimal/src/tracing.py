@@ -0,0 +1,171 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Spans kept by the in-process exporter before the oldest are dropped
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+# Node output sizes are estimated rather than serialized, so they are on by default
+TRACE_PAYLOAD_BYTES = os.getenv("TRACE_PAYLOAD_BYTES", "true").lower() == "true"
+# Lists and dicts longer than this are sized from their first items
+PAYLOAD_SAMPLE_ITEMS = 16
+
+class Span:
+    """Timing record for one node execution inside a workflow run."""
+
+    __slots__ = ("trace_id", "span_id", "name", "node_id", "node_type", "start_time", "end_time",
+                 "queue_wait", "retries", "payload_bytes", "status", "error", "attributes", "owner")
+
+    def __init__(self, trace_id: str, node_id: str, node_type: str, start_time: float, owner: Optional[str] = None):
+        self.trace_id = trace_id
+        self.owner = owner
+        self.span_id = os.urandom(8).hex()
+        self.name = f"node.execute {node_type}"
+        self.node_id = node_id
+        self.node_type = node_type
+        self.start_time = start_time
+        self.end_time = start_time
+        self.queue_wait = 0.0
+        self.retries = 0
+        self.payload_bytes = 0
+        self.status = "OK"
+        self.error: Optional[str] = None
+        self.attributes: Dict[str, Any] = {}
+
+    @property
+    def duration(self) -> float:
+        return self.end_time - self.start_time
+
+    def to_otlp(self) -> Dict[str, Any]:
+        attributes = {
+            "node.id": self.node_id,
+            "node.type": self.node_type,
+            "node.queue_wait_ms": round(self.queue_wait * 1000, 3),
+            "node.retries": self.retries,
+            "node.payload_bytes": self.payload_bytes,
+            **self.attributes,
+        }
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(self.start_time * 1e9)),
+            "endTimeUnixNano": str(int(self.end_time * 1e9)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()],
+            "status": {"code": 1 if self.status == "OK" else 2},
+        }
+        if self.error:
+            span["status"]["message"] = self.error
+        return span
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def payload_size(data: Any) -> int:
+    """Approximate JSON size of a node output, without serializing it."""
+    if data is None or isinstance(data, bool):
+        return 5
+    if isinstance(data, (int, float)):
+        return len(repr(data))
+    if isinstance(data, str):
+        return len(data) + 2
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, dict):
+        sample = list(itertools.islice(data.items(), PAYLOAD_SAMPLE_ITEMS))
+        sized = sum(len(str(key)) + 4 + payload_size(value) for key, value in sample)
+    elif isinstance(data, (list, tuple)):
+        sample = data[:PAYLOAD_SAMPLE_ITEMS]
+        sized = sum(payload_size(item) + 1 for item in sample)
+    else:
+        return len(str(data))
+    return 2 + (sized * len(data) // len(sample) if sample else 0)
+
+class InMemorySpanExporter:
+    """Keeps recent spans in a bounded buffer and dumps them as OTLP/JSON."""
+
+    def __init__(self, maxlen: int = TRACE_BUFFER_SIZE):
+        self._spans = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self, owner: Optional[str] = None) -> List[Span]:
+        """Buffered spans, or only those of workflows owned by `owner`."""
+        with self._lock:
+            spans = list(self._spans)
+        return spans if owner is None else [span for span in spans if span.owner == owner]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def to_otlp(self, service_name: str = "n8n-minimal", owner: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "src.engine"},
+                    "spans": [span.to_otlp() for span in self.spans(owner)],
+                }],
+            }]
+        }
+
+    def dump(self, path: str, clear: bool = False) -> int:
+        """Write the buffered spans to `path` as an OTLP/JSON export request."""
+        data = self.to_otlp()
+        with open(path, "w") as f:
+            json.dump(data, f)
+        if clear:
+            self.clear()
+        return len(data["resourceSpans"][0]["scopeSpans"][0]["spans"])
+
+class Tracer:
+    def __init__(self, measure_payloads: bool = TRACE_PAYLOAD_BYTES):
+        self._exporters: List[Callable[[Span], None]] = []
+        self.measure_payloads = measure_payloads
+
+    def add_exporter(self, exporter: Callable[[Span], None]):
+        if exporter not in self._exporters:
+            self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter: Callable[[Span], None]):
+        if exporter in self._exporters:
+            self._exporters.remove(exporter)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._exporters)
+
+    def new_trace_id(self) -> str:
+        return os.urandom(16).hex()
+
+    def start_span(self, trace_id: str, node_id: str, node_type: str, owner: Optional[str] = None) -> Span:
+        return Span(trace_id, node_id, node_type, time.time(), owner)
+
+    def end_span(self, span: Span):
+        span.end_time = time.time()
+        for exporter in self._exporters:
+            try:
+                exporter(span)
+            except Exception:
+                logger.exception("Span exporter failed")
+
+tracer = Tracer()
+span_exporter = InMemorySpanExporter()
+tracer.add_exporter(span_exporter)
@@ -0,0 +1,447 @@
+"""
+Local vector memory behind ChromaRememberNode and ChromaRecallNode. Each
+collection is a directory under VECTOR_STORE_DIR:
+
+- vectors.f32: L2-normalized float32 rows in a memory-mapped matrix (grown
+  by doubling); row i belongs to item idx i.
+- items.sqlite: id, text and JSON metadata per row, used for metadata
+  filters and to return results.
+- an ANN index: hnswlib (hnsw.bin) when installed, otherwise an IVF index
+  over the memmap (k-means centroids and each row's list, ivf_*.npy). The
+  HNSW index is saved at most every VECTOR_INDEX_FLUSH_SECONDS and on
+  close(); after a crash it is rebuilt from the memmap.
+
+Collections opened for a workflow owner live under a per-owner directory,
+so users with the same collection name do not share items.
+
+Small collections and selective filters are searched exactly. Scores are
+cosine similarities. Embeddings come from a pluggable embedder; the default
+"hashing" embedder needs no model or network.
+"""
+import asyncio
+import atexit
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+from .config import VECTOR_STORE_DIR, VECTOR_EMBEDDER, VECTOR_DIM, VECTOR_IVF_NPROBE, VECTOR_INDEX_FLUSH_SECONDS
+
+try:
+    import hnswlib
+except ImportError:  # pragma: no cover - optional, the IVF index is used instead
+    hnswlib = None
+
+INITIAL_CAPACITY = 1024
+# Below this many rows a collection is searched exactly
+EXACT_SEARCH_LIMIT = 20000
+# A filter matching at most this many rows is searched exactly over the matches
+FILTER_EXACT_LIMIT = 50000
+# ANN candidates fetched per requested result when a filter is applied afterwards
+FILTER_OVERFETCH = 10
+# The IVF centroids are retrained once the collection grew by this factor
+IVF_RETRAIN_GROWTH = 2
+SEARCH_CHUNK_ROWS = 65536
+SQLITE_MAX_VARS = 900
+
+_TOKEN = re.compile(r"\w+")
+_FIELD = re.compile(r"^\w+$")
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+@functools.lru_cache(maxsize=200000)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+class HashingEmbedder:
+    """Offline embedding: signed feature hashing of word unigrams and bigrams."""
+
+    def __init__(self, dim: int = VECTOR_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall(str(text).lower())
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                h = _feature_hash(feature)
+                out[row, h % self.dim] += 1.0 if h >> 63 else -1.0
+        return normalize(out)
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model (optional dependency, downloaded once)."""
+
+    def __init__(self, model: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return normalize(self.model.encode(list(texts), batch_size=64, show_progress_bar=False))
+
+# name -> factory; register_embedder adds more
+EMBEDDERS: Dict[str, Callable[[], Any]] = {
+    "hashing": HashingEmbedder,
+    "sentence_transformers": SentenceTransformerEmbedder,
+}
+
+def register_embedder(name: str, factory: Callable[[], Any]):
+    EMBEDDERS[name] = factory
+    get_embedder.cache_clear()
+
+@functools.lru_cache(maxsize=None)
+def get_embedder(name: str = VECTOR_EMBEDDER):
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder: {name}")
+    return EMBEDDERS[name]()
+
+def _where_sql(where: Dict[str, Any]):
+    clauses, params = [], []
+    for field, condition in where.items():
+        if not _FIELD.match(field):
+            raise ValueError(f"Invalid metadata field: {field}")
+        column = f"json_extract(metadata, '$.{field}')"
+        if isinstance(condition, dict):
+            for op, value in condition.items():
+                if op == "$in":
+                    clauses.append(f"{column} IN ({','.join('?' * len(value))})")
+                    params.extend(value)
+                elif op in ("$ne", "$gt", "$gte", "$lt", "$lte"):
+                    clauses.append(f"{column} {dict(ne='!=', gt='>', gte='>=', lt='<', lte='<=')[op[1:]]} ?")
+                    params.append(value)
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(condition)
+    return " AND ".join(clauses) or "1", params
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int):
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[keep], scores[keep]
+    order = np.argsort(-scores)
+    return rows[order], scores[order]
+
+class VectorCollection:
+    def __init__(self, path: str, embedder):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.lock = threading.RLock()
+        meta = self._read_meta()
+        if meta.get("embedder", embedder.name) != embedder.name:
+            raise ValueError(f"Collection {path} was built with embedder {meta['embedder']}, not {embedder.name}")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items (idx INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, text TEXT, metadata TEXT)"
+            )
+            self.count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self.capacity = meta.get("capacity", INITIAL_CAPACITY)
+        self.vectors = self._open_vectors(self.capacity)
+        self.ivf_size = meta.get("ivf_size", 0)
+        # False while hnsw.bin lags behind the vectors (changes not yet flushed)
+        self.index_saved = meta.get("index_saved", True)
+        self._flush_timer = None
+        self.hnsw = None
+        self.centroids = self.assign = self.offsets = self.order = None
+        self._lists_dirty = False
+        self._load_index()
+        self._write_meta()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> Dict[str, Any]:
+        if not os.path.exists(self._file("meta.json")):
+            return {}
+        with open(self._file("meta.json")) as f:
+            return json.load(f)
+
+    def _write_meta(self):
+        with open(self._file("meta.json"), "w") as f:
+            json.dump({"embedder": self.embedder.name, "dim": self.dim, "capacity": self.capacity,
+                       "ivf_size": self.ivf_size, "index_saved": self.index_saved}, f)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self._file("items.sqlite"), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _open_vectors(self, capacity: int) -> np.memmap:
+        path = self._file("vectors.f32")
+        size = capacity * self.dim * 4
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self, needed: int):
+        if needed <= self.capacity:
+            return
+        while self.capacity < needed:
+            self.capacity *= 2
+        self.vectors.flush()
+        self.vectors = self._open_vectors(self.capacity)
+        if self.hnsw is not None:
+            self.hnsw.resize_index(self.capacity)
+
+    # --- ANN index ---
+
+    def _load_index(self):
+        if hnswlib is not None:
+            self.hnsw = hnswlib.Index(space="ip", dim=self.dim)
+            if self.index_saved and os.path.exists(self._file("hnsw.bin")):
+                self.hnsw.load_index(self._file("hnsw.bin"), max_elements=self.capacity)
+            else:
+                self.hnsw.init_index(max_elements=self.capacity, ef_construction=200, M=16)
+                if self.count:
+                    self.hnsw.add_items(self.vectors[:self.count], np.arange(self.count))
+                    self.index_saved = False
+                    self.flush()
+        elif self.ivf_size and os.path.exists(self._file("ivf_centroids.npy")):
+            self.centroids = np.load(self._file("ivf_centroids.npy"))
+            self.assign = np.load(self._file("ivf_assign.npy"))[:self.count]
+            # Rows written after the assignments were last saved
+            if len(self.assign) < self.count:
+                self._assign(np.arange(len(self.assign), self.count))
+            self._lists_dirty = True
+
+    def _assign(self, rows: np.ndarray):
+        """Put `rows` in the list of their nearest centroid; the lists are rebuilt on the next search."""
+        assign = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), SEARCH_CHUNK_ROWS):
+            chunk = rows[start:start + SEARCH_CHUNK_ROWS]
+            assign[start:start + len(chunk)] = np.argmax(np.asarray(self.vectors[chunk]) @ self.centroids.T, axis=1)
+        if len(rows) and rows.max() >= len(self.assign):
+            self.assign = np.concatenate([self.assign, np.zeros(rows.max() + 1 - len(self.assign), dtype=np.int32)])
+        self.assign[rows] = assign
+        self._lists_dirty = True
+
+    def _refresh_lists(self):
+        if self._lists_dirty:
+            self.order = np.argsort(self.assign, kind="stable")
+            self.offsets = np.concatenate([[0], np.cumsum(np.bincount(self.assign, minlength=len(self.centroids)))])
+            np.save(self._file("ivf_assign.npy"), self.assign)
+            self._lists_dirty = False
+
+    def build_index(self, nlist: int = None, iterations: int = 8, sample_size: int = 100000, seed: int = 0):
+        """
+        (Re)train the IVF index: k-means on a sample of the rows, then every
+        row joins the list of its nearest centroid. Rows added later are
+        assigned to the existing centroids; add() retrains once the
+        collection has doubled since the last training.
+        """
+        with self.lock:
+            n = self.count
+            if hnswlib is not None or n == 0:
+                return
+            nlist = nlist or max(1, int(np.sqrt(n)))
+            rng = np.random.default_rng(seed)
+            sample = np.asarray(self.vectors[np.sort(rng.choice(n, min(n, max(sample_size, nlist * 40)), replace=False))])
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+            for _ in range(iterations):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                counts = np.bincount(assign, minlength=nlist)
+                starts = np.cumsum(counts) - counts
+                sums = centroids.copy()
+                filled = counts > 0
+                sums[filled] = np.add.reduceat(sample[np.argsort(assign, kind="stable")], starts[filled])
+                centroids = normalize(sums)
+            np.save(self._file("ivf_centroids.npy"), centroids)
+            self.centroids = centroids
+            self.assign = np.empty(0, dtype=np.int32)
+            self._assign(np.arange(n))
+            self._refresh_lists()
+            self.ivf_size = n
+            self._write_meta()
+
+    def _ann_candidates(self, query: np.ndarray, k: int, nprobe: int) -> np.ndarray:
+        if self.hnsw is not None:
+            k = min(k, self.count)
+            self.hnsw.set_ef(max(k, 64))
+            labels, _ = self.hnsw.knn_query(query, k=k)
+            return labels[0].astype(np.int64)
+        self._refresh_lists()
+        lists = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+
+    # --- Reads and writes ---
+
+    def _exact(self, query: np.ndarray, rows: Optional[np.ndarray], k: int):
+        best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        total = self.count if rows is None else len(rows)
+        for start in range(0, total, SEARCH_CHUNK_ROWS):
+            if rows is None:
+                chunk_rows = np.arange(start, min(start + SEARCH_CHUNK_ROWS, total))
+                vectors = self.vectors[start:start + len(chunk_rows)]
+            else:
+                chunk_rows = rows[start:start + SEARCH_CHUNK_ROWS]
+                vectors = self.vectors[chunk_rows]
+            scores = np.asarray(vectors) @ query
+            best_rows, best_scores = _top_k(np.concatenate([best_rows, chunk_rows]), np.concatenate([best_scores, scores]), k)
+        return best_rows, best_scores
+
+    def _filter_rows(self, where: Dict[str, Any]) -> np.ndarray:
+        clause, params = _where_sql(where)
+        with self._connect() as conn:
+            return np.fromiter((r[0] for r in conn.execute(f"SELECT idx FROM items WHERE {clause} ORDER BY idx", params)),
+                               dtype=np.int64)
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[Dict[str, Any]] = None,
+            vectors: np.ndarray = None) -> int:
+        """Insert or replace items by id; texts are embedded unless `vectors` is given."""
+        if not ids:
+            return 0
+        vectors = normalize(vectors) if vectors is not None else self.embedder.embed(texts)
+        metadatas = metadatas or [{}] * len(ids)
+        with self.lock:
+            existing = {}
+            with self._connect() as conn:
+                for start in range(0, len(ids), SQLITE_MAX_VARS):
+                    batch = list(ids[start:start + SQLITE_MAX_VARS])
+                    existing.update(conn.execute(
+                        f"SELECT id, idx FROM items WHERE id IN ({','.join('?' * len(batch))})", batch
+                    ).fetchall())
+            rows, next_idx = [], self.count
+            for item_id in ids:
+                if item_id in existing:
+                    rows.append(existing[item_id])
+                else:
+                    existing[item_id] = next_idx
+                    rows.append(next_idx)
+                    next_idx += 1
+            self._grow(next_idx)
+            rows = np.asarray(rows, dtype=np.int64)
+            self.vectors[rows] = vectors
+            self.vectors.flush()
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO items (idx, id, text, metadata) VALUES (?, ?, ?, ?)",
+                    [(int(r), i, t, json.dumps(m, default=str)) for r, i, t, m in zip(rows, ids, texts, metadatas)],
+                )
+            self.count = next_idx
+            if self.hnsw is not None:
+                self.hnsw.add_items(vectors, rows)
+                self.index_saved = False
+                self._schedule_flush()
+            elif self.centroids is not None and self.count < IVF_RETRAIN_GROWTH * self.ivf_size:
+                self._assign(rows)
+            elif self.count >= EXACT_SEARCH_LIMIT:
+                self.build_index()
+            self._write_meta()
+        return len(ids)
+
+    def query(self, texts: Sequence[str] = None, k: int = 5, where: Dict[str, Any] = None,
+              vectors: np.ndarray = None, nprobe: int = VECTOR_IVF_NPROBE) -> List[List[Dict[str, Any]]]:
+        """Top-k items per query text (or vector), optionally restricted by a metadata filter."""
+        queries = normalize(vectors) if vectors is not None else self.embedder.embed(texts)
+        results = []
+        with self.lock:
+            if self.count == 0:
+                return [[] for _ in range(len(queries))]
+            allowed = self._filter_rows(where) if where else None
+            indexed = self.hnsw is not None or self.centroids is not None
+            for query in queries:
+                if allowed is not None and len(allowed) <= FILTER_EXACT_LIMIT:
+                    rows, scores = self._exact(query, allowed, k)
+                elif self.count <= EXACT_SEARCH_LIMIT or not indexed:
+                    rows, scores = self._exact(query, None, k)
+                    if allowed is not None:
+                        keep = np.isin(rows, allowed)
+                        rows, scores = rows[keep], scores[keep]
+                else:
+                    candidates = np.unique(self._ann_candidates(query, k * (FILTER_OVERFETCH if where else 1), nprobe))
+                    if allowed is not None:
+                        candidates = candidates[np.isin(candidates, allowed, assume_unique=True)]
+                    rows, scores = self._exact(query, candidates, k)
+                results.append((rows, scores))
+            return [self._items(rows, scores) for rows, scores in results]
+
+    def _items(self, rows: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        if not len(rows):
+            return []
+        with self._connect() as conn:
+            found = {r[0]: r for r in conn.execute(
+                f"SELECT idx, id, text, metadata FROM items WHERE idx IN ({','.join('?' * len(rows))})",
+                [int(r) for r in rows],
+            )}
+        return [
+            {"id": found[r][1], "text": found[r][2], "metadata": json.loads(found[r][3] or "{}"), "score": float(s)}
+            for r, s in zip(rows.tolist(), scores.tolist()) if r in found
+        ]
+
+    def _schedule_flush(self):
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(VECTOR_INDEX_FLUSH_SECONDS, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Save the HNSW index if it changed since the last save."""
+        with self.lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self.hnsw is not None and not self.index_saved:
+                self.hnsw.save_index(self._file("hnsw.bin"))
+                self.index_saved = True
+                self._write_meta()
+
+    def close(self):
+        self.flush()
+        self.vectors.flush()
+
+    async def aadd(self, *args, **kwargs) -> int:
+        return await asyncio.to_thread(self.add, *args, **kwargs)
+
+    async def aquery(self, *args, **kwargs) -> List[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self.query, *args, **kwargs)
+
+_collections: Dict[str, VectorCollection] = {}
+_collections_lock = threading.Lock()
+
+def get_collection(name: str = "default", embedder: str = VECTOR_EMBEDDER, root: str = None,
+                   owner: str = None) -> VectorCollection:
+    """
+    Process-wide collection handle; `name` becomes a directory under
+    VECTOR_STORE_DIR, inside users/<hash of owner>/ when `owner` is given.
+    A collection is bound to one embedder: asking for it with another raises.
+    """
+    if not _FIELD.match(name):
+        raise ValueError(f"Invalid collection name: {name}")
+    root = root or VECTOR_STORE_DIR
+    if owner is not None:
+        root = os.path.join(root, "users", hashlib.sha256(str(owner).encode()).hexdigest()[:24])
+    path = os.path.join(root, name)
+    embedder = get_embedder(embedder)
+    with _collections_lock:
+        if path not in _collections:
+            _collections[path] = VectorCollection(path, embedder)
+        collection = _collections[path]
+    if collection.embedder.name != embedder.name:
+        raise ValueError(f"Collection {name} is open with embedder {collection.embedder.name}, not {embedder.name}")
+    return collection
+
+@atexit.register
+def close_collections():
+    with _collections_lock:
+        for collection in _collections.values():
+            collection.close()
@@ -0,0 +1,130 @@
+"""
+Execution worker. Claims workflow jobs from the durable queue and runs them
+outside the API process:
+
+    python -m src.worker --processes 4
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+from datetime import datetime
+from bson import ObjectId
+from .config import QUEUE_POLL_INTERVAL, get_mongodb_uri
+from .db import get_db_from_uri
+from .engine import execute_workflow
+from .job_queue import DEAD, QUEUED, get_job_queue
+from .rate_limit import current_user
+
+logger = logging.getLogger(__name__)
+
+async def _keep_lease(queue, job_id: str, worker_id: str):
+    """Heartbeat that keeps the claim alive while a long workflow runs."""
+    while True:
+        await asyncio.sleep(queue.visibility_timeout / 3)
+        if not await queue.extend_lease(job_id, worker_id):
+            logger.warning(f"Lost lease on job {job_id}")
+            return
+
+async def process_job(queue, job, worker_id: str, db):
+    job_id = job["job_id"]
+    payload = job["payload"]
+    # Provider calls made by this job queue fairly against other users' jobs
+    current_user.set(payload["username"])
+    await db.executions.update_one(
+        {"job_id": job_id},
+        {"$set": {"status": "RUNNING", "worker": worker_id, "attempts": job["attempts"], "startedAt": datetime.utcnow()}},
+    )
+    heartbeat = asyncio.create_task(_keep_lease(queue, job_id, worker_id))
+    try:
+        workflow = await db.workflows.find_one({"_id": ObjectId(payload["workflow_id"]), "createdBy": payload["username"]})
+        if not workflow:
+            await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "FAILED", "error": "Workflow not found", "finishedAt": datetime.utcnow()}})
+            await queue.complete(job_id, worker_id, "Workflow not found")
+            return
+        result = await execute_workflow(workflow, payload.get("input"), job_id=job_id, db=db)
+        if isinstance(result, dict) and "error" in result and "node" in result:
+            # The engine has already recorded the failure on the execution
+            await db.executions.update_one({"job_id": job_id}, {"$set": {"finishedAt": datetime.utcnow()}})
+            await queue.complete(job_id, worker_id, str(result["error"]))
+            return
+        await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "SUCCESS", "result": result, "finishedAt": datetime.utcnow()}})
+        await queue.complete(job_id, worker_id)
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        # Unexpected errors (e.g. database hiccups) go back to the queue until attempts run out
+        status = await queue.release(job_id, worker_id, str(e))
+        if status == DEAD:
+            await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "FAILED", "error": str(e), "finishedAt": datetime.utcnow()}})
+        elif status == QUEUED:
+            await db.executions.update_one({"job_id": job_id}, {"$set": {"status": "PENDING", "error": str(e)}})
+    finally:
+        heartbeat.cancel()
+
+async def reap_expired_jobs(queue, db):
+    """Fail the executions of jobs whose workers died on their last attempt."""
+    for job_id in await queue.reap_expired():
+        logger.warning(f"Job {job_id} lease expired on its last attempt")
+        await db.executions.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": "FAILED", "error": "Lease expired too many times", "finishedAt": datetime.utcnow()}},
+        )
+
+async def worker_loop(worker_id: str, poll_interval: float = QUEUE_POLL_INTERVAL, concurrency: int = 1, stop: asyncio.Event = None):
+    queue = get_job_queue()
+    _, db = get_db_from_uri(get_mongodb_uri())
+    stop = stop or asyncio.Event()
+    running = set()
+    logger.info(f"Worker {worker_id} started")
+    while not stop.is_set():
+        if len(running) >= concurrency:
+            await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            continue
+        await reap_expired_jobs(queue, db)
+        job = await queue.claim(worker_id)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        task = asyncio.create_task(process_job(queue, job, worker_id, db))
+        running.add(task)
+        task.add_done_callback(running.discard)
+    if running:
+        await asyncio.wait(running)
+
+def run_worker(index: int, poll_interval: float, concurrency: int):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    try:
+        asyncio.run(worker_loop(worker_id, poll_interval, concurrency))
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run workflow execution workers.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Worker processes to start")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs run concurrently per process")
+    parser.add_argument("--poll-interval", type=float, default=QUEUE_POLL_INTERVAL, help="Seconds between polls of an empty queue")
+    args = parser.parse_args(argv)
+    if args.processes == 1:
+        run_worker(0, args.poll_interval, args.concurrency)
+        return
+    procs = [
+        multiprocessing.Process(target=run_worker, args=(i, args.poll_interval, args.concurrency), daemon=False)
+        for i in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+
+if __name__ == "__main__":
+    main()
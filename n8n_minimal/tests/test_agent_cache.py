@@ -0,0 +1,20 @@
+from src.agent.cache import AgentGraphCache
+from src.schemas import WorkflowGraph
+
+
+def test_agent_graph_cache_keys_on_content_and_credentials():
+    def graph(api_key, x=0):
+        return WorkflowGraph(name="wf", nodes=[
+            {"id": "a", "type": "agentic", "position": {"x": x, "y": 0}},
+            {"id": "l", "type": "llm", "config": {"provider": "groq", "api_key": api_key}},
+        ], edges=[{"source": "l", "target": "a"}])
+
+    cache = AgentGraphCache(maxsize=2)
+    built = []
+    build = lambda wf: built.append(wf) or object()
+    first = cache.get(graph("k1"), build)
+    # Moving a node on the canvas does not invalidate the compiled graph
+    assert cache.get(graph("k1", x=50), build) is first
+    # A different injected key compiles a separate graph
+    assert cache.get(graph("k2"), build) is not first
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
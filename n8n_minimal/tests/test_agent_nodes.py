@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+import pytest
+
+# The agent modules import every provider SDK at load time
+components = pytest.importorskip("src.agent.components", exc_type=ImportError)
+builder = pytest.importorskip("src.agent.builder", exc_type=ImportError)
+
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from src.schemas import NodeType, WorkflowEdge, WorkflowGraph, WorkflowNode  # noqa: E402
+
+tool_threads = []
+
+
+def slow_echo(text: str) -> str:
+    """Echo `text` after a blocking sleep."""
+    tool_threads.append(threading.current_thread().name)
+    time.sleep(0.2)
+    return text
+
+
+class ScriptedChat(BaseChatModel):
+    """Asks for slow_echo once, then answers; only the async path is allowed."""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise AssertionError("agent nodes must call the LLM with ainvoke")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            message = AIMessage(content="", tool_calls=[{"name": "slow_echo", "args": {"text": "hi"}, "id": "call-1"}])
+        else:
+            message = AIMessage(content=f"done: {messages[-1].content}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+async def _ticks_during(coro):
+    """Run `coro` while counting how often the event loop gets to run another task."""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        result = await coro
+    finally:
+        task.cancel()
+    return result, ticks
+
+
+@pytest.mark.asyncio
+async def test_offloaded_tool_runs_in_the_tool_pool():
+    tool = components.offloaded_tool(slow_echo)
+    tool_threads.clear()
+    result, ticks = await _ticks_during(tool.ainvoke({"text": "x"}))
+    assert result == "x"
+    assert tool_threads[0].startswith("agent-tool")
+    # The loop kept running while the tool slept
+    assert ticks >= 10
+
+
+@pytest.mark.asyncio
+async def test_agent_graph_awaits_llm_and_offloaded_tools(monkeypatch):
+    monkeypatch.setattr(builder, "create_llm", lambda *args, **kwargs: ScriptedChat())
+    monkeypatch.setitem(components.TOOL_REGISTRY, "slow_echo", components.offloaded_tool(slow_echo))
+    workflow = WorkflowGraph(
+        name="async-agent",
+        nodes=[
+            WorkflowNode(id="a", type=NodeType.AGENTIC),
+            WorkflowNode(id="t", type=NodeType.TOOL, config={"tool_type": "slow_echo"}),
+        ],
+        edges=[WorkflowEdge(source="a", target="t")],
+    )
+    graph = builder.create_agentic_graph(workflow).compile()
+    tool_threads.clear()
+    state, ticks = await _ticks_during(graph.ainvoke({"messages": [HumanMessage(content="echo hi")]}))
+    assert state["messages"][-1].content == "done: hi"
+    assert tool_threads and tool_threads[0].startswith("agent-tool")
+    assert ticks >= 10
@@ -0,0 +1,105 @@
+import operator
+from typing import Annotated, List, TypedDict
+import pytest
+from langgraph.graph import StateGraph, START, END
+from src.agent.checkpointer import SQLiteCheckpointSaver
+
+
+class State(TypedDict):
+    messages: Annotated[List[str], operator.add]
+    turns: int
+
+
+def build(saver):
+    graph = StateGraph(State)
+    graph.add_node("reply", lambda state: {"messages": [f"echo:{state['messages'][-1]}"], "turns": state.get("turns", 0) + 1})
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=saver)
+
+
+@pytest.mark.asyncio
+async def test_thread_resumes_from_sqlite_checkpoint(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    config = {"configurable": {"thread_id": "t1"}}
+    await build(SQLiteCheckpointSaver(path)).ainvoke({"messages": ["hi"]}, config)
+    # A fresh saver on the same file, as after a restart, only gets the new message
+    result = await build(SQLiteCheckpointSaver(path)).ainvoke({"messages": ["again"]}, config)
+    assert result["messages"] == ["hi", "echo:hi", "again", "echo:again"]
+    assert result["turns"] == 2
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_latest_state(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.sqlite"))
+    graph = build(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(5):
+        await graph.ainvoke({"messages": [str(i)]}, config)
+    before = len([c async for c in saver.alist(config)])
+    stats = await saver.acompact(keep_last=2)
+    assert stats["checkpoints"] == before - 2 and stats["blobs"] > 0
+    state = await graph.aget_state(config)
+    assert state.values["turns"] == 5 and len(state.values["messages"]) == 10
+    result = await graph.ainvoke({"messages": ["5"]}, config)
+    assert result["messages"][-2:] == ["5", "echo:5"]
+
+
+@pytest.mark.asyncio
+async def test_threads_are_scoped_per_user(tmp_path):
+    from langchain_core.messages import HumanMessage
+    from src.agent.checkpointer import scoped_thread_id
+    from src.agent.memory import SQLiteMessageStore
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.sqlite"))
+    graph = build(saver)
+    alice = {"configurable": {"thread_id": scoped_thread_id("alice", "t1")}}
+    bob = {"configurable": {"thread_id": scoped_thread_id("bob", "t1")}}
+    await graph.ainvoke({"messages": ["secret"]}, alice)
+    assert await saver.aget_tuple(bob) is None
+    # Bob's turn on the same client thread_id starts a conversation of its own
+    result = await graph.ainvoke({"messages": ["hi"]}, bob)
+    assert result["messages"] == ["hi", "echo:hi"]
+    # Bob cannot address Alice's thread by embedding her id in his thread_id
+    assert await saver.aget_tuple({"configurable": {"thread_id": scoped_thread_id("bob", "alice:t1")}}) is None
+
+    store = SQLiteMessageStore(str(tmp_path / "memory.db"))
+    await store.append(alice["configurable"]["thread_id"], [HumanMessage(content="secret")])
+    assert await store.recent(bob["configurable"]["thread_id"], 10) == []
+
+
+def message_blobs(path):
+    import sqlite3
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            "SELECT base IS NULL, length(value) FROM checkpoint_blobs WHERE channel = 'messages' ORDER BY version"
+        ).fetchall()
+
+
+@pytest.mark.asyncio
+async def test_growing_messages_are_stored_as_deltas(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(3):
+        await build(SQLiteCheckpointSaver(path)).ainvoke({"messages": [f"long message {i} " * 50]}, config)
+    # Only the first version is written in full, even across restarts
+    blobs = message_blobs(path)
+    assert [full for full, _ in blobs] == [True] + [False] * (len(blobs) - 1)
+    assert max(size for _, size in blobs[1:]) <= blobs[0][1] + 20
+    state = await build(SQLiteCheckpointSaver(path)).aget_state(config)
+    assert state.values["messages"][-1] == f"echo:{'long message 2 ' * 50}"
+    assert len(state.values["messages"]) == 6
+
+
+@pytest.mark.asyncio
+async def test_delta_chains_are_bounded(tmp_path, monkeypatch):
+    import src.agent.checkpointer as checkpointer
+    monkeypatch.setattr(checkpointer, "CHECKPOINT_DELTA_CHAIN", 2)
+    path = str(tmp_path / "checkpoints.sqlite")
+    graph = build(SQLiteCheckpointSaver(path))
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(4):
+        await graph.ainvoke({"messages": [str(i)]}, config)
+    fulls = [full for full, _ in message_blobs(path)]
+    assert fulls[::3] == [True] * len(fulls[::3]) and fulls.count(True) == len(fulls[::3])
+    state = await build(SQLiteCheckpointSaver(path)).aget_state(config)
+    assert state.values["messages"] == [m for i in range(4) for m in (str(i), f"echo:{i}")]
@@ -0,0 +1,67 @@
+import os
+import pytest
+from cryptography.fernet import Fernet
+
+os.environ.setdefault("FERNET_KEY", Fernet.generate_key().decode())
+
+from src import credential_manager as cm  # noqa: E402
+from src.credential_codec import encrypt_credential_data  # noqa: E402
+
+
+class Credentials:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = 0
+
+    async def find(self, query):
+        self.queries += 1
+        for doc in self.docs:
+            if doc["_id"] in query["_id"]["$in"] and doc["user_id"] == query["user_id"]:
+                yield doc
+
+
+def make_manager(monkeypatch, count, **kwargs):
+    manager = cm.CredentialManager(**kwargs)
+    docs = [{"_id": f"c{i}", "name": f"c{i}", "type": "groq_api_key", "user_id": "u",
+             "encrypted_data": encrypt_credential_data(cm.fernet, {"api_key": f"k{i}"})} for i in range(count)]
+    credentials = Credentials(docs)
+    monkeypatch.setattr(manager, "db", type("Db", (), {"credentials": credentials})())
+    return manager, credentials
+
+
+@pytest.mark.asyncio
+async def test_secret_cache_is_a_bounded_lru(monkeypatch):
+    manager, credentials = make_manager(monkeypatch, 3, max_cached=2)
+    await manager.get_credentials("u", ["c0", "c1"])
+    await manager.get_credential("u", "c0")  # c0 is now the most recently used
+    await manager.get_credential("u", "c2")
+    assert len(manager._secret_cache) == 2 and ("u", "c1") not in manager._secret_cache
+    assert credentials.queries == 2
+    assert (await manager.get_credential("u", "c0"))["data"] == {"api_key": "k0"}
+    assert credentials.queries == 2
+    # Other users never see a cached credential
+    assert await manager.get_credential("someone-else", "c0") is None
+
+
+@pytest.mark.asyncio
+async def test_expired_secrets_are_dropped_on_read(monkeypatch):
+    manager, credentials = make_manager(monkeypatch, 1, cache_ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr(cm.time, "monotonic", lambda: now[0])
+    await manager.get_credential("u", "c0")
+    now[0] += 61
+    assert manager._cached_credential("u", "c0") is None
+    assert manager._secret_cache == {}
+    await manager.get_credential("u", "c0")
+    assert credentials.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_callers_cannot_change_cached_secrets(monkeypatch):
+    manager, credentials = make_manager(monkeypatch, 1)
+    first = await manager.get_credential("u", "c0")
+    first["data"]["api_key"] = "changed"
+    second = await manager.get_credential("u", "c0")
+    second["data"].clear()
+    assert credentials.queries == 1
+    assert (await manager.get_credential("u", "c0"))["data"] == {"api_key": "k0"}
@@ -0,0 +1,23 @@
+import pytest
+from cryptography.fernet import Fernet
+from src.credential_codec import (
+    decode_credential_data, decrypt_credential_data, encode_credential_data, encrypt_credential_data,
+    is_legacy_payload,
+)
+
+
+def test_round_trip_through_fernet():
+    fernet = Fernet(Fernet.generate_key())
+    data = {"api_key": "sk-ü", "port": 5432}
+    token = encrypt_credential_data(fernet, data)
+    assert decrypt_credential_data(fernet, token) == data
+    # Canonical: key order does not change the plaintext
+    assert encode_credential_data({"b": 1, "a": 2}) == encode_credential_data({"a": 2, "b": 1})
+
+
+def test_legacy_payloads_are_parsed_without_eval():
+    legacy = str({"api_key": "sk-1"}).encode()
+    assert is_legacy_payload(legacy)
+    assert decode_credential_data(legacy) == {"api_key": "sk-1"}
+    with pytest.raises(ValueError):
+        decode_credential_data(b"__import__('os').system('true')")
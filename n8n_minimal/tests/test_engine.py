@@ -20,4 +20,290 @@ async def test_branching():
     results = await execute_workflow(workflow)
     assert "3" in results
     assert results["3"][0]["json"]["msg"] == "Branch A"
-    assert "4" not in results 
\ No newline at end of file
+    assert "4" not in results 
+
+
+class SleepNode:
+    running = 0
+    peak = 0
+
+    def __init__(self, config, credentials=None):
+        self.config = config
+
+    async def execute(self, inputs=None, options=None):
+        SleepNode.running += 1
+        SleepNode.peak = max(SleepNode.peak, SleepNode.running)
+        await asyncio.sleep(self.config.get("delay", 0.1))
+        SleepNode.running -= 1
+        return [{"json": {"inputs": inputs}}]
+
+
+@pytest.fixture
+def sleep_nodes(monkeypatch):
+    import src.engine as engine
+    real = engine.get_node_class
+    SleepNode.running = SleepNode.peak = 0
+    monkeypatch.setattr(engine, "get_node_class", lambda t: SleepNode if t == "SleepNode" else real(t))
+    return SleepNode
+
+
+def fan_out_workflow(width, settings=None):
+    nodes = [{"id": "t", "type": "ManualTriggerNode", "config": {}}]
+    nodes += [{"id": f"b{i}", "type": "SleepNode", "config": {"delay": 0.1}} for i in range(width)]
+    nodes.append({"id": "join", "type": "SleepNode", "config": {"delay": 0}})
+    connections = [{"source": "t", "target": f"b{i}"} for i in range(width)]
+    connections += [{"source": f"b{i}", "target": "join"} for i in range(width)]
+    return {"nodes": nodes, "connections": connections, "settings": settings or {}}
+
+
+@pytest.mark.asyncio
+async def test_fan_out_runs_branches_concurrently(sleep_nodes):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    results = await execute_workflow(fan_out_workflow(5))
+    assert loop.time() - start < 0.3
+    assert sleep_nodes.peak == 5
+    # The join node waits for every branch and receives the merged items
+    assert len(results["join"][0]["json"]["inputs"]) == 5
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap(sleep_nodes):
+    await execute_workflow(fan_out_workflow(6, {"max_concurrency": 2}))
+    assert sleep_nodes.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_join_skipped_when_all_parents_skipped(sleep_nodes):
+    workflow = {
+        "nodes": [
+            {"id": "1", "type": "ManualTriggerNode", "config": {}},
+            {"id": "2", "type": "SleepNode", "config": {"delay": 0}},
+            {"id": "3", "type": "SleepNode", "config": {"delay": 0}},
+        ],
+        "connections": [
+            {"source": "1", "target": "2", "conditions": {"field": "json.triggered", "equals": False}},
+            {"source": "2", "target": "3"},
+        ],
+    }
+    results = await execute_workflow(workflow)
+    assert "2" not in results and "3" not in results
+
+
+@pytest.mark.asyncio
+async def test_plan_cache_reuses_compiled_workflow():
+    from src.compiler import plan_cache
+    from src.engine import get_compiled_workflow
+    workflow = {
+        "nodes": [
+            {"id": "1", "type": "ManualTriggerNode", "config": {}},
+            {"id": "2", "type": "CodeNode", "config": {"code": "result = {'value': 2}"}},
+        ],
+        "connections": [{"source": "1", "target": "2"}],
+    }
+    plan = get_compiled_workflow(workflow)
+    assert plan.order == ["1", "2"]
+    hits = plan_cache.hits
+    # Same content (even with a different _id) hits the cache
+    assert get_compiled_workflow({**workflow, "_id": "abc"}) is plan
+    assert plan_cache.hits == hits + 1
+    results = await execute_workflow(plan)
+    assert results["2"][0]["json"]["value"] == 2
+
+
+def test_compiled_plan_does_not_share_the_callers_dicts():
+    from src.engine import get_compiled_workflow
+    workflow = {
+        "nodes": [{"id": "1", "type": "ManualTriggerNode", "config": {}},
+                  {"id": "2", "type": "CodeNode", "config": {"code": "result = {'value': 'kept'}"}}],
+        "connections": [{"source": "1", "target": "2"}],
+    }
+    plan = get_compiled_workflow(workflow)
+    workflow["nodes"][1]["config"]["code"] = "result = {'value': 'mutated'}"
+    assert plan.nodes["2"]["config"]["code"] == "result = {'value': 'kept'}"
+
+
+def test_compile_rejects_cycles():
+    from src.engine import get_compiled_workflow
+    workflow = {
+        "nodes": [
+            {"id": "1", "type": "ManualTriggerNode", "config": {}},
+            {"id": "2", "type": "CodeNode", "config": {"code": "result = 1"}},
+            {"id": "3", "type": "CodeNode", "config": {"code": "result = 1"}},
+        ],
+        "connections": [
+            {"source": "1", "target": "2"},
+            {"source": "2", "target": "3"},
+            {"source": "3", "target": "2"},
+        ],
+    }
+    with pytest.raises(ValueError):
+        get_compiled_workflow(workflow)
+
+
+class CountingSourceNode:
+    produced = 0
+
+    def __init__(self, config, credentials=None):
+        self.config = config
+
+    async def stream(self, inputs=None, options=None):
+        for i in range(self.config["count"]):
+            CountingSourceNode.produced += 1
+            yield {"json": {"n": i}}
+
+
+@pytest.mark.asyncio
+async def test_stream_workflow_is_bounded_and_filters_items(monkeypatch):
+    import src.engine as engine
+    from src.engine import stream_workflow
+    from src.node_base import Node
+
+    class EvenOnly(Node):
+        async def execute(self, inputs=None, options=None):
+            return [item for item in inputs if item["json"]["n"] % 2 == 0]
+
+    class PassThrough(Node):
+        async def stream(self, inputs, options=None):
+            async for item in inputs:
+                yield item
+
+    classes = {"Source": CountingSourceNode, "EvenOnly": EvenOnly, "PassThrough": PassThrough}
+    real = engine.get_node_class
+    monkeypatch.setattr(engine, "get_node_class", lambda t: classes.get(t) or real(t))
+    CountingSourceNode.produced = 0
+    workflow = {
+        "nodes": [
+            {"id": "src", "type": "Source", "config": {"count": 1000}},
+            {"id": "small", "type": "PassThrough", "config": {}},
+            {"id": "even", "type": "EvenOnly", "config": {}},
+        ],
+        "connections": [
+            {"source": "src", "target": "small", "conditions": {"field": "json.n", "equals": 3}},
+            {"source": "src", "target": "even"},
+        ],
+    }
+    stream = stream_workflow(workflow, buffer_size=10)
+    # Backpressure: the source cannot run far ahead of the consumer
+    first = await stream.__anext__()
+    assert first == ("small", {"json": {"n": 3}})
+    assert CountingSourceNode.produced < 100
+    rest = [item async for item in stream]
+    assert len([1 for nid, _ in rest if nid == "even"]) == 500
+
+
+@pytest.mark.asyncio
+async def test_node_spans_are_recorded(sleep_nodes):
+    from src.tracing import InMemorySpanExporter, tracer
+    spans = InMemorySpanExporter()
+    tracer.add_exporter(spans)
+    try:
+        await execute_workflow({**fan_out_workflow(3, {"max_concurrency": 1}), "createdBy": "alice"})
+    finally:
+        tracer.remove_exporter(spans)
+    assert spans.spans(owner="bob") == []
+    spans = spans.spans(owner="alice")
+    by_node = {span.node_id: span for span in spans}
+    assert set(by_node) == {"t", "b0", "b1", "b2", "join"}
+    assert len({span.trace_id for span in spans}) == 1
+    assert by_node["b0"].node_type == "SleepNode"
+    assert by_node["b0"].duration >= 0.1
+    # With a cap of one, later branches had to wait for a slot
+    assert max(by_node[f"b{i}"].queue_wait for i in range(3)) >= 0.1
+    assert by_node["join"].payload_bytes > 0
+
+
+@pytest.mark.asyncio
+async def test_payload_sizing_can_be_turned_off(sleep_nodes, monkeypatch):
+    from src.tracing import tracer
+    monkeypatch.setattr(tracer, "measure_payloads", False)
+    spans = []
+    tracer.add_exporter(spans.append)
+    try:
+        await execute_workflow(fan_out_workflow(1))
+    finally:
+        tracer.remove_exporter(spans.append)
+    assert spans and all(span.payload_bytes == 0 for span in spans)
+
+
+def test_payload_size_is_estimated_from_a_sample():
+    import json
+    from src.tracing import payload_size
+    assert payload_size({"a": [1, "xy", None]}) == len(json.dumps({"a": [1, "xy", None]}))
+    rows = [{"id": i, "name": "x" * 10} for i in range(10000)]
+    assert payload_size(rows) == pytest.approx(len(json.dumps(rows)), rel=0.2)
+
+
+class FlakyNode:
+    calls = 0
+
+    def __init__(self, config, credentials=None):
+        self.config = config
+
+    async def execute(self, inputs=None, options=None):
+        import httpx
+        FlakyNode.calls += 1
+        if FlakyNode.calls <= self.config["failures"]:
+            request = httpx.Request("POST", "https://api.example.com")
+            response = httpx.Response(429, headers={"Retry-After": "0"}, request=request)
+            response.raise_for_status()
+        return [{"json": {"calls": FlakyNode.calls}}]
+
+
+@pytest.fixture
+def flaky_nodes(monkeypatch):
+    import src.engine as engine
+    real = engine.get_node_class
+    FlakyNode.calls = 0
+    monkeypatch.setattr(engine, "get_node_class", lambda t: FlakyNode if t == "FlakyNode" else real(t))
+    return FlakyNode
+
+
+@pytest.mark.asyncio
+async def test_retries_honour_retry_after(flaky_nodes):
+    workflow = {
+        "nodes": [
+            {"id": "1", "type": "ManualTriggerNode", "config": {}},
+            {"id": "2", "type": "FlakyNode", "config": {"failures": 2, "retry": {"max_attempts": 3, "base_delay": 60}}},
+        ],
+        "connections": [{"source": "1", "target": "2"}],
+    }
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    results = await execute_workflow(workflow)
+    # Retry-After: 0 overrides the (huge) exponential backoff
+    assert loop.time() - start < 1
+    assert results["2"][0]["json"]["calls"] == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_limits_workflow_retries(flaky_nodes):
+    workflow = {
+        "nodes": [
+            {"id": "1", "type": "ManualTriggerNode", "config": {}},
+            {"id": "2", "type": "FlakyNode", "config": {"failures": 5, "retry": {"max_attempts": 10}}},
+        ],
+        "connections": [{"source": "1", "target": "2"}],
+        "settings": {"retry_budget": 2},
+    }
+    results = await execute_workflow(workflow)
+    assert results["node"] == "2"
+    assert flaky_nodes.calls == 3
+
+
+def test_full_jitter_backoff_is_bounded():
+    from src.retry import RetryPolicy
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    delays = [policy.delay(attempt) for attempt in range(10) for _ in range(20)]
+    assert all(0 <= d <= 5 for d in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.asyncio
+async def test_code_node_each_item_mode_runs_in_one_batch():
+    from src.nodes.code_node import CodeNode
+    node = CodeNode({"code": "result = {'double': 10 / item}", "mode": "each_item"})
+    out = await node.execute([{"json": 1}, {"json": 2}, {"json": 0}])
+    assert out[0]["json"] == {"double": 10}
+    assert out[1]["json"] == {"double": 5}
+    assert out[2]["json"] == {"error": "division by zero"}
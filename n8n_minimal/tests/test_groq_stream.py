@@ -0,0 +1,43 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from src.engine import stream_workflow
+from src.main_simple import build_real_workflow
+
+
+@pytest.mark.asyncio
+async def test_execute_real_pipeline_searches_in_parallel_and_streams_answer():
+    searches, prompts = [], []
+
+    async def handler(request):
+        if "tavily" in request.url.host:
+            query = json.loads(request.content)["query"]
+            searches.append(query)
+            await asyncio.sleep(0.2)
+            content = "Paris is the capital of France." if "news" in query else "The capital has 2.1 million residents."
+            return httpx.Response(200, json={"results": [{"title": query, "url": f"https://example.com/{query.split()[-1]}", "content": content}]})
+        prompts.append(json.loads(request.content)["messages"][0]["content"])
+        events = [{"choices": [{"delta": {"content": word}}]} for word in ("Paris", " [1]")]
+        body = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    class Clients:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        def get(self, url):
+            return self.client
+
+    graph = {"nodes": [
+        {"id": "a", "type": "tavily_search", "config": {"api_key": "t", "query_template": "{{input}} news"}},
+        {"id": "b", "type": "tavily_search", "config": {"api_key": "t", "query_template": "{{input}} wiki"}},
+        {"id": "c", "type": "llm", "config": {"api_key": "g"}},
+    ]}
+    start = time.perf_counter()
+    items = [item["json"] async for _, item in stream_workflow(build_real_workflow(graph, "capital of France"), http_clients=Clients())]
+    assert time.perf_counter() - start < 0.35  # both searches ran concurrently
+    assert sorted(searches) == ["capital of France news", "capital of France wiki"]
+    assert "Paris is the capital of France." in prompts[0]
+    assert [i["delta"] for i in items[:-1]] == ["Paris", " [1]"]
+    assert items[-1]["text"] == "Paris [1]" and len(items[-1]["sources"]) == 2
@@ -0,0 +1,64 @@
+import asyncio
+import gc
+import threading
+import pytest
+from src.http_pool import HttpClientRegistry
+
+
+async def _get(registry, url="http://example.test/a"):
+    return registry.get(url)
+
+
+@pytest.fixture
+def other_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_clients_are_reused_per_host_within_a_loop():
+    async def run():
+        registry = HttpClientRegistry()
+        first = registry.get("http://example.test/a")
+        assert registry.get("http://example.test/b") is first
+        assert registry.get("https://example.test/a") is not first
+        await registry.aclose()
+        assert first.is_closed
+
+    asyncio.run(run())
+
+
+def test_alternating_loops_keep_their_own_clients(other_loop):
+    registry = HttpClientRegistry()
+    on_other = asyncio.run_coroutine_threadsafe(_get(registry), other_loop).result()
+    here = asyncio.run(_get(registry))
+    assert here is not on_other
+    # Running on this loop did not close the other loop's warm client
+    assert asyncio.run_coroutine_threadsafe(_get(registry), other_loop).result() is on_other
+    assert not on_other.is_closed
+
+
+def test_clients_are_dropped_with_their_loop():
+    registry = HttpClientRegistry()
+    old = asyncio.run(_get(registry))
+    gc.collect()
+    assert len(registry._clients) == 0
+    assert asyncio.run(_get(registry)) is not old
+
+
+def test_aclose_closes_clients_of_other_running_loops_on_their_loop(other_loop):
+    registry = HttpClientRegistry()
+    on_other = asyncio.run_coroutine_threadsafe(_get(registry), other_loop).result()
+
+    async def close():
+        here = registry.get("http://example.test/a")
+        await registry.aclose()
+        return here
+
+    assert asyncio.run(close()).is_closed
+    asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result()
+    assert on_other.is_closed
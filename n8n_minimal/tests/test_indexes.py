@@ -0,0 +1,118 @@
+import pytest
+from pymongo.errors import OperationFailure
+import src.indexes as indexes
+from src.indexes import INDEXES, check_query_plans, ensure_indexes
+
+
+class FakeCollection:
+    def __init__(self, name, fail=()):
+        self.name = name
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+        self.fail = fail
+        self.created = 0
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+    async def create_indexes(self, models):
+        for model in models:
+            spec = dict(model.document)
+            if spec["name"] in self.fail:
+                raise OperationFailure("E11000 duplicate key error")
+            spec["key"] = list(spec["key"].items())
+            self.indexes[spec.pop("name")] = spec
+            self.created += 1
+
+    def find(self, query):
+        return FakeCursor(self, query)
+
+
+class FakeCursor:
+    def __init__(self, collection, query):
+        self.collection = collection
+        self.fields = list(query)
+        self.sort_fields = []
+
+    def sort(self, spec):
+        self.sort_fields = [field for field, _ in spec]
+        return self
+
+    async def explain(self):
+        # Like the planner: an index whose leading keys are filtered on is used, and it serves
+        # the sort when the keys after that equality prefix are the sort fields
+        for spec in self.collection.indexes.values():
+            keys = [field for field, _ in spec["key"]]
+            prefix = 0
+            while prefix < len(keys) and keys[prefix] in self.fields:
+                prefix += 1
+            if not prefix:
+                continue
+            plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+            if self.sort_fields and keys[prefix:prefix + len(self.sort_fields)] != self.sort_fields:
+                plan = {"stage": "SORT", "inputStage": plan}
+            return {"queryPlanner": {"winningPlan": plan}}
+        return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+
+
+class FakeDb:
+    def __init__(self, fail=()):
+        self.collections = {name: FakeCollection(name, fail) for name in INDEXES}
+        self.commands = []
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    async def command(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+        name, index = args[1], kwargs["index"]
+        for spec in self.collections[name].indexes.values():
+            if dict(spec["key"]) == index["keyPattern"]:
+                spec["expireAfterSeconds"] = index["expireAfterSeconds"]
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_is_idempotent_and_reports_failures():
+    db = FakeDb(fail={"username"})
+    summary = await ensure_indexes(db)
+    assert "users.username" in summary["failed"]
+    assert "executions.finishedAt_ttl" in summary["created"]
+    created = sum(c.created for c in db.collections.values())
+
+    db["users"].fail = ()
+    summary = await ensure_indexes(db)
+    assert summary["created"] == ["users.username"] and not summary["updated"]
+    assert sum(c.created for c in db.collections.values()) == created + 1
+    assert db.commands == []
+
+
+@pytest.mark.asyncio
+async def test_changed_ttl_is_applied_with_coll_mod(monkeypatch):
+    db = FakeDb()
+    await ensure_indexes(db)
+    ttl = next(m for m in INDEXES["executions"] if m.document["name"] == "finishedAt_ttl")
+    monkeypatch.setitem(ttl.document, "expireAfterSeconds", 7 * 86400)
+
+    summary = await ensure_indexes(db)
+    assert summary["updated"] == ["executions.finishedAt_ttl"]
+    (args, kwargs), = db.commands
+    assert args == ("collMod", "executions")
+    assert kwargs["index"] == {"keyPattern": {"finishedAt": 1}, "expireAfterSeconds": 7 * 86400}
+    # Applied once: the next run finds the TTL up to date
+    assert (await ensure_indexes(db))["updated"] == []
+
+
+@pytest.mark.asyncio
+async def test_check_query_plans_flags_scans_and_in_memory_sorts(monkeypatch):
+    db = FakeDb()
+    report = await check_query_plans(db)
+    assert report and all(not q["indexed"] for q in report)
+
+    await ensure_indexes(db)
+    assert all(q["indexed"] and not q["in_memory_sort"] for q in await check_query_plans(db))
+
+    # A shape whose sort the index cannot serve is reported as an in-memory sort
+    monkeypatch.setattr(indexes, "QUERY_SHAPES", [
+        {"collection": "executions", "filter": {"job_id": "j"}, "sort": [("finishedAt", -1)]},
+    ])
+    (query,) = await check_query_plans(db)
+    assert query["indexed"] and query["in_memory_sort"] and query["stages"][0] == "SORT"
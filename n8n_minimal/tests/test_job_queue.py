@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from src.job_queue import SQLiteJobQueue
+
+
+@pytest.mark.asyncio
+async def test_claim_lease_and_visibility_timeout(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "queue.sqlite"), visibility_timeout=0.05, max_attempts=2)
+    await queue.enqueue("job-1", {"workflow_id": "wf"})
+
+    job = await queue.claim("worker-a")
+    assert job["job_id"] == "job-1" and job["payload"] == {"workflow_id": "wf"}
+    # Leased jobs are invisible to other workers
+    assert await queue.claim("worker-b") is None
+
+    await asyncio.sleep(0.1)
+    # The lease lapsed, so another worker picks the job up
+    job = await queue.claim("worker-b")
+    assert job["attempts"] == 2
+    assert not await queue.extend_lease("job-1", "worker-a")
+    await queue.complete("job-1", "worker-b")
+    assert await queue.claim("worker-c") is None
+
+
+@pytest.mark.asyncio
+async def test_release_requeues_until_attempts_exhausted(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "queue.sqlite"), max_attempts=2)
+    await queue.enqueue("job-1", {})
+    job = await queue.claim("w")
+    assert await queue.release(job["job_id"], "w", "boom") == "QUEUED"
+    job = await queue.claim("w")
+    assert job["attempts"] == 2
+    assert await queue.release(job["job_id"], "w", "boom") == "DEAD"
+    assert await queue.claim("w") is None
+    # A worker that no longer holds the job changes nothing
+    assert await queue.release(job["job_id"], "w", "boom") is None
+
+
+@pytest.mark.asyncio
+async def test_expired_last_lease_fails_the_execution(tmp_path):
+    from src.worker import reap_expired_jobs
+
+    class Executions:
+        updates = []
+
+        async def update_one(self, query, update):
+            self.updates.append((query, update["$set"]))
+
+    class Db:
+        executions = Executions()
+
+    queue = SQLiteJobQueue(str(tmp_path / "queue.sqlite"), visibility_timeout=0.05, max_attempts=1)
+    await queue.enqueue("job-1", {})
+    await queue.claim("crashed-worker")
+    await asyncio.sleep(0.1)
+    await reap_expired_jobs(queue, Db())
+    assert await queue.claim("w") is None
+    (query, update), = Db.executions.updates
+    assert query == {"job_id": "job-1"} and update["status"] == "FAILED" and "finishedAt" in update
@@ -0,0 +1,33 @@
+import httpx
+import pytest
+import src.llm_cache as llm_cache
+from src.engine import execute_workflow
+from src.tracing import tracer
+
+
+@pytest.mark.asyncio
+async def test_llm_response_cache_serves_repeated_prompts(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", llm_cache.MemoryLLMCache())
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"text": "hi"}]})
+
+    class Clients:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        def get(self, url):
+            return self.client
+
+    workflow = {"nodes": [{"id": "g", "type": "GroqNode", "config": {"prompt": " Say hi ", "cache": True}}], "connections": []}
+    spans = []
+    tracer.add_exporter(spans.append)
+    try:
+        first = await execute_workflow(workflow, http_clients=Clients())
+        second = await execute_workflow(workflow, http_clients=Clients())
+    finally:
+        tracer.remove_exporter(spans.append)
+    assert first == second
+    assert len(calls) == 1
+    assert [span.attributes["llm.cache_hit"] for span in spans] == [False, True]
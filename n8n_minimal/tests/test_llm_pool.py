@@ -0,0 +1,55 @@
+import threading
+import time
+from src.agent.llm_pool import LLMClientPool
+
+
+def test_slow_construction_does_not_block_other_keys():
+    pool = LLMClientPool()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_factory():
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    thread = threading.Thread(target=pool.get, args=(("slow",), slow_factory))
+    thread.start()
+    started.wait(5)
+    begin = time.monotonic()
+    assert pool.get(("fast",), lambda: "fast") == "fast"
+    assert time.monotonic() - begin < 1
+    release.set()
+    thread.join()
+    assert pool.get(("slow",), lambda: "other") == "slow"
+
+
+def test_concurrent_builds_of_one_key_share_the_first_client():
+    pool = LLMClientPool()
+    barrier = threading.Barrier(4)
+    results = []
+
+    def build():
+        barrier.wait()
+        time.sleep(0.05)
+        return object()
+
+    threads = [threading.Thread(target=lambda: results.append(pool.get(("k",), build))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(r) for r in results}) == 1
+    assert pool.stats()["size"] == 1 and pool.stats()["misses"] == 1
+
+
+def test_pool_evicts_least_recently_used_and_idle_clients():
+    pool = LLMClientPool(max_size=2, idle_ttl=60)
+    pool.get(("a",), lambda: "a")
+    pool.get(("b",), lambda: "b")
+    pool.get(("a",), lambda: "a2")
+    pool.get(("c",), lambda: "c")
+    assert pool.get(("a",), lambda: "new") == "a"
+    assert pool.get(("b",), lambda: "new") == "new"
+    pool.idle_ttl = 0
+    time.sleep(0.01)
+    assert pool.get(("a",), lambda: "fresh") == "fresh"
@@ -0,0 +1,44 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage
+from src.agent.memory import ConversationMemory, count_tokens
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        return AIMessage(content=f"summary #{len(self.prompts)}")
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages += [HumanMessage(content=f"question {i} " * 20, id=f"h{i}"), AIMessage(content=f"answer {i} " * 20, id=f"a{i}")]
+    return messages + [HumanMessage(content="latest", id="latest")]
+
+
+@pytest.mark.asyncio
+async def test_prompt_stays_within_budget_and_summarizes_evicted():
+    llm = FakeLLM()
+    memory = ConversationMemory({"type": "window_buffer", "max_tokens": 200, "summarize": True}, llm)
+    prompt, update = await memory.prepare({"messages": conversation(30)}, "t1")
+    assert count_tokens(prompt) <= 200
+    assert isinstance(prompt[0], SystemMessage) and "summary #1" in prompt[0].content
+    assert isinstance(prompt[1], HumanMessage) and prompt[-1].id == "latest"
+    removed = [m.id for m in update["messages"]]
+    assert all(isinstance(m, RemoveMessage) for m in update["messages"]) and "h0" in removed
+    assert update["memory"]["evicted"] == len(removed)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_keeps_evicted_messages_by_thread(tmp_path):
+    config = {"type": "sqlite", "database_path": str(tmp_path / "memory.db"), "window_size": 3}
+    memory = ConversationMemory(config)
+    _, update = await memory.prepare({"messages": conversation(5)}, "t1")
+    assert len(update["messages"]) == 8
+    # A thread that lost its in-graph state resumes from the stored messages
+    prompt, _ = await memory.prepare({"messages": [HumanMessage(content="back again")]}, "t1")
+    assert [m.id for m in prompt[:-1]] == ["h3", "a3"] and prompt[-1].content == "back again"
+    assert (await memory.store.recent("t2", 10)) == []
@@ -0,0 +1,87 @@
+import json
+import pytest
+from bson import ObjectId
+from src.pagination import paginated_response
+
+
+class FakeCursor:
+    def __init__(self, docs, projection):
+        self.docs = [{k: v for k, v in d.items() if not projection or projection.get(k, 1)} for d in docs]
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, n):
+        return self.docs[:n]
+
+    def __aiter__(self):
+        async def gen():
+            for doc in self.docs:
+                yield doc
+        return gen()
+
+
+class FakeCollection:
+    name = "executions"
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        bounds = query.get("_id", {})
+        docs = [
+            d for d in self.docs
+            if d["user"] == query["user"]
+            and ("$lt" not in bounds or d["_id"] < bounds["$lt"])
+            and ("$gte" not in bounds or d["_id"] >= bounds["$gte"])
+        ]
+        return FakeCursor(docs, projection)
+
+
+async def read_page(response):
+    body = "".join([chunk async for chunk in response.body_iterator])
+    return json.loads(body), response.headers.get("x-next-after")
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_all_documents_once():
+    docs = [{"_id": ObjectId(), "user": "u", "log": ["x"] * 10} for _ in range(5)]
+    collection = FakeCollection(docs + [{"_id": ObjectId(), "user": "other"}])
+    seen, after = [], None
+    while True:
+        page, after = await read_page(await paginated_response(collection, {"user": "u"}, after, 2, view="summary"))
+        seen += page
+        if not after:
+            break
+    assert [d["_id"] for d in seen] == [str(d["_id"]) for d in reversed(docs)]
+    assert all("log" not in d for d in seen)
+
+
+@pytest.mark.asyncio
+async def test_writes_between_header_and_body_do_not_skip_documents():
+    docs = [{"_id": ObjectId(), "user": "u"} for _ in range(6)]
+    collection = FakeCollection(list(docs))
+    seen, after = [], None
+    while True:
+        response = await paginated_response(collection, {"user": "u"}, after, 2)
+        # A run starts after the page's cursor was chosen but before its body is read
+        collection.docs.append({"_id": ObjectId(), "user": "u"})
+        page, after = await read_page(response)
+        seen += [d["_id"] for d in page]
+        if not after:
+            break
+    original = [str(d["_id"]) for d in reversed(docs)]
+    assert [i for i in seen if i in original] == original
+    assert len(set(seen)) == len(seen)
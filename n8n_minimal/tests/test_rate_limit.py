@@ -0,0 +1,129 @@
+import asyncio
+import time
+import httpx
+import pytest
+from src.rate_limit import RateGovernor, current_user
+
+
+@pytest.mark.asyncio
+async def test_queued_calls_are_admitted_round_robin_across_users():
+    governor = RateGovernor({"groq": {"rpm": 600, "tpm": None}})
+    limiter = governor.limiter("groq", "key")
+    limiter.requests.tokens = 0  # bucket empty: every call queues, one admitted per 0.1s
+    order = []
+
+    async def call(user, i):
+        current_user.set(user)
+        async with governor.limit("groq", "key"):
+            order.append((user, i))
+
+    await asyncio.gather(*[call("batch", i) for i in range(6)], *[call("other", i) for i in range(2)])
+    assert [u for u, _ in order[:4]] == ["batch", "other", "batch", "other"]
+    assert [i for u, i in order if u == "batch"] == list(range(6))
+    assert governor.stats()[limiter.key]["throttled"] == 8
+
+
+@pytest.mark.asyncio
+async def test_token_budget_and_retry_after_delay_calls():
+    governor = RateGovernor({"groq": {"rpm": None, "tpm": 6000}})  # 100 tokens/s
+    async with governor.limit("groq", "key", tokens=5900) as report_usage:
+        report_usage(6000)
+    start = time.monotonic()
+    async with governor.limit("groq", "key", tokens=20):
+        pass
+    assert 0.15 < time.monotonic() - start < 1
+
+    response = httpx.Response(429, headers={"Retry-After": "0.3"}, request=httpx.Request("POST", "http://x"))
+    with pytest.raises(httpx.HTTPStatusError):
+        async with governor.limit("groq", "key"):
+            response.raise_for_status()
+    start = time.monotonic()
+    async with governor.limit("groq", "key"):
+        pass
+    assert time.monotonic() - start >= 0.25
+
+
+@pytest.mark.asyncio
+async def test_unlimited_providers_and_credentials_are_separate():
+    governor = RateGovernor({"groq": {"rpm": 1}})
+    assert governor.limiter("slack", "key") is None
+    async with governor.limit("groq", "a"):
+        pass
+    start = time.monotonic()
+    async with governor.limit("groq", "b"):
+        pass
+    assert time.monotonic() - start < 0.1
+    assert len(governor.stats()) == 2
+
+
+@pytest.mark.asyncio
+async def test_calls_held_by_the_shared_window_give_their_local_slot_back():
+    class Window:
+        def __init__(self):
+            self.waits = [0.15]
+
+        async def reserve(self, key, tokens, rpm, tpm):
+            return self.waits.pop(0) if self.waits else 0.0
+
+    governor = RateGovernor({"groq": {"rpm": 600, "tpm": None}})
+    limiter = governor.limiter("groq", "key")
+    limiter.window = Window()
+    limiter.requests.tokens = 1  # one slot now, the next in 0.1s
+    admitted = {}
+
+    async def call(name):
+        start = time.monotonic()
+        await limiter.acquire("u")
+        admitted[name] = time.monotonic() - start
+
+    first = asyncio.create_task(call("held"))
+    await asyncio.sleep(0)
+    await call("next")
+    await first
+    # The held call's slot went back to the bucket, so the next call did not wait for a refill
+    assert admitted["next"] < 0.05
+    assert admitted["held"] >= 0.15
+    stats = limiter.stats()
+    assert stats["granted"] == 2 and stats["immediate"] == 2
+    assert stats["wait_seconds"] >= 0.15
+
+
+def test_credential_keys_are_stable_across_processes():
+    import subprocess
+    import sys
+    from src.rate_limit import credential_key
+    code = "from src.rate_limit import credential_key; print(credential_key('gsk_test'))"
+    other = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip()
+    assert other == credential_key("gsk_test") and "gsk_test" not in other
+
+
+@pytest.mark.asyncio
+async def test_agent_model_calls_are_sized_from_prompt_and_settled(monkeypatch):
+    import src.rate_limit as rate_limit
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class FakeChat(BaseChatModel):
+        usage: int = 0
+
+        @property
+        def _llm_type(self):
+            return "fake"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            usage = {"input_tokens": self.usage - 10, "output_tokens": 10, "total_tokens": self.usage} if self.usage else None
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok", usage_metadata=usage))])
+
+    monkeypatch.setattr(rate_limit, "governor", RateGovernor({"fake": {"rpm": None, "tpm": 60000}}))
+    limiter = rate_limit.governor.limiter("fake", "key")
+
+    # No usage reported: the admission estimate (prompt + max_tokens) stays charged
+    await FakeChat(**rate_limit.governed_model_kwargs("fake", "key", max_tokens=10)).ainvoke("x" * 4000)
+    charged = 60000 - limiter.tokens.tokens
+    assert 1000 < charged < 1100
+
+    # Reported usage replaces the estimate
+    limiter.tokens.tokens = 60000
+    await FakeChat(usage=3000, **rate_limit.governed_model_kwargs("fake", "key", max_tokens=10)).ainvoke("x" * 4000)
+    assert 2990 < 60000 - limiter.tokens.tokens < 3010
@@ -0,0 +1,41 @@
+import time
+import pytest
+from src.sandbox import run_batch_in_sandbox, run_in_sandbox_async, shutdown_sandbox_pool
+
+SWALLOWS_TIMEOUT = """
+n = 0
+while True:
+    try:
+        while True:
+            n += 1
+    except Exception:
+        pass
+"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    yield
+    shutdown_sandbox_pool()
+
+
+@pytest.mark.asyncio
+async def test_snippet_cannot_swallow_its_cpu_limit():
+    start = time.monotonic()
+    out = await run_in_sandbox_async(SWALLOWS_TIMEOUT, cpu_seconds=1)
+    assert "limit" in out["error"]
+    assert time.monotonic() - start < 6
+    # The killed worker is replaced for the next call
+    assert await run_in_sandbox_async("result = 1 + 1") == {"result": 2}
+
+
+@pytest.mark.asyncio
+async def test_wall_clock_limit_kills_blocked_worker(monkeypatch):
+    import src.sandbox as sandbox
+    monkeypatch.setattr(sandbox, "SANDBOX_WALL_SECONDS", 1)
+    # Big-integer arithmetic is one long C call; no signal handler runs until it returns
+    start = time.monotonic()
+    out = await run_batch_in_sandbox("result = 7 ** (10 ** 9) % 10", [1, 2], cpu_seconds=1)
+    assert time.monotonic() - start < 5
+    assert all("Wall-clock limit" in r["error"] for r in out)
+    assert await run_in_sandbox_async("result = 3") == {"result": 3}
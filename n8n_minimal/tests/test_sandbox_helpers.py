@@ -0,0 +1,41 @@
+import pytest
+from src.sandbox_helpers import aggregate, compare, map_column, sort_rows, to_columns, to_items
+
+
+@pytest.mark.asyncio
+async def test_code_node_columns_mode_with_vectorized_helpers():
+    from src.nodes.code_node import CodeNode
+    items = [{"json": {"region": r, "amount": a}} for r, a in [("eu", 5), ("us", 1), ("eu", 7), ("us", 4)]]
+    code = (
+        "big = filter_rows(columns, compare(columns['amount'], '>=', 4))\n"
+        "result = aggregate(big, {'total': ('amount', 'sum'), 'n': ('amount', 'count')}, by='region')"
+    )
+    out = await CodeNode({"code": code, "mode": "columns"}).execute(items)
+    assert [item["json"] for item in out] == [
+        {"region": "eu", "total": 12, "n": 2},
+        {"region": "us", "total": 4, "n": 1},
+    ]
+
+
+def test_integer_results_outside_int64_fall_back_to_python():
+    assert aggregate({"a": [2 ** 62, 2 ** 62]}, {"s": ("a", "sum")}) == {"s": [2 ** 63]}
+    assert map_column([2 ** 62], "*", 4) == [2 ** 64]
+    assert map_column([2 ** 62, 1], "+", 2 ** 62) == [2 ** 63, 2 ** 62 + 1]
+    assert map_column([2, 3], "**", -1) == [0.5, 1 / 3]
+    # Results that fit still come back as Python ints
+    assert aggregate({"a": [1, 2, 3]}, {"s": ("a", "sum")}) == {"s": [6]}
+    assert map_column([1, 2], "*", 3) == [3, 6]
+    assert compare([2 ** 64, 1], ">", 2) == [True, False]
+
+
+def test_sort_rows_keeps_none_last():
+    columns = {"k": [2, None, 3, 1], "v": ["b", "none", "c", "a"]}
+    assert sort_rows(columns, "k")["v"] == ["a", "b", "c", "none"]
+    assert sort_rows(columns, "k", reverse=True)["v"] == ["c", "b", "a", "none"]
+
+
+def test_column_round_trip_and_ragged_columns():
+    items = [{"json": {"a": 1}}, {"json": {"a": 2, "b": "x"}}]
+    assert to_items(to_columns(items)) == [{"json": {"a": 1, "b": None}}, {"json": {"a": 2, "b": "x"}}]
+    assert to_items({"a": [1, 2], "b": ["x"]}) == [{"json": {"a": 1, "b": "x"}}, {"json": {"a": 2, "b": None}}]
+    assert to_items({}) == []
@@ -0,0 +1,27 @@
+from src.snippets import count_tokens, format_context, select_snippets
+
+
+def page(title, *paragraphs, score=0.5):
+    return {"title": title, "url": f"https://example.com/{title}", "content": " ".join(paragraphs), "score": score}
+
+
+def test_relevant_passages_are_selected_within_budget():
+    filler = "The weather was pleasant and the market was busy all week. " * 30
+    documents = [
+        page("noise", filler, score=0.9),
+        page("answer", filler, "The Eiffel Tower is 330 metres tall after a new antenna was added in 2022.", score=0.4),
+        page("copy", "The Eiffel Tower is 330 metres tall after a new antenna was added in 2022.", score=0.3),
+    ]
+    sources = select_snippets("How tall is the Eiffel Tower?", documents, max_tokens=60)
+    context = format_context(sources)
+    assert count_tokens(context) <= 60
+    assert "330 metres" in context
+    # The duplicate passage from the second page is kept once
+    assert context.count("330 metres") == 1
+    # Relevance wins over the search engine's own ranking
+    assert "noise" not in [s["title"] for s in sources]
+
+
+def test_empty_results():
+    assert select_snippets("anything", [{"title": "x", "url": "u", "content": ""}]) == []
+    assert format_context([]) == ""
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+import src.vector_store as vector_store
+from src.nodes.chroma_recall_node import ChromaRecallNode
+from src.nodes.chroma_remember_node import ChromaRememberNode
+
+
+@pytest.mark.asyncio
+async def test_remember_and_recall_with_metadata_filter(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "VECTOR_STORE_DIR", str(tmp_path))
+    docs = [
+        {"text": "invoice overdue for customer acme", "source": "billing"},
+        {"text": "reset your password from the login page", "source": "support"},
+        {"text": "acme renewed the enterprise contract", "source": "sales"},
+    ]
+    stored = await ChromaRememberNode({"collection": "kb"}).execute([{"json": d} for d in docs])
+    assert stored[0]["json"]["stored"] == 3
+
+    hits = await ChromaRecallNode({"collection": "kb", "query": "password login", "top_k": 1}).execute()
+    assert hits[0]["json"]["metadata"]["source"] == "support"
+    hits = await ChromaRecallNode({"collection": "kb", "top_k": 3, "where": {"source": {"$in": ["billing", "sales"]}}}).execute(
+        [{"json": {"query": "acme"}}]
+    )
+    assert {h["json"]["metadata"]["source"] for h in hits} == {"billing", "sales"}
+
+
+def test_ivf_index_recall_and_reopen(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "EXACT_SEARCH_LIMIT", 1000)
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(50, 384))
+    vectors = centers[rng.integers(0, 50, 6000)] + 0.3 * rng.normal(size=(6000, 384))
+    embedder = vector_store.get_embedder()
+    collection = vector_store.VectorCollection(str(tmp_path / "ivf"), embedder)
+    for start in range(0, 6000, 1500):
+        ids = [str(i) for i in range(start, start + 1500)]
+        collection.add(ids, [""] * 1500, [{"even": i % 2 == 0} for i in range(start, start + 1500)], vectors=vectors[start:start + 1500])
+    assert collection.centroids is not None
+
+    queries = vector_store.normalize(vectors[:20])
+    found = collection.query(vectors=queries, k=5, nprobe=8)
+    exact = [set(collection._exact(q, None, 5)[0].tolist()) for q in queries]
+    recall = np.mean([len(e & {int(h["id"]) for h in f}) / 5 for f, e in zip(found, exact)])
+    assert recall >= 0.9
+
+    reopened = vector_store.VectorCollection(str(tmp_path / "ivf"), embedder)
+    hits = reopened.query(vectors=queries[:1], k=3, where={"even": True})[0]
+    assert reopened.count == 6000 and hits[0]["id"] == "0" and all(h["metadata"]["even"] for h in hits)
+
+
+@pytest.mark.asyncio
+async def test_collections_are_per_owner_and_bound_to_one_embedder(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "VECTOR_STORE_DIR", str(tmp_path))
+    await ChromaRememberNode({"collection": "notes", "text": "alice's secret plan"}).execute([], {"owner": "alice"})
+    assert await ChromaRecallNode({"collection": "notes", "query": "secret plan"}).execute([], {"owner": "bob"}) == []
+    hits = await ChromaRecallNode({"collection": "notes", "query": "secret plan"}).execute([], {"owner": "alice"})
+    assert hits[0]["json"]["text"] == "alice's secret plan"
+
+    monkeypatch.setitem(vector_store.EMBEDDERS, "tiny", lambda: vector_store.HashingEmbedder(dim=8))
+    with pytest.raises(ValueError):
+        vector_store.get_collection("notes", "tiny", owner="alice")
+
+
+def test_hnsw_index_is_saved_on_flush_not_on_every_add(tmp_path, monkeypatch):
+    saves = []
+
+    class FakeIndex:
+        def __init__(self, space, dim):
+            self.rows = {}
+
+        def init_index(self, max_elements, ef_construction, M):
+            pass
+
+        def load_index(self, path, max_elements):
+            raise AssertionError("a stale index must be rebuilt, not loaded")
+
+        def add_items(self, vectors, rows):
+            self.rows.update(zip(np.asarray(rows).tolist(), np.asarray(vectors)))
+
+        def resize_index(self, capacity):
+            pass
+
+        def save_index(self, path):
+            saves.append(len(self.rows))
+            open(path, "wb").close()
+
+    monkeypatch.setattr(vector_store, "hnswlib", type("hnswlib", (), {"Index": FakeIndex}))
+    monkeypatch.setattr(vector_store, "VECTOR_INDEX_FLUSH_SECONDS", 3600)
+    embedder = vector_store.get_embedder()
+    collection = vector_store.VectorCollection(str(tmp_path / "hnsw"), embedder)
+    for i in range(5):
+        collection.add([str(i)], [f"item {i}"])
+    assert saves == []
+    # Not flushed (e.g. the process died): the index is rebuilt from the vectors
+    reopened = vector_store.VectorCollection(str(tmp_path / "hnsw"), embedder)
+    assert len(reopened.hnsw.rows) == 5 and saves == [5]
+    collection.close()
+    assert saves == [5, 5]